@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable
+
+from loguru import logger
+
+from .db import cap_execution_concurrency
+from .engine import RuleEngine
+from .plan import RulePlan
+from .storage import Storage
+
+
+class BatchRunner:
+    """
+    批量执行：同一规则对多组变量各执行一次。
+
+    规则计划（节点、依赖图）与全局变量只加载一次，由所有执行共享；执行在最多
+    ``concurrency`` 个线程中进行（再受平台库连接池容量限制），每个执行使用独立的 Storage。
+
+    在 API 进程内运行（``mode=sync``）时没有 job_queue 任务，进程重启后未执行的项会停留在 queued；
+    需要可恢复的批量执行应使用默认的 ``mode=async``，由 worker 认领。
+    """
+
+    def __init__(self, storage_factory: Callable[[], Storage] = Storage):
+        self.storage_factory = storage_factory
+
+    def run(self, batch_id: str) -> dict[str, int]:
+        storage = self.storage_factory()
+        try:
+            batch = storage.get_batch(batch_id)
+            if batch is None:
+                raise ValueError(f"batch not found: {batch_id}")
+            items = [
+                (execution.execution_id, json.loads(execution.variables or "{}"))
+                for execution in storage.list_batch_executions(batch_id)
+                if execution.status == "queued"
+            ]
+            engine = RuleEngine(storage, storage_factory=self.storage_factory)
+            plan = engine.load_plan(batch.rule_id)
+            global_vars = engine.load_globals(batch.project_id)
+            project_id, rule_id = batch.project_id, batch.rule_id
+            concurrency = cap_execution_concurrency(batch.concurrency)
+        finally:
+            storage.close()
+
+        logger.info("batch started batch_id={} items={} concurrency={}", batch_id, len(items), concurrency)
+        counts: dict[str, int] = {}
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+            futures = [
+                pool.submit(self._run_item, project_id, rule_id, execution_id, variables, plan, global_vars)
+                for execution_id, variables in items
+            ]
+            for future in as_completed(futures):
+                status = future.result()
+                counts[status] = counts.get(status, 0) + 1
+
+        storage = self.storage_factory()
+        try:
+            storage.complete_batch(batch_id)
+        finally:
+            storage.close()
+        logger.info("batch finished batch_id={} counts={}", batch_id, counts)
+        return counts
+
+    def _run_item(
+        self,
+        project_id: int,
+        rule_id: int,
+        execution_id: str,
+        variables: dict[str, Any],
+        plan: RulePlan | None,
+        global_vars: dict[str, Any],
+    ) -> str:
+        storage = self.storage_factory()
+        try:
+            engine = RuleEngine(storage, storage_factory=self.storage_factory)
+            result = engine.execute_rule(
+                project_id, rule_id, variables, execution_id=execution_id, plan=plan, global_vars=global_vars
+            )
+            return result.get("status") or "failed"
+        except Exception as exc:
+            logger.exception("batch item crashed execution_id={}", execution_id)
+            storage.session.rollback()
+            storage.complete_execution(execution_id, "failed", str(exc))
+            return "failed"
+        finally:
+            storage.close()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Mapping
+
+from .config import get_app_config
+from .schema import ConnectorModel
+
+
+def decode_connector_config(config_encrypted: str | None) -> dict[str, Any]:
+    """
+    解出连接器配置。``config_encrypted`` 目前保存的是明文 JSON；接入真正的加密后
+    只需在此处解密，解密结果随连接器缓存，不会在每个节点上重复执行。
+    """
+    return json.loads(config_encrypted or "{}")
+
+
+@dataclass(frozen=True)
+class ResolvedConnector:
+    """已解析（解密）的连接器，配置为只读映射，可在线程间共享。"""
+
+    id: int
+    project_id: int
+    name: str
+    type: str
+    config: Mapping[str, Any]
+    loaded_at: float
+
+    @classmethod
+    def from_model(cls, model: ConnectorModel, loaded_at: float) -> "ResolvedConnector":
+        return cls(
+            id=model.id,
+            project_id=model.project_id,
+            name=model.name,
+            type=model.type,
+            config=MappingProxyType(decode_connector_config(model.config_encrypted)),
+            loaded_at=loaded_at,
+        )
+
+
+class ConnectorCache:
+    """
+    按 (project_id, name) 缓存已解析的连接器，线程安全。
+
+    同进程内由连接器的创建/更新/删除主动失效；``ttl_sec`` > 0 时条目到期后重新加载，
+    用于多进程部署（0 表示不过期）。未指定时取 ``connectors.cache_ttl_sec``。找不到的连接器不缓存。
+    """
+
+    def __init__(self, ttl_sec: float | None = None, clock: Callable[[], float] = time.monotonic):
+        self.ttl_sec = ttl_sec
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[int, str], ResolvedConnector] = {}
+        self._generation = 0
+
+    def _ttl_sec(self) -> float:
+        return self.ttl_sec if self.ttl_sec is not None else get_app_config().connectors_cache_ttl_sec
+
+    def _fresh(self, entry: ResolvedConnector | None) -> bool:
+        ttl_sec = self._ttl_sec()
+        return entry is not None and (ttl_sec <= 0 or self._clock() - entry.loaded_at < ttl_sec)
+
+    def resolve(
+        self, project_id: int, names: Iterable[str], loader: Callable[[list[str]], Iterable[ConnectorModel]]
+    ) -> dict[str, ResolvedConnector]:
+        """批量解析：缓存未命中的名称由 ``loader`` 一次查询取回。"""
+        result: dict[str, ResolvedConnector] = {}
+        missing: list[str] = []
+        with self._lock:
+            for name in dict.fromkeys(names):
+                entry = self._entries.get((project_id, name))
+                if self._fresh(entry):
+                    self.hits += 1
+                    result[name] = entry
+                else:
+                    self.misses += 1
+                    missing.append(name)
+            generation = self._generation
+        if not missing:
+            return result
+        loaded_at = self._clock()
+        loaded = {model.name: ResolvedConnector.from_model(model, loaded_at) for model in loader(missing)}
+        with self._lock:
+            # 加载期间发生过失效时不写回，避免把旧配置放进缓存
+            if self._generation == generation:
+                for name, entry in loaded.items():
+                    self._entries[(project_id, name)] = entry
+        result.update(loaded)
+        return result
+
+    def get(
+        self, project_id: int, name: str, loader: Callable[[list[str]], Iterable[ConnectorModel]]
+    ) -> ResolvedConnector | None:
+        return self.resolve(project_id, [name], loader).get(name)
+
+    def invalidate(self, project_id: int, connector_id: int | None = None, name: str | None = None) -> None:
+        """按连接器 id（改名时旧名称也能失效）或名称失效；两者都不传时失效整个项目。"""
+        whole_project = connector_id is None and name is None
+        with self._lock:
+            self._generation += 1
+            for key, entry in list(self._entries.items()):
+                if key[0] == project_id and (whole_project or entry.id == connector_id or key[1] == name):
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._entries), "ttl_sec": self._ttl_sec(), "hits": self.hits, "misses": self.misses}
+
+
+connectors = ConnectorCache()
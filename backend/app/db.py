@@ -1,16 +1,164 @@
 from __future__ import annotations
 
+import threading
+import time
 from functools import lru_cache
+from typing import Any
 
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from sqlmodel import Session, create_engine
 
-from .config import get_database_url
+from .config import AppConfig, get_app_config, get_database_url
+from .metrics import METRIC_PREFIX, MetricFamily, db_checkout_wait, registry
+
+
+class PoolMetrics:
+    """平台库连接池的取连接统计：等待耗时、超时次数与占用峰值，线程安全。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_total_sec = 0.0
+            self.wait_max_sec = 0.0
+            self.peak_checked_out = 0
+
+    def observe(self, wait_sec: float, checked_out: int, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total_sec += wait_sec
+            self.wait_max_sec = max(self.wait_max_sec, wait_sec)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def snapshot(self, pool: Any) -> dict[str, Any]:
+        size = pool.size() if hasattr(pool, "size") else None
+        max_overflow = getattr(pool, "_max_overflow", None)
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else None
+        capacity = size + max_overflow if size is not None and max_overflow is not None and max_overflow >= 0 else None
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "pool_size": size,
+                "max_overflow": max_overflow,
+                "checked_out": checked_out,
+                "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                "saturation": round(checked_out / capacity, 3) if capacity and checked_out is not None else None,
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total_sec / attempts * 1000, 3) if attempts else 0.0,
+                "wait_max_ms": round(self.wait_max_sec * 1000, 3),
+            }
+
+
+app_pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool 的计时版本：记录每次取连接的等待耗时（含新建连接），池耗尽超时也计入。"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sa_exc.TimeoutError:
+            app_pool_metrics.observe(time.perf_counter() - started, self.checkedout(), timed_out=True)
+            raise
+        waited = time.perf_counter() - started
+        app_pool_metrics.observe(waited, self.checkedout())
+        db_checkout_wait.observe(waited)
+        return connection
+
+
+def _set_mysql_statement_timeout(engine: Engine, timeout_ms: int) -> None:
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):  # noqa: ARG001
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"SET SESSION max_execution_time = {int(timeout_ms)}")
+        finally:
+            cursor.close()
+
+
+def create_app_engine(url: str, config: AppConfig) -> Engine:
+    """
+    按 ``database.*`` 配置创建平台库 Engine。
+
+    内存 SQLite 使用 SQLAlchemy 默认的单连接池，不应用连接池参数；
+    ``statement_timeout_ms`` > 0 时，Postgres 通过连接参数设置 ``statement_timeout``，MySQL 在建连时设置 ``max_execution_time``。
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return create_engine(url, echo=False)
+    connect_args: dict[str, Any] = {}
+    if backend == "sqlite":
+        connect_args["check_same_thread"] = False
+    elif backend == "postgresql" and config.db_statement_timeout_ms > 0:
+        connect_args["options"] = f"-c statement_timeout={int(config.db_statement_timeout_ms)}"
+    engine = create_engine(
+        url,
+        echo=False,
+        poolclass=InstrumentedQueuePool,
+        pool_size=config.db_pool_size,
+        max_overflow=config.db_max_overflow,
+        pool_recycle=config.db_pool_recycle_sec,
+        pool_timeout=config.db_pool_timeout_sec,
+        pool_pre_ping=config.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+    if backend == "mysql" and config.db_statement_timeout_ms > 0:
+        _set_mysql_statement_timeout(engine, config.db_statement_timeout_ms)
+    return engine
+
+
+def cap_execution_concurrency(requested: int, config: AppConfig | None = None) -> int:
+    """
+    按平台库连接池容量限制同时运行的执行数（批量执行、worker 线程）。
+
+    每个执行占用一个 Session；``engine.max_parallel_nodes`` > 1 时每个节点线程再各占一个，
+    并发执行数 × 单次执行连接数不超过 ``pool_size + max_overflow``。``max_overflow`` 为负（不限）时不截断。
+    """
+    config = config or get_app_config()
+    requested = max(1, requested)
+    if config.db_max_overflow < 0:
+        return requested
+    parallel = max(1, config.engine_max_parallel_nodes)
+    per_execution = 1 if parallel == 1 else parallel + 1
+    return max(1, min(requested, (config.db_pool_size + config.db_max_overflow) // per_execution))
 
 
 @lru_cache(maxsize=1)
 def get_engine():
-    return create_engine(get_database_url(), echo=False)
+    return create_app_engine(get_database_url(), get_app_config())
+
+
+def app_pool_stats() -> dict[str, Any]:
+    return app_pool_metrics.snapshot(get_engine().pool)
+
+
+@registry.register_collector
+def _collect_app_pool() -> list[MetricFamily]:
+    stats = app_pool_stats()
+    return [
+        MetricFamily(f"{METRIC_PREFIX}db_pool_checked_out", "gauge", "Platform DB connections in use").add(stats["checked_out"]),
+        MetricFamily(f"{METRIC_PREFIX}db_pool_size", "gauge", "Platform DB pool size").add(stats["pool_size"]),
+        MetricFamily(f"{METRIC_PREFIX}db_pool_timeouts_total", "counter", "Platform DB checkout timeouts").add(
+            stats["timeouts"]
+        ),
+    ]
 
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=get_engine(), class_=Session)
@@ -1,29 +1,106 @@
 from __future__ import annotations
 
 import contextlib
-import io
 import json
 import shlex
-import subprocess
+import threading
 import time
+from collections import ChainMap
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Mapping
 
+from loguru import logger
+
+from .config import get_app_config
+from .connector_cache import ResolvedConnector, connectors
+from .globals_cache import project_globals
+from .metrics import execution_duration, executions_in_flight, node_duration, node_status
 from .models import ExecutionContext, NodeOutput
+from .plan import RulePlan, compile_plan, rule_plans
+from .pools import redis_pools, sql_engines
+from .python_runner import get_python_pool
+from .recorder import create_recorder
+from .scheduler import DagScheduler
+from .shell_runner import get_shell_runner
 from .template import TemplateRenderer
-from .storage import Storage
+from .timing import StepTimings, phase
+from .tracing import child_span, get_tracer
+from .storage import Storage, _now_iso
 
 
-class RuleEngine:
-    def __init__(self, storage: Storage):
-        self.storage = storage
+SQL_DEFAULT_MAX_ROWS = 10000
+SQL_DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+SQL_FETCH_CHUNK_ROWS = 500
+REDIS_PIPELINE_CHUNK_SIZE = 1000
+
 
-    def execute_rule(self, project_id: int, rule_id: int, variables: dict[str, Any]) -> dict[str, Any]:
-        execution = self.storage.create_execution(project_id, rule_id, variables)
+NodeExecutor = Callable[["RuleEngine", int, int, str, Mapping[str, Any], ExecutionContext], NodeOutput]
+
+
+class RuleEngine:
+    def __init__(self, storage: Storage, storage_factory: Callable[[], Storage] | None = None):
+        self._storage = storage
+        self._storage_factory = storage_factory or Storage
+        self._local = threading.local()
+
+    @property
+    def storage(self) -> Storage:
+        """并行调度时节点线程使用各自的 Storage（Session 不跨线程共享），否则为构造时传入的实例。"""
+        return getattr(self._local, "storage", None) or self._storage
+
+    def load_plan(self, rule_id: int) -> RulePlan | None:
+        """
+        取规则的编译计划；规则没有节点时返回 None。
+
+        每次只查询一次 ``rules.version``，版本未变时复用进程内缓存，不再读取节点/边。
+        """
+        version = self.storage.get_rule_version(rule_id)
+        return rule_plans.get(rule_id, version, lambda: self._compile_plan(rule_id, version))
+
+    def _compile_plan(self, rule_id: int, version: int | None) -> RulePlan | None:
+        nodes = [(node.node_id, node.type, node.config) for node in self.storage.list_nodes(rule_id)]
+        edges = [(edge.source_node, edge.target_node) for edge in self.storage.list_edges(rule_id)]
+        return compile_plan(rule_id, version, nodes, edges, NODE_EXECUTORS)
+
+    def load_globals(self, project_id: int) -> dict[str, Any]:
+        """项目全局变量（已按声明类型解析），命中缓存时不查询数据库。"""
+        return project_globals.get(project_id, lambda: self.storage.list_globals(project_id))
+
+    def execute_rule(
+        self,
+        project_id: int,
+        rule_id: int,
+        variables: dict[str, Any],
+        execution_id: str | None = None,
+        plan: RulePlan | None = None,
+        global_vars: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """
+        执行规则；传入 execution_id 时复用已入队的执行记录（异步模式由 worker 调用）。
+
+        批量执行时由调用方预先加载 ``plan`` 与 ``global_vars``，各次执行共享，不再重复查询。
+        """
+        if execution_id is not None:
+            execution = self.storage.start_execution(execution_id)
+            if execution is None:
+                raise ValueError(f"execution not found: {execution_id}")
+        else:
+            execution = self.storage.create_execution(project_id, rule_id, variables)
+        recorder = create_recorder(self.storage)
+        executions_in_flight.inc()
+        started = time.perf_counter()
+        status = "failed"
+        tracer = get_tracer()
+        execution_span = tracer.start_span(
+            "execution", execution_id=execution.execution_id, project_id=project_id, rule_id=rule_id
+        )
         try:
-            runtime_vars = self._build_runtime_vars(project_id, variables)
-            nodes = self.storage.list_nodes(rule_id)
-            if not nodes:
+            if global_vars is None:
+                global_vars = self.load_globals(project_id)
+            runtime_vars = {**global_vars, **variables}
+            if plan is None:
+                plan = self.load_plan(rule_id)
+            if plan is None:
                 self.storage.complete_execution(execution.execution_id, "failed", "规则没有节点")
                 return {"execution_id": execution.execution_id, "status": "failed"}
 
@@ -33,53 +110,131 @@ class RuleEngine:
                 execution_id=execution.execution_id,
                 vars=runtime_vars,
             )
-
-            for node in nodes:
-                node_id = node.node_id
-                config = json.loads(node.config or "{}")
-                action_type = node.type
-
-                try:
-                    if action_type in {"sql", "mysql"}:
-                        output = self._execute_sql_node(project_id, node_id, config, ctx)
-                    elif action_type == "redis":
-                        output = self._execute_redis_node(project_id, node_id, config, ctx)
-                    elif action_type == "log":
-                        output = self._execute_log_node(node_id, config, ctx)
-                    elif action_type == "store":
-                        output = self._execute_store_node(project_id, rule_id, node_id, config, ctx)
-                    elif action_type == "load":
-                        output = self._execute_load_node(project_id, rule_id, node_id, config, ctx)
-                    elif action_type == "python":
-                        output = self._execute_python_node(node_id, config, ctx)
-                    elif action_type == "shell":
-                        output = self._execute_shell_node(node_id, config, ctx)
-                    else:
-                        output = NodeOutput(node_id=node_id, node_type=action_type, status="skipped")
-                except Exception as node_exc:
-                    output = NodeOutput(node_id=node_id, node_type=action_type, status="error", error=str(node_exc))
-
-                ctx.set_output(output)
-                step_status = "completed" if output.status == "success" else output.status
-                content = output.error or str(output.data or "")
-                step_data_json = json.dumps(output.model_dump(), default=str, ensure_ascii=False)
-                step = self.storage.add_step(execution.execution_id, node_id, action_type, content[:500])
-                self.storage.complete_step(step.id, step_status, content[:500], step_data=step_data_json)
-
-                if output.status == "error":
-                    raise RuntimeError(output.error)
-
+            if plan.connectors:
+                self.resolve_connectors(project_id, plan.connectors)
+
+            def run_node(node_id: str) -> tuple[NodeOutput, str, str, StepTimings]:
+                node = plan.nodes[node_id]
+                timings = StepTimings()
+                started_at = _now_iso()
+                # 调度线程不继承 contextvar，显式挂到执行 span 下
+                with tracer.span(
+                    "node", parent=execution_span, execution_id=ctx.execution_id, node_id=node_id, node_type=node.type
+                ) as node_span, timings.activate():
+                    output = self._run_node(project_id, rule_id, node_id, node.type, node.config, ctx, node.executor)
+                    if node_span is not None and output.status == "error":
+                        node_span.set_error(output.error)
+                return output, started_at, _now_iso(), timings
+
+            first_error: str | None = None
+            thread_storages: list[Storage] = []
+            scheduler = DagScheduler(
+                self._max_parallel_nodes(ctx),
+                thread_initializer=lambda: self._init_thread_storage(thread_storages),
+            )
+            try:
+                for node_id, (output, started_at, completed_at, timings) in scheduler.run(plan.order, plan.deps, run_node):
+                    action_type = plan.nodes[node_id].type
+                    ctx.set_output(output)
+                    step_status = "completed" if output.status == "success" else output.status
+                    content = output.error or str(output.data or "")
+                    serialize_started = time.perf_counter()
+                    step_data_json = json.dumps(output.model_dump(), default=str, ensure_ascii=False)
+                    timings.add("serialize", time.perf_counter() - serialize_started)
+                    timings.stop()
+                    recorder.record_step(
+                        execution_id=execution.execution_id,
+                        node_id=node_id,
+                        action_type=action_type,
+                        status=step_status,
+                        content=content[:500],
+                        output=content[:500],
+                        step_data=step_data_json,
+                        started_at=started_at,
+                        completed_at=completed_at,
+                        timings=timings.as_dict(),
+                    )
+
+                    if output.status == "error" and first_error is None:
+                        first_error = output.error
+                        scheduler.stop()
+            finally:
+                for thread_storage in thread_storages:
+                    thread_storage.close()
+
+            if first_error is not None:
+                raise RuntimeError(first_error)
+
+            recorder.flush()
             self.storage.complete_execution(execution.execution_id, "completed", "ok")
+            status = "completed"
             return {"execution_id": execution.execution_id, "status": "completed"}
         except Exception as exc:
+            if execution_span is not None:
+                execution_span.set_error(str(exc))
+            self.storage.session.rollback()
+            recorder.flush()
             self.storage.complete_execution(execution.execution_id, "failed", str(exc))
             return {"execution_id": execution.execution_id, "status": "failed", "error": str(exc)}
+        finally:
+            executions_in_flight.dec()
+            execution_duration.observe(time.perf_counter() - started, status)
+            if execution_span is not None:
+                execution_span.set_attribute("status", status)
+                if status != "completed":
+                    execution_span.status = "error"
+                tracer.end_span(execution_span)
+
+    def _run_node(
+        self,
+        project_id: int,
+        rule_id: int,
+        node_id: str,
+        action_type: str,
+        config: Mapping[str, Any],
+        ctx: ExecutionContext,
+        executor: NodeExecutor | None = None,
+    ) -> NodeOutput:
+        executor = executor or NODE_EXECUTORS.get(action_type)
+        if executor is None:
+            node_status.inc(action_type, "skipped")
+            return NodeOutput(node_id=node_id, node_type=action_type, status="skipped")
+        started = time.perf_counter()
+        try:
+            output = executor(self, project_id, rule_id, node_id, config, ctx)
+        except Exception as node_exc:
+            output = NodeOutput(node_id=node_id, node_type=action_type, status="error", error=str(node_exc))
+        node_duration.observe(time.perf_counter() - started, action_type)
+        node_status.inc(action_type, output.status)
+        return output
+
+    def resolve_connectors(self, project_id: int, names: Iterable[str]) -> dict[str, ResolvedConnector]:
+        """批量解析连接器：缓存未命中的部分一次查询取回。"""
+        return connectors.resolve(
+            project_id, names, lambda missing: self.storage.get_connectors_by_names(project_id, missing)
+        )
+
+    def _resolve_connector(self, project_id: int, name: str, expected_type: str) -> ResolvedConnector:
+        with phase("connector"):
+            connector = self.resolve_connectors(project_id, [name]).get(name)
+        if connector is None:
+            raise ValueError(f"connector not found: {name}")
+        if connector.type != expected_type:
+            raise ValueError(f"connector type mismatch for {expected_type} node: {connector.type}")
+        return connector
+
+    def _init_thread_storage(self, registry: list[Storage]) -> None:
+        storage = self._storage_factory()
+        registry.append(storage)
+        self._local.storage = storage
 
-    def _build_runtime_vars(self, project_id: int, run_variables: dict[str, Any]) -> dict[str, Any]:
-        globals_records = self.storage.list_globals(project_id)
-        resolved = {record.key: record.value for record in globals_records}
-        resolved.update(run_variables)
-        return resolved
+    @staticmethod
+    def _max_parallel_nodes(ctx: ExecutionContext) -> int:
+        """单次执行的节点并发上限：运行变量 ``__parallelism__`` 优先，否则取 ``engine.max_parallel_nodes``。"""
+        raw = ctx.vars.get("__parallelism__")
+        if raw is None:
+            return get_app_config().engine_max_parallel_nodes
+        return max(1, int(raw))
 
     @staticmethod
     def _split_sql(rendered_sql: str) -> list[str]:
@@ -96,18 +251,17 @@ class RuleEngine:
             statements.append(p)
         return statements
 
-    def _execute_sql_node(self, project_id: int, node_id: str, config: dict[str, Any], ctx: ExecutionContext) -> NodeOutput:
+    def _execute_sql_node(self, project_id: int, rule_id: int, node_id: str, config: Mapping[str, Any], ctx: ExecutionContext) -> NodeOutput:
         template_vars = ctx.to_template_vars()
         dsn = None
+        connector_id = None
+        connector_config: Mapping[str, Any] = {}
         connector_name_raw = config.get("connector") or ""
         connector_name = TemplateRenderer.render(str(connector_name_raw), template_vars).strip() or None
         if connector_name:
-            connector = self.storage.get_connector_by_name(project_id, connector_name)
-            if not connector:
-                raise ValueError(f"connector not found: {connector_name}")
-            if connector.type != "mysql":
-                raise ValueError(f"connector type mismatch for mysql node: {connector.type}")
-            connector_config = json.loads(connector.config_encrypted or "{}")
+            connector = self._resolve_connector(project_id, connector_name, "mysql")
+            connector_config = connector.config
+            connector_id = connector.id
             dsn = connector_config.get("dsn")
 
         if not dsn:
@@ -119,90 +273,166 @@ class RuleEngine:
         if not dsn:
             return NodeOutput(node_id=node_id, node_type="mysql", status="success", data=rendered_sql, metadata={"rendered_sql": rendered_sql})
 
-        from sqlalchemy import create_engine, text
+        from sqlalchemy import text
 
+        # 只作用于语句执行时间（max_execution_time）；建连超时由连接器的 connect_timeout 决定
         timeout_sec = int(ctx.vars.get("__sql_timeout__", 10))
-        dsn = dsn.replace("mysql+aiomysql://", "mysql+pymysql://").replace("aiomysql://", "mysql+pymysql://")
-        db_engine = create_engine(dsn, connect_args={"connect_timeout": timeout_sec}, pool_pre_ping=True)
-        try:
-            t0 = time.perf_counter()
-            statements = self._split_sql(rendered_sql)
-            if not statements:
-                elapsed_ms = int((time.perf_counter() - t0) * 1000)
-                return NodeOutput(
-                    node_id=node_id,
-                    node_type="mysql",
-                    status="success",
-                    data=[],
-                    metadata={"rendered_sql": rendered_sql, "elapsed_ms": elapsed_ms, "timeout_sec": timeout_sec, "statement_results": []},
-                )
-
-            statement_results: list[dict[str, Any]] = []
-
-            with db_engine.connect() as conn:
-                conn.execute(text(f"SET SESSION max_execution_time={timeout_sec * 1000}"))
-                for i, stmt in enumerate(statements):
+        max_rows = int(config.get("max_rows") or SQL_DEFAULT_MAX_ROWS)
+        max_bytes = int(config.get("max_bytes") or SQL_DEFAULT_MAX_BYTES)
+        t0 = time.perf_counter()
+        statements = self._split_sql(rendered_sql)
+        if not statements:
+            elapsed_ms = int((time.perf_counter() - t0) * 1000)
+            return NodeOutput(
+                node_id=node_id,
+                node_type="mysql",
+                status="success",
+                data=[],
+                metadata={"rendered_sql": rendered_sql, "elapsed_ms": elapsed_ms, "timeout_sec": timeout_sec},
+            )
+
+        statement_results: list[dict[str, Any]] = []
+        remaining_rows = max_rows
+        remaining_bytes = max_bytes
+        truncated = False
+
+        with phase("acquire"), child_span("sql.connect", connector=connector_name):
+            db_engine = sql_engines.get_engine(connector_id, dsn, connector_config)
+            conn = db_engine.connect()
+        with conn, phase("io"):
+            # 会话级超时跟随物理连接缓存，只有值变化时才发 SET SESSION（仅 MySQL 支持）
+            max_execution_time = timeout_sec * 1000
+            if conn.dialect.name == "mysql" and conn.info.get("max_execution_time") != max_execution_time:
+                conn.execute(text(f"SET SESSION max_execution_time={max_execution_time}"))
+                conn.info["max_execution_time"] = max_execution_time
+            # 服务端游标（pymysql 下为 SSCursor）：按块拉取，超出预算即停止，不把整个结果集读进内存
+            conn.execution_options(stream_results=True, max_row_buffer=SQL_FETCH_CHUNK_ROWS)
+            for i, stmt in enumerate(statements):
+                snippet = (stmt.strip()[:200] + "…") if len(stmt.strip()) > 200 else stmt.strip()
+                with child_span("sql.query", statement_index=i + 1, statement=snippet) as query_span:
                     result = conn.execute(text(stmt))
-                    snippet = (stmt.strip()[:200] + "…") if len(stmt.strip()) > 200 else stmt.strip()
                     if result.returns_rows:
-                        rows = [dict(row._mapping) for row in result]
-                        rowcount = len(rows)
-                        statement_results.append({
-                            "index": i + 1,
-                            "sql": snippet,
-                            "rowcount": rowcount,
-                            "returns_rows": True,
-                            "rows": rows,
-                        })
-                    else:
-                        statement_results.append({
-                            "index": i + 1,
-                            "sql": snippet,
-                            "rowcount": result.rowcount,
-                            "returns_rows": False,
-                        })
-                conn.commit()
+                        cancel = (lambda: self._kill_query(db_engine, conn)) if conn.dialect.name == "mysql" else None
+                        rows, fetched_bytes, truncated_reason = self._fetch_rows(
+                            result, remaining_rows, remaining_bytes, cancel
+                        )
+                    if query_span is not None:
+                        query_span.set_attribute("rowcount", len(rows) if result.returns_rows else result.rowcount)
+                if result.returns_rows:
+                    remaining_rows -= len(rows)
+                    remaining_bytes -= fetched_bytes
+                    statement_result = {
+                        "index": i + 1,
+                        "sql": snippet,
+                        "rowcount": len(rows),
+                        "returns_rows": True,
+                        "rows": rows,
+                    }
+                    if truncated_reason:
+                        truncated = True
+                        statement_result["truncated"] = True
+                        statement_result["truncated_reason"] = truncated_reason
+                    statement_results.append(statement_result)
+                else:
+                    statement_results.append({
+                        "index": i + 1,
+                        "sql": snippet,
+                        "rowcount": result.rowcount,
+                        "returns_rows": False,
+                    })
+            conn.commit()
+
+        elapsed_ms = int((time.perf_counter() - t0) * 1000)
+
+        # statement_results 只保存在 data 中，每条带可选 rows，前端按顺序「行数 + 若有结果立即展示」
+        metadata = {
+            "rendered_sql": rendered_sql,
+            "elapsed_ms": elapsed_ms,
+            "timeout_sec": timeout_sec,
+            "statement_count": len(statements),
+            "max_rows": max_rows,
+            "max_bytes": max_bytes,
+            "truncated": truncated,
+        }
+
+        return NodeOutput(node_id=node_id, node_type="mysql", status="success", data=statement_results, metadata=metadata)
 
-            elapsed_ms = int((time.perf_counter() - t0) * 1000)
-
-            # 统一用 statement_results 作为 data，每条带可选 rows，前端按顺序「行数 + 若有结果立即展示」
-            data = statement_results
-            metadata = {
-                "rendered_sql": rendered_sql,
-                "elapsed_ms": elapsed_ms,
-                "timeout_sec": timeout_sec,
-                "statement_count": len(statements),
-                "statement_results": statement_results,
-            }
-
-            return NodeOutput(node_id=node_id, node_type="mysql", status="success", data=data, metadata=metadata)
+    @staticmethod
+    def _fetch_rows(
+        result, max_rows: int, max_bytes: int, cancel: Callable[[], None] | None = None
+    ) -> tuple[list[dict[str, Any]], int, str | None]:
+        """
+        按 ``SQL_FETCH_CHUNK_ROWS`` 分块读取结果，直到行数或字节预算（按 JSON 序列化长度估算）用尽。
+
+        返回 (rows, 已用字节数, 截断原因)；截断原因为 ``max_rows`` / ``max_bytes``，未截断为 None。
+        服务端游标关闭时会把剩余的行读完，截断时先调用 ``cancel`` 中止查询，关闭不再等待整个结果集。
+        """
+        rows: list[dict[str, Any]] = []
+        used_bytes = 0
+        truncated_reason = None
+        try:
+            while truncated_reason is None:
+                chunk = result.fetchmany(SQL_FETCH_CHUNK_ROWS)
+                if not chunk:
+                    break
+                for row in chunk:
+                    if len(rows) >= max_rows:
+                        truncated_reason = "max_rows"
+                        break
+                    item = dict(row._mapping)
+                    row_bytes = len(json.dumps(item, default=str, ensure_ascii=False).encode("utf-8"))
+                    if used_bytes + row_bytes > max_bytes:
+                        truncated_reason = "max_bytes"
+                        break
+                    rows.append(item)
+                    used_bytes += row_bytes
         finally:
-            db_engine.dispose()
+            if truncated_reason is not None and cancel is not None:
+                cancel()
+                # 被中止的查询以 "Query execution was interrupted" 结束，连接仍可继续执行后续语句
+                with contextlib.suppress(Exception):
+                    result.close()
+            else:
+                result.close()
+        return rows, used_bytes, truncated_reason
+
+    @staticmethod
+    def _kill_query(db_engine, conn) -> None:
+        """从同一连接池的另一条连接 ``KILL QUERY``，中止 ``conn`` 上仍在流式返回结果的查询（MySQL）。"""
+        from sqlalchemy import text
+
+        thread_id = int(conn.connection.dbapi_connection.thread_id())
+        try:
+            with db_engine.connect() as killer:
+                killer.execute(text(f"KILL QUERY {thread_id}"))
+        except Exception as exc:
+            logger.warning("failed to kill truncated sql query thread_id={}: {}", thread_id, exc)
 
-    def _execute_log_node(self, node_id: str, config: dict[str, Any], ctx: ExecutionContext) -> NodeOutput:
+    def _execute_log_node(self, project_id: int, rule_id: int, node_id: str, config: Mapping[str, Any], ctx: ExecutionContext) -> NodeOutput:
         content = TemplateRenderer.render(config.get("log_message", ""), ctx.to_template_vars())
         return NodeOutput(node_id=node_id, node_type="log", status="success", data=content)
 
-    def _execute_store_node(self, project_id: int, rule_id: int, node_id: str, config: dict[str, Any], ctx: ExecutionContext) -> NodeOutput:
+    def _execute_store_node(self, project_id: int, rule_id: int, node_id: str, config: Mapping[str, Any], ctx: ExecutionContext) -> NodeOutput:
         template_vars = ctx.to_template_vars()
         scope = TemplateRenderer.render(str(config.get("scope", "rule")), template_vars).strip() or "rule"
         if scope not in {"project", "rule"}:
             raise ValueError(f"invalid store scope: {scope}")
         key = TemplateRenderer.render(config.get("store_key", ""), template_vars)
         value = TemplateRenderer.render(config.get("store_value", ""), template_vars)
-        self.storage.store_data(
-            project_id=project_id,
-            rule_id=rule_id,
-            execution_id=ctx.execution_id,
-            node_id=node_id,
-            scope=scope,
-            key=key,
-            value=value,
-        )
+        with phase("io"), child_span("storage.store_data", scope=scope, key=key):
+            self.storage.store_data(
+                project_id=project_id,
+                rule_id=rule_id,
+                execution_id=ctx.execution_id,
+                node_id=node_id,
+                scope=scope,
+                key=key,
+                value=value,
+            )
         ctx.store[key] = value
         return NodeOutput(node_id=node_id, node_type="store", status="success", data={"key": key, "value": value})
 
-    def _execute_load_node(self, project_id: int, rule_id: int, node_id: str, config: dict[str, Any], ctx: ExecutionContext) -> NodeOutput:
+    def _execute_load_node(self, project_id: int, rule_id: int, node_id: str, config: Mapping[str, Any], ctx: ExecutionContext) -> NodeOutput:
         template_vars = ctx.to_template_vars()
         scope = TemplateRenderer.render(str(config.get("scope", "rule")), template_vars).strip() or "rule"
         if scope not in {"project", "rule"}:
@@ -210,36 +440,39 @@ class RuleEngine:
         key = TemplateRenderer.render(config.get("key", ""), template_vars)
         assign_to_raw = config.get("assign_to") or ""
         assign_to = TemplateRenderer.render(assign_to_raw, template_vars).strip() or None
-        data = self.storage.read_latest_stored_data(project_id, rule_id, scope, key)
+        with phase("io"), child_span("storage.read_latest", scope=scope, key=key):
+            data = self.storage.read_latest_stored_data(project_id, rule_id, scope, key)
         loaded_value = data.value if data else None
         ctx.store[key] = loaded_value
         if assign_to:
             ctx.vars[assign_to] = loaded_value
         return NodeOutput(node_id=node_id, node_type="load", status="success", data={"key": key, "value": loaded_value, "assign_to": assign_to})
 
-    def _execute_python_node(self, node_id: str, config: dict[str, Any], ctx: ExecutionContext) -> NodeOutput:
+    def _execute_python_node(self, project_id: int, rule_id: int, node_id: str, config: Mapping[str, Any], ctx: ExecutionContext) -> NodeOutput:
         template_vars = ctx.to_template_vars()
         script = TemplateRenderer.render(config.get("script", ""), template_vars)
         timeout_raw = TemplateRenderer.render(str(config.get("timeout_sec", "10")), template_vars).strip()
         timeout_sec = int(timeout_raw) if timeout_raw.isdigit() else 10
         if timeout_sec <= 0:
             raise ValueError("python timeout_sec must be positive")
-        local_vars = {"vars": ctx.vars, "store": ctx.store, "nodes": ctx.node_outputs, "result": None}
-
-        stdout = io.StringIO()
-        with contextlib.redirect_stdout(stdout):
-            exec(script, {"__builtins__": {"print": print, "len": len, "str": str, "int": int, "float": float, "dict": dict, "list": list}}, local_vars)
-
-        result_value = local_vars.get("result")
+        with phase("io"), child_span("python.run"):
+            executed = get_python_pool().run(script, ctx.vars, ctx.store, dict(ctx.node_outputs), timeout_sec)
+        # python 是屏障节点，执行期间没有其他节点读写 vars/store，可以原地替换为脚本修改后的内容
+        ctx.vars.clear()
+        ctx.vars.update(executed.vars)
+        ctx.store.clear()
+        ctx.store.update(executed.store)
+
+        result_value = executed.result
         assign_to_raw = config.get("assign_to") or ""
         assign_to = TemplateRenderer.render(assign_to_raw, template_vars).strip() or None
         if assign_to and result_value is not None:
             ctx.vars[assign_to] = result_value
 
-        output_data = result_value if result_value is not None else stdout.getvalue().strip()
+        output_data = result_value if result_value is not None else executed.stdout.strip()
         return NodeOutput(node_id=node_id, node_type="python", status="success", data=output_data)
 
-    def _execute_shell_node(self, node_id: str, config: dict[str, Any], ctx: ExecutionContext) -> NodeOutput:
+    def _execute_shell_node(self, project_id: int, rule_id: int, node_id: str, config: Mapping[str, Any], ctx: ExecutionContext) -> NodeOutput:
         template_vars = ctx.to_template_vars()
         command = TemplateRenderer.render(config.get("command", ""), template_vars)
         timeout_raw = TemplateRenderer.render(str(config.get("timeout_sec", "10")), template_vars).strip()
@@ -254,54 +487,140 @@ class RuleEngine:
                 raise ValueError("shell workdir is outside allowed root")
             cwd = str(target)
 
-        completed = subprocess.run(
-            command,
-            shell=True,
-            cwd=cwd,
-            timeout=timeout_sec,
-            capture_output=True,
-            text=True,
-            check=False,
-        )
+        max_output_bytes = int(config.get("max_output_bytes") or get_app_config().shell_max_output_bytes)
+        with phase("io"), child_span("shell.run", command=command[:200]):
+            completed = get_shell_runner().run(
+                command,
+                cwd=cwd,
+                timeout_sec=timeout_sec,
+                max_output_bytes=max_output_bytes,
+                spill=bool(config.get("spill_output")),
+                execution_id=ctx.execution_id,
+            )
         data = {"stdout": completed.stdout.strip(), "stderr": completed.stderr.strip(), "returncode": completed.returncode}
         if completed.returncode != 0:
             raise RuntimeError(completed.stderr.strip() or f"shell command failed with exit code {completed.returncode}")
-        return NodeOutput(node_id=node_id, node_type="shell", status="success", data=data)
+        return NodeOutput(node_id=node_id, node_type="shell", status="success", data=data, metadata=completed.metadata())
 
-    def _execute_redis_node(self, project_id: int, node_id: str, config: dict[str, Any], ctx: ExecutionContext) -> NodeOutput:
+    def _execute_redis_node(self, project_id: int, rule_id: int, node_id: str, config: Mapping[str, Any], ctx: ExecutionContext) -> NodeOutput:
         template_vars = ctx.to_template_vars()
         connector_name = config.get("connector")
         if not connector_name:
             raise ValueError("connector is required for redis node")
-        connector = self.storage.get_connector_by_name(project_id, connector_name)
-        if not connector:
-            raise ValueError(f"connector not found: {connector_name}")
-        if connector.type != "redis":
-            raise ValueError(f"connector type mismatch for redis node: {connector.type}")
-        connector_config = json.loads(connector.config_encrypted or "{}")
+        connector = self._resolve_connector(project_id, connector_name, "redis")
+        connector_config = connector.config
         dsn = connector_config.get("dsn")
         if not dsn:
             raise ValueError("redis dsn not configured on connector")
 
-        raw_command = config.get("command") or "PING"
-        rendered_command = TemplateRenderer.render(raw_command, template_vars)
-        parts = shlex.split(rendered_command)
-        if not parts:
-            raise ValueError("redis command is empty")
+        rendered_commands = self._render_redis_commands(config, template_vars)
+        pipelined = bool(config.get("commands") or config.get("foreach"))
+        transaction = bool(config.get("transaction", False))
+        if not rendered_commands:
+            if not pipelined:
+                raise ValueError("redis command is empty")
+            # foreach 结果为空（或 None）表示没有要写的行，不是配置错误
+            metadata = {"command": "", "command_count": 0, "error_count": 0, "transaction": transaction, "elapsed_ms": 0}
+            return NodeOutput(node_id=node_id, node_type="redis", status="success", data=[], metadata=metadata)
+        command_parts = []
+        for rendered_command in rendered_commands:
+            parts = shlex.split(rendered_command)
+            if not parts:
+                raise ValueError("redis command is empty")
+            command_parts.append(parts)
+
+        with phase("acquire"):
+            client = redis_pools.get_client(connector.id, dsn, connector_config)
+
+        # 兼容旧配置：单条 command 不走 pipeline，输出结构保持不变
+        if not pipelined:
+            with phase("io"), child_span("redis.command", command=rendered_commands[0][:200]):
+                result = client.execute_command(*command_parts[0])
+            return NodeOutput(
+                node_id=node_id,
+                node_type="redis",
+                status="success",
+                data=result,
+                metadata={"command": rendered_commands[0]},
+            )
 
-        import redis  # type: ignore[import-not-found]
+        # 按 chunk_size 分批发送，避免上万行的 foreach 在一个 pipeline 里撑大客户端与服务端缓冲；
+        # transaction 为 true 时不分批，全部命令在同一个 MULTI/EXEC 中保证原子性
+        if transaction:
+            chunk_size = max(len(command_parts), 1)
+        else:
+            chunk_size = max(int(config.get("chunk_size") or REDIS_PIPELINE_CHUNK_SIZE), 1)
+        t0 = time.perf_counter()
+        raw_results: list[Any] = []
+        for start in range(0, len(command_parts), chunk_size):
+            chunk = command_parts[start : start + chunk_size]
+            pipe = client.pipeline(transaction=transaction)
+            for parts in chunk:
+                pipe.execute_command(*parts)
+            with phase("io"), child_span("redis.pipeline", command_count=len(chunk), transaction=transaction):
+                raw_results.extend(pipe.execute(raise_on_error=False))
+        elapsed_ms = int((time.perf_counter() - t0) * 1000)
+
+        results: list[dict[str, Any]] = []
+        errors: list[str] = []
+        for rendered_command, raw in zip(rendered_commands, raw_results):
+            if isinstance(raw, Exception):
+                errors.append(f"{rendered_command}: {raw}")
+                results.append({"command": rendered_command, "error": str(raw)})
+            else:
+                results.append({"command": rendered_command, "result": raw})
+
+        metadata = {
+            "command": "\n".join(rendered_commands),
+            "command_count": len(rendered_commands),
+            "error_count": len(errors),
+            "transaction": transaction,
+            "chunk_size": chunk_size,
+            "elapsed_ms": elapsed_ms,
+        }
+        if errors and config.get("fail_on_error", True):
+            raise RuntimeError(f"{len(errors)} of {len(rendered_commands)} redis commands failed, first: {errors[0]}")
+        return NodeOutput(node_id=node_id, node_type="redis", status="success", data=results, metadata=metadata)
 
-        client = redis.from_url(dsn)
-        try:
-            result = client.execute_command(*parts)
-        finally:
-            client.close()
-
-        return NodeOutput(
-            node_id=node_id,
-            node_type="redis",
-            status="success",
-            data=result,
-            metadata={"command": rendered_command},
-        )
+    @staticmethod
+    def _render_redis_commands(config: Mapping[str, Any], template_vars: Mapping[str, Any]) -> list[str]:
+        """
+        展开 Redis 节点的命令列表：
+        - ``commands``: 命令模板列表，逐条渲染；
+        - ``foreach`` + ``command``: ``foreach`` 为 Jinja 表达式（如 ``nodes.q1[0].rows``），
+          对结果中的每一行以 ``row`` / ``row_index`` 渲染一次 ``command``；
+        - 仅 ``command``: 单条命令（旧行为）。
+        """
+        commands = config.get("commands")
+        if commands:
+            if not isinstance(commands, list):
+                raise ValueError("redis commands must be list")
+            return [TemplateRenderer.render(str(cmd), template_vars) for cmd in commands if str(cmd).strip()]
 
+        raw_command = config.get("command") or "PING"
+        foreach = config.get("foreach")
+        if not foreach:
+            return [TemplateRenderer.render(raw_command, template_vars)]
+
+        rows = TemplateRenderer.evaluate(str(foreach), template_vars)
+        if rows is None:
+            return []
+        if isinstance(rows, dict) or not hasattr(rows, "__iter__") or isinstance(rows, (str, bytes)):
+            raise ValueError(f"redis foreach must evaluate to a list, got {type(rows).__name__}")
+        return [
+            TemplateRenderer.render(raw_command, ChainMap({"row": row, "row_index": index}, template_vars))
+            for index, row in enumerate(rows)
+        ]
+
+
+# 节点类型 -> 执行函数；编译计划时解析，执行时不再逐类型判断
+NODE_EXECUTORS: dict[str, NodeExecutor] = {
+    "sql": RuleEngine._execute_sql_node,
+    "mysql": RuleEngine._execute_sql_node,
+    "redis": RuleEngine._execute_redis_node,
+    "log": RuleEngine._execute_log_node,
+    "store": RuleEngine._execute_store_node,
+    "load": RuleEngine._execute_load_node,
+    "python": RuleEngine._execute_python_node,
+    "shell": RuleEngine._execute_shell_node,
+}
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import copy
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+from loguru import logger
+
+from .config import get_app_config
+from .schema import GlobalVarModel
+
+
+_TRUE_VALUES = {"1", "true", "yes", "on", "y"}
+_FALSE_VALUES = {"0", "false", "no", "off", "n", ""}
+
+
+def parse_global_value(value: str | None, var_type: str | None) -> Any:
+    """
+    按声明类型解析全局变量：int/integer、float/number、bool/boolean、json；
+    string 及未知类型保持原字符串。解析失败时记录告警并返回原字符串，不中断执行。
+    """
+    kind = (var_type or "string").strip().lower()
+    if value is None or kind in {"string", "str", "text"}:
+        return value
+    try:
+        if kind in {"int", "integer"}:
+            return int(value.strip())
+        if kind in {"float", "number"}:
+            return float(value.strip())
+        if kind in {"bool", "boolean"}:
+            lowered = value.strip().lower()
+            if lowered in _TRUE_VALUES:
+                return True
+            if lowered in _FALSE_VALUES:
+                return False
+            raise ValueError(f"not a boolean: {value!r}")
+        if kind == "json":
+            return json.loads(value)
+    except ValueError as exc:
+        logger.warning("global var parse failed type={} error={}", kind, exc)
+        return value
+    return value
+
+
+@dataclass
+class _GlobalsEntry:
+    values: dict[str, Any]
+    mutable_keys: frozenset[str]
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+class GlobalsCache:
+    """
+    按项目缓存已解析类型的全局变量，线程安全。
+
+    同进程内由 ``upsert_global`` / ``delete_global`` 主动失效；``ttl_sec`` > 0 时条目到期后重新加载，
+    用于 API 与 worker 分进程部署时感知其他进程的修改（0 表示不过期）。未指定时取 ``globals.cache_ttl_sec``。
+    """
+
+    def __init__(self, ttl_sec: float | None = None, clock: Callable[[], float] = time.monotonic):
+        self.ttl_sec = ttl_sec
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: dict[int, _GlobalsEntry] = {}
+        self._generations: dict[int, int] = {}
+
+    def get(self, project_id: int, loader: Callable[[], Iterable[GlobalVarModel]]) -> dict[str, Any]:
+        """返回新的 dict；json 类型的值（dict/list）会深拷贝，执行中修改不会污染缓存。"""
+        with self._lock:
+            entry = self._entries.get(project_id)
+            ttl_sec = self._ttl_sec()
+            if entry is not None and (ttl_sec <= 0 or self._clock() - entry.loaded_at < ttl_sec):
+                self.hits += 1
+                return self._copy(entry)
+            self.misses += 1
+            generation = self._generations.get(project_id, 0)
+        values = {record.key: parse_global_value(record.value, record.type) for record in loader()}
+        entry = _GlobalsEntry(
+            values=values,
+            mutable_keys=frozenset(key for key, value in values.items() if isinstance(value, (dict, list))),
+            loaded_at=self._clock(),
+        )
+        with self._lock:
+            # 加载期间发生过失效时不写回，避免把旧值放进缓存
+            if self._generations.get(project_id, 0) == generation:
+                self._entries[project_id] = entry
+        return self._copy(entry)
+
+    def _ttl_sec(self) -> float:
+        return self.ttl_sec if self.ttl_sec is not None else get_app_config().globals_cache_ttl_sec
+
+    @staticmethod
+    def _copy(entry: _GlobalsEntry) -> dict[str, Any]:
+        values = dict(entry.values)
+        for key in entry.mutable_keys:
+            values[key] = copy.deepcopy(values[key])
+        return values
+
+    def invalidate(self, project_id: int) -> None:
+        with self._lock:
+            self._entries.pop(project_id, None)
+            self._generations[project_id] = self._generations.get(project_id, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._entries), "ttl_sec": self._ttl_sec(), "hits": self.hits, "misses": self.misses}
+
+
+project_globals = GlobalsCache()
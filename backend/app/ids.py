@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+
+CROCKFORD_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+RANDOM_BITS = 80
+RANDOM_MAX = (1 << RANDOM_BITS) - 1
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, remainder = divmod(value, 32)
+        chars.append(CROCKFORD_BASE32[remainder])
+    return "".join(reversed(chars))
+
+
+class UlidGenerator:
+    """
+    单调递增的 ULID 生成器：48 位毫秒时间戳 + 80 位随机数，Crockford base32 编码为 26 个字符。
+
+    同一毫秒内（或时钟回拨时）沿用上一个时间戳并把随机部分加 1，同一进程内生成的 id 严格递增；
+    不同进程之间依靠 80 位随机数避免冲突，不需要访问数据库。
+    """
+
+    def __init__(self, clock=time.time, randbits=None):
+        self._clock = clock
+        self._randbits = randbits or (lambda bits: int.from_bytes(os.urandom(bits // 8), "big"))
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new(self) -> str:
+        with self._lock:
+            now_ms = int(self._clock() * 1000)
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = self._randbits(RANDOM_BITS)
+            elif self._last_random < RANDOM_MAX:
+                self._last_random += 1
+            else:
+                # 随机部分溢出，借用下一毫秒
+                self._last_ms += 1
+                self._last_random = self._randbits(RANDOM_BITS)
+            return _encode(self._last_ms, 10) + _encode(self._last_random, 16)
+
+
+_generator = UlidGenerator()
+
+
+def new_ulid() -> str:
+    return _generator.new()
+
+
+def new_execution_id() -> str:
+    """``exec_<ULID>``：按创建时间排序，并发创建也不会冲突。"""
+    return f"exec_{new_ulid()}"
+
+
+def new_batch_id() -> str:
+    return f"batch_{new_ulid()}"
+
+
+def safe_name(execution_id: str) -> str:
+    """执行 id 转为可直接用作目录名的字符串（外置载荷、shell 输出落盘共用）。"""
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in execution_id)
@@ -1,36 +1,50 @@
 from __future__ import annotations
 
+import base64
 import json
+from dataclasses import dataclass
 from time import perf_counter
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import FileResponse
+from anyio import to_thread
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from loguru import logger
-from sqlmodel import SQLModel
+from sqlmodel import Session, SQLModel
 
-from .db import get_engine
+from .batch import BatchRunner
+from .config import get_app_config
+from .db import app_pool_stats, cap_execution_concurrency, get_engine
 from .engine import RuleEngine
 from .logger import configure_logging
+from .metrics import registry as metrics_registry
 from .models import (
     Connector,
     ConnectorCreate,
     ConnectorUpdate,
     DataReadRequest,
     DataWriteRequest,
+    Edge,
     GlobalVar,
     GlobalVarUpsert,
     Node,
     Project,
     ProjectCreate,
     ProjectUpdate,
+    RetentionPolicy,
+    RetentionPolicyUpsert,
     Rule,
     RuleCreate,
     RuleUpdate,
 )
-from .storage import Storage
+from .payloads import get_payload_codec
+from .pools import pool_stats
+from .python_runner import shutdown_python_pool
+from .storage import Storage, get_storage
+from .template import TemplateRenderer
+from .tracing import get_tracer
 
 
 app = FastAPI(title="DB Scenario Pro", version="0.2.0")
@@ -50,7 +64,7 @@ def _to_project(model) -> Project:
     )
 
 
-def _to_rule(model, steps=None) -> Rule:
+def _to_rule(model, steps=None, edges=None) -> Rule:
     return Rule(
         id=model.id,
         project_id=model.project_id,
@@ -59,6 +73,7 @@ def _to_rule(model, steps=None) -> Rule:
         created_at=model.created_at,
         updated_at=model.updated_at,
         steps=steps or [],
+        edges=edges or [],
     )
 
 
@@ -72,6 +87,29 @@ def _to_node(model) -> Node:
     )
 
 
+def _to_edge(model) -> Edge:
+    return Edge(source=model.source_node, target=model.target_node, condition=model.condition)
+
+
+def _replace_rule_graph(storage: Storage, rule_id: int, payload: dict[str, Any]):
+    steps = payload.get("steps", [])
+    if not isinstance(steps, list):
+        raise HTTPException(status_code=422, detail="steps must be list")
+    edges = payload.get("edges")
+    if edges is not None:
+        if not isinstance(edges, list) or not all(isinstance(e, dict) for e in edges):
+            raise HTTPException(status_code=422, detail="edges must be list of objects")
+        node_ids = {step.get("node_id") for step in steps}
+        for edge in edges:
+            source = edge.get("source_node") or edge.get("source")
+            target = edge.get("target_node") or edge.get("target")
+            if source not in node_ids or target not in node_ids:
+                raise HTTPException(status_code=422, detail=f"edge references unknown node: {source} -> {target}")
+    storage.replace_nodes(rule_id, steps)
+    if edges is not None:
+        storage.replace_edges(rule_id, edges)
+
+
 def _to_connector(model) -> Connector:
     return Connector(
         id=model.id,
@@ -87,12 +125,91 @@ def _get_default_project_id(storage: Storage) -> int:
     return storage.ensure_default_project().id
 
 
+EXECUTION_PAGE_DEFAULT_LIMIT = 50
+EXECUTION_PAGE_MAX_LIMIT = 500
+EXECUTION_LIST_FIELDS = (
+    "execution_id",
+    "project_id",
+    "rule_id",
+    "batch_id",
+    "started_at",
+    "run_started_at",
+    "completed_at",
+    "status",
+    "variables",
+    "result_summary",
+)
+EXECUTION_LIST_DEFAULT_FIELDS = tuple(field for field in EXECUTION_LIST_FIELDS if field != "variables")
+
+
+@dataclass
+class ExecutionPageQuery:
+    """执行历史列表的查询参数：游标分页、状态/时间过滤与字段投影。"""
+
+    cursor: str | None = None
+    limit: int = Query(EXECUTION_PAGE_DEFAULT_LIMIT, ge=1, le=EXECUTION_PAGE_MAX_LIMIT)
+    status: str | None = Query(None, description="逗号分隔的状态列表")
+    started_after: str | None = Query(None, description="started_at 下界（含），ISO 时间")
+    started_before: str | None = Query(None, description="started_at 上界（不含），ISO 时间")
+    fields: str | None = Query(None, description="逗号分隔的返回字段，默认不含 variables")
+
+
+def _encode_cursor(record) -> str:
+    raw = json.dumps([record.started_at, record.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        started_at, record_id = json.loads(raw)
+        if not isinstance(started_at, str) or not isinstance(record_id, int):
+            raise ValueError(cursor)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=422, detail="invalid cursor") from None
+    return started_at, record_id
+
+
+def _split_csv(value: str | None) -> list[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def _execution_page(storage: Storage, project_id: int, rule_id: int | None, query: ExecutionPageQuery) -> dict[str, Any]:
+    fields = _split_csv(query.fields) or list(EXECUTION_LIST_DEFAULT_FIELDS)
+    unknown = [field for field in fields if field not in EXECUTION_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"unknown fields: {', '.join(unknown)}")
+    records = storage.list_executions(
+        project_id,
+        rule_id,
+        statuses=_split_csv(query.status) or None,
+        started_after=query.started_after,
+        started_before=query.started_before,
+        before=_decode_cursor(query.cursor) if query.cursor else None,
+        limit=query.limit + 1,
+        with_variables="variables" in fields,
+    )
+    has_more = len(records) > query.limit
+    records = records[: query.limit]
+    items = []
+    for record in records:
+        item = {field: getattr(record, field) for field in fields if field != "variables"}
+        if "variables" in fields:
+            item["variables"] = json.loads(record.variables or "{}")
+        items.append(item)
+    return {"items": items, "next_cursor": _encode_cursor(records[-1]) if has_more else None}
+
+
 @app.on_event("startup")
 def on_startup():
     configure_logging()
+    # 配置错误（未知压缩算法、缺少 zstandard、未知 tracing exporter）在启动时暴露，
+    # 而不是在第一次写入大步骤时失败，或让 log_requests 中的 get_tracer() 使每个请求返回 500
+    get_payload_codec()
+    get_tracer()
     engine = get_engine()
     SQLModel.metadata.create_all(bind=engine)
-    storage = Storage()
+    storage = Storage(Session(engine))
     try:
         default_project = storage.ensure_default_project()
         logger.info("startup completed, default project id={}", default_project.id)
@@ -100,28 +217,61 @@ def on_startup():
         storage.close()
 
 
+@app.on_event("startup")
+async def configure_threadpool():
+    # 处理函数均为同步 def，由 FastAPI 放到 anyio 线程池执行，不阻塞事件循环；线程数即并发处理上限，
+    # 与 worker 一样按平台库连接池容量截断，避免请求线程在连接池上排队直至 pool_timeout
+    config = get_app_config()
+    threads = cap_execution_concurrency(config.api_threadpool_size, config)
+    if threads < config.api_threadpool_size:
+        logger.warning("api threadpool capped {} -> {} by database pool capacity", config.api_threadpool_size, threads)
+    to_thread.current_default_thread_limiter().total_tokens = threads
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    shutdown_python_pool()
+    get_tracer().shutdown()
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
+    """请求日志；开启 tracing 时请求是 trace 的根 span，日志与响应头 ``X-Trace-Id`` 带上 trace_id，可据此找到执行与节点的 span。"""
+    tracer = get_tracer()
+    request_span = tracer.start_span("http.request", method=request.method, path=request.url.path)
+    trace_id = request_span.trace_id if request_span is not None else None
     start = perf_counter()
     try:
         response = await call_next(request)
-    except Exception:
+    except Exception as exc:
         duration_ms = (perf_counter() - start) * 1000
-        logger.exception("request failed method={} path={} duration_ms={:.2f}", request.method, request.url.path, duration_ms)
+        logger.exception(
+            "request failed method={} path={} duration_ms={:.2f} trace_id={}", request.method, request.url.path, duration_ms, trace_id
+        )
+        if request_span is not None:
+            request_span.set_error(f"{type(exc).__name__}: {exc}")
+        tracer.end_span(request_span)
         raise
     duration_ms = (perf_counter() - start) * 1000
     logger.info(
-        "request method={} path={} status={} duration_ms={:.2f}",
+        "request method={} path={} status={} duration_ms={:.2f} trace_id={}",
         request.method,
         request.url.path,
         response.status_code,
         duration_ms,
+        trace_id,
     )
+    if request_span is not None:
+        request_span.set_attribute("status_code", response.status_code)
+        if response.status_code >= 500:
+            request_span.status = "error"
+        response.headers["X-Trace-Id"] = trace_id
+    tracer.end_span(request_span)
     return response
 
 
 @app.post("/api/test-connection")
-async def test_connection(payload: dict[str, Any]):
+def test_connection(payload: dict[str, Any]):
     conn_type = payload.get("type")
     dsn = payload.get("dsn")
 
@@ -148,7 +298,7 @@ async def test_connection(payload: dict[str, Any]):
 
 
 @app.get("/")
-async def index():
+def index():
     index_path = _static_dir / "index.html"
     if index_path.exists():
         return FileResponse(str(index_path))
@@ -157,208 +307,285 @@ async def index():
 
 # ===== Projects =====
 @app.post("/api/projects", response_model=Project)
-async def create_project(req: ProjectCreate):
-    storage = Storage()
-    try:
-        existing = storage.get_project_by_name(req.name)
-        if existing:
-            raise HTTPException(status_code=409, detail="Project already exists")
-        return _to_project(storage.create_project(req.name, req.description))
-    finally:
-        storage.close()
+def create_project(req: ProjectCreate, storage: Storage = Depends(get_storage)):
+    existing = storage.get_project_by_name(req.name)
+    if existing:
+        raise HTTPException(status_code=409, detail="Project already exists")
+    return _to_project(storage.create_project(req.name, req.description))
 
 
 @app.get("/api/projects", response_model=list[Project])
-async def list_projects():
-    storage = Storage()
-    try:
-        return [_to_project(p) for p in storage.list_projects()]
-    finally:
-        storage.close()
+def list_projects(storage: Storage = Depends(get_storage)):
+    return [_to_project(p) for p in storage.list_projects()]
 
 
 @app.get("/api/projects/{project_id}", response_model=Project)
-async def get_project(project_id: int):
-    storage = Storage()
-    try:
-        project = storage.get_project(project_id)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        return _to_project(project)
-    finally:
-        storage.close()
+def get_project(project_id: int, storage: Storage = Depends(get_storage)):
+    project = storage.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return _to_project(project)
 
 
 @app.put("/api/projects/{project_id}", response_model=Project)
-async def update_project(project_id: int, req: ProjectUpdate):
-    storage = Storage()
-    try:
-        project = storage.update_project(project_id, req.name, req.description)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-        return _to_project(project)
-    finally:
-        storage.close()
+def update_project(project_id: int, req: ProjectUpdate, storage: Storage = Depends(get_storage)):
+    project = storage.update_project(project_id, req.name, req.description)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return _to_project(project)
 
 
 @app.delete("/api/projects/{project_id}")
-async def delete_project(project_id: int):
-    storage = Storage()
-    try:
-        ok = storage.delete_project(project_id)
-        if not ok:
-            raise HTTPException(status_code=404, detail="Project not found")
-        return {"deleted": True}
-    finally:
-        storage.close()
+def delete_project(project_id: int, storage: Storage = Depends(get_storage)):
+    ok = storage.delete_project(project_id)
+    if not ok:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return {"deleted": True}
 
 
 # ===== Project-scoped Rules =====
 @app.post("/api/projects/{project_id}/rules", response_model=Rule)
-async def create_rule(project_id: int, req: RuleCreate):
-    storage = Storage()
-    try:
-        if not storage.get_project(project_id):
-            raise HTTPException(status_code=404, detail="Project not found")
-        return _to_rule(storage.create_rule(project_id, req.name, req.description))
-    finally:
-        storage.close()
+def create_rule(project_id: int, req: RuleCreate, storage: Storage = Depends(get_storage)):
+    if not storage.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return _to_rule(storage.create_rule(project_id, req.name, req.description))
 
 
 @app.get("/api/projects/{project_id}/rules", response_model=list[Rule])
-async def list_rules(project_id: int):
-    storage = Storage()
-    try:
-        if not storage.get_project(project_id):
-            raise HTTPException(status_code=404, detail="Project not found")
-        return [_to_rule(r) for r in storage.list_rules(project_id)]
-    finally:
-        storage.close()
+def list_rules(project_id: int, storage: Storage = Depends(get_storage)):
+    if not storage.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return [_to_rule(r) for r in storage.list_rules(project_id)]
 
 
 @app.get("/api/projects/{project_id}/rules/{rule_id}", response_model=Rule)
-async def get_rule(project_id: int, rule_id: int):
-    storage = Storage()
-    try:
-        rule = storage.get_rule(project_id, rule_id)
-        if not rule:
-            raise HTTPException(status_code=404, detail="Rule not found")
-        steps = [_to_node(n) for n in storage.list_nodes(rule_id)]
-        return _to_rule(rule, steps=steps)
-    finally:
-        storage.close()
+def get_rule(project_id: int, rule_id: int, storage: Storage = Depends(get_storage)):
+    rule = storage.get_rule(project_id, rule_id)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    steps = [_to_node(n) for n in storage.list_nodes(rule_id)]
+    edges = [_to_edge(e) for e in storage.list_edges(rule_id)]
+    return _to_rule(rule, steps=steps, edges=edges)
 
 
 @app.put("/api/projects/{project_id}/rules/{rule_id}", response_model=Rule)
-async def update_rule(project_id: int, rule_id: int, req: RuleUpdate):
-    storage = Storage()
-    try:
-        rule = storage.update_rule(project_id, rule_id, req.name, req.description)
-        if not rule:
-            raise HTTPException(status_code=404, detail="Rule not found")
-        return _to_rule(rule)
-    finally:
-        storage.close()
+def update_rule(project_id: int, rule_id: int, req: RuleUpdate, storage: Storage = Depends(get_storage)):
+    rule = storage.update_rule(project_id, rule_id, req.name, req.description)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    return _to_rule(rule)
 
 
 @app.delete("/api/projects/{project_id}/rules/{rule_id}")
-async def delete_rule(project_id: int, rule_id: int):
-    storage = Storage()
-    try:
-        ok = storage.delete_rule(project_id, rule_id)
-        if not ok:
-            raise HTTPException(status_code=404, detail="Rule not found")
-        return {"deleted": True}
-    finally:
-        storage.close()
+def delete_rule(project_id: int, rule_id: int, storage: Storage = Depends(get_storage)):
+    ok = storage.delete_rule(project_id, rule_id)
+    if not ok:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    return {"deleted": True}
 
 
 @app.put("/api/projects/{project_id}/rules/{rule_id}/steps")
-async def replace_rule_steps(project_id: int, rule_id: int, payload: dict[str, Any]):
-    storage = Storage()
-    try:
-        rule = storage.get_rule(project_id, rule_id)
-        if not rule:
-            raise HTTPException(status_code=404, detail="Rule not found")
-        steps = payload.get("steps", [])
-        if not isinstance(steps, list):
-            raise HTTPException(status_code=422, detail="steps must be list")
-        storage.replace_nodes(rule_id, steps)
-        return {"updated": True}
-    finally:
-        storage.close()
+def replace_rule_steps(project_id: int, rule_id: int, payload: dict[str, Any], storage: Storage = Depends(get_storage)):
+    rule = storage.get_rule(project_id, rule_id)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    _replace_rule_graph(storage, rule_id, payload)
+    return {"updated": True}
 
 
 # ===== Project-scoped Globals =====
 @app.get("/api/projects/{project_id}/globals", response_model=list[GlobalVar])
-async def list_globals(project_id: int):
-    storage = Storage()
-    try:
-        if not storage.get_project(project_id):
-            raise HTTPException(status_code=404, detail="Project not found")
-        records = storage.list_globals(project_id)
-        return [GlobalVar(project_id=r.project_id, key=r.key, value=r.value, type=r.type, description=r.description) for r in records]
-    finally:
-        storage.close()
+def list_globals(project_id: int, storage: Storage = Depends(get_storage)):
+    if not storage.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    records = storage.list_globals(project_id)
+    return [GlobalVar(project_id=r.project_id, key=r.key, value=r.value, type=r.type, description=r.description) for r in records]
 
 
 @app.post("/api/projects/{project_id}/globals", response_model=GlobalVar)
-async def upsert_global(project_id: int, req: GlobalVarUpsert):
-    storage = Storage()
-    try:
-        if not storage.get_project(project_id):
-            raise HTTPException(status_code=404, detail="Project not found")
-        record = storage.upsert_global(project_id, req.key, req.value, req.type, req.description)
-        return GlobalVar(
-            project_id=record.project_id,
-            key=record.key,
-            value=record.value,
-            type=record.type,
-            description=record.description,
-        )
-    finally:
-        storage.close()
+def upsert_global(project_id: int, req: GlobalVarUpsert, storage: Storage = Depends(get_storage)):
+    if not storage.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    record = storage.upsert_global(project_id, req.key, req.value, req.type, req.description)
+    return GlobalVar(
+        project_id=record.project_id,
+        key=record.key,
+        value=record.value,
+        type=record.type,
+        description=record.description,
+    )
 
 
 @app.delete("/api/projects/{project_id}/globals/{key}")
-async def delete_global(project_id: int, key: str):
-    storage = Storage()
-    try:
-        ok = storage.delete_global(project_id, key)
-        if not ok:
-            raise HTTPException(status_code=404, detail="Global not found")
-        return {"deleted": True}
-    finally:
-        storage.close()
+def delete_global(project_id: int, key: str, storage: Storage = Depends(get_storage)):
+    ok = storage.delete_global(project_id, key)
+    if not ok:
+        raise HTTPException(status_code=404, detail="Global not found")
+    return {"deleted": True}
+
+
+# ===== Retention =====
+def _to_retention_policy(model) -> RetentionPolicy:
+    return RetentionPolicy(
+        project_id=model.project_id,
+        rule_id=model.rule_id,
+        keep_executions=model.keep_executions,
+        keep_days=model.keep_days,
+        compact_stored_data=model.compact_stored_data,
+        updated_at=model.updated_at,
+    )
+
+
+@app.get("/api/projects/{project_id}/retention", response_model=list[RetentionPolicy])
+def list_retention_policies(project_id: int, storage: Storage = Depends(get_storage)):
+    if not storage.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return [_to_retention_policy(p) for p in storage.list_retention_policies(project_id)]
+
+
+@app.put("/api/projects/{project_id}/retention", response_model=RetentionPolicy)
+def upsert_project_retention(project_id: int, req: RetentionPolicyUpsert, storage: Storage = Depends(get_storage)):
+    if not storage.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    policy = storage.upsert_retention_policy(project_id, 0, req.keep_executions, req.keep_days, req.compact_stored_data)
+    return _to_retention_policy(policy)
+
+
+@app.put("/api/projects/{project_id}/rules/{rule_id}/retention", response_model=RetentionPolicy)
+def upsert_rule_retention(
+    project_id: int, rule_id: int, req: RetentionPolicyUpsert, storage: Storage = Depends(get_storage)
+):
+    if not storage.get_rule(project_id, rule_id):
+        raise HTTPException(status_code=404, detail="Rule not found")
+    policy = storage.upsert_retention_policy(
+        project_id, rule_id, req.keep_executions, req.keep_days, req.compact_stored_data
+    )
+    return _to_retention_policy(policy)
+
+
+@app.delete("/api/projects/{project_id}/retention")
+def delete_project_retention(project_id: int, storage: Storage = Depends(get_storage)):
+    if not storage.delete_retention_policy(project_id, 0):
+        raise HTTPException(status_code=404, detail="Retention policy not found")
+    return {"deleted": True}
+
+
+@app.delete("/api/projects/{project_id}/rules/{rule_id}/retention")
+def delete_rule_retention(project_id: int, rule_id: int, storage: Storage = Depends(get_storage)):
+    if not storage.delete_retention_policy(project_id, rule_id):
+        raise HTTPException(status_code=404, detail="Retention policy not found")
+    return {"deleted": True}
 
 
 # ===== Execute =====
 @app.post("/api/execute")
-async def execute_rule(payload: dict[str, Any]):
-    storage = Storage()
-    try:
-        project_id = payload.get("project_id")
-        if project_id is None:
-            project_id = _get_default_project_id(storage)
-        rule_id = payload.get("rule_id")
-        variables = payload.get("variables", {})
-
-        if rule_id is None:
-            raise HTTPException(status_code=422, detail="rule_id is required")
-        if not isinstance(variables, dict):
-            raise HTTPException(status_code=422, detail="variables must be object")
-
-        rule = storage.get_rule(project_id, int(rule_id))
-        if not rule:
-            raise HTTPException(status_code=404, detail="Rule not found in project")
-        engine = RuleEngine(storage)
-        return engine.execute_rule(project_id, int(rule_id), variables)
-    finally:
-        storage.close()
+def execute_rule(payload: dict[str, Any], storage: Storage = Depends(get_storage)):
+    project_id = payload.get("project_id")
+    if project_id is None:
+        project_id = _get_default_project_id(storage)
+    rule_id = payload.get("rule_id")
+    variables = payload.get("variables", {})
+
+    if rule_id is None:
+        raise HTTPException(status_code=422, detail="rule_id is required")
+    if not isinstance(variables, dict):
+        raise HTTPException(status_code=422, detail="variables must be object")
+
+    mode = payload.get("mode", "sync")
+    if mode not in {"sync", "async"}:
+        raise HTTPException(status_code=422, detail="mode must be sync or async")
+
+    rule = storage.get_rule(project_id, int(rule_id))
+    if not rule:
+        raise HTTPException(status_code=404, detail="Rule not found in project")
+    if mode == "async":
+        execution = storage.enqueue_execution(
+            project_id, int(rule_id), variables, max_attempts=get_app_config().worker_max_attempts
+        )
+        return {"execution_id": execution.execution_id, "status": execution.status}
+    engine = RuleEngine(storage)
+    return engine.execute_rule(project_id, int(rule_id), variables)
+
+
+@app.post("/api/execute/batch")
+def execute_batch(payload: dict[str, Any], background_tasks: BackgroundTasks, storage: Storage = Depends(get_storage)):
+    config = get_app_config()
+    project_id = payload.get("project_id")
+    if project_id is None:
+        project_id = _get_default_project_id(storage)
+    rule_id = payload.get("rule_id")
+    variables_list = payload.get("variables_list")
+    concurrency = payload.get("concurrency", config.batch_max_concurrency)
+    # 默认写入 job_queue 由 worker 执行，API 进程重启不会丢失；sync 在本进程后台线程中执行，不可恢复
+    mode = payload.get("mode", "async")
+
+    if rule_id is None:
+        raise HTTPException(status_code=422, detail="rule_id is required")
+    if not isinstance(variables_list, list) or not variables_list:
+        raise HTTPException(status_code=422, detail="variables_list must be a non-empty array")
+    if not all(isinstance(variables, dict) for variables in variables_list):
+        raise HTTPException(status_code=422, detail="variables_list items must be objects")
+    if len(variables_list) > config.batch_max_items:
+        raise HTTPException(status_code=422, detail=f"variables_list exceeds {config.batch_max_items} items")
+    if not isinstance(concurrency, int) or concurrency < 1:
+        raise HTTPException(status_code=422, detail="concurrency must be a positive integer")
+    if mode not in {"sync", "async"}:
+        raise HTTPException(status_code=422, detail="mode must be sync or async")
+
+    rule = storage.get_rule(project_id, int(rule_id))
+    if not rule:
+        raise HTTPException(status_code=404, detail="Rule not found in project")
+    batch = storage.create_batch(
+        project_id,
+        int(rule_id),
+        variables_list,
+        concurrency=cap_execution_concurrency(min(concurrency, config.batch_max_concurrency), config),
+        enqueue=mode == "async",
+        max_attempts=config.worker_max_attempts,
+    )
+    if mode == "sync":
+        background_tasks.add_task(BatchRunner().run, batch.batch_id)
+    return {"batch_id": batch.batch_id, "total": batch.total, "concurrency": batch.concurrency, "status": batch.status}
+
+
+@app.get("/api/batches/{batch_id}")
+def get_batch(batch_id: str, include_items: bool = True, storage: Storage = Depends(get_storage)):
+    batch = storage.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    counts = storage.count_batch_statuses(batch_id)
+    # async 模式由 worker 执行，批次状态按各执行的状态推导
+    pending = counts.get("queued", 0) + counts.get("running", 0)
+    status = batch.status if batch.status != "running" or pending else "completed"
+    result: dict[str, Any] = {
+        "batch_id": batch.batch_id,
+        "project_id": batch.project_id,
+        "rule_id": batch.rule_id,
+        "status": status,
+        "total": batch.total,
+        "concurrency": batch.concurrency,
+        "counts": counts,
+        "created_at": batch.created_at,
+        "completed_at": batch.completed_at,
+    }
+    if include_items:
+        result["items"] = [
+            {
+                "execution_id": r.execution_id,
+                "status": r.status,
+                "variables": json.loads(r.variables or "{}"),
+                "result_summary": r.result_summary,
+                "started_at": r.started_at,
+                "run_started_at": r.run_started_at,
+                "completed_at": r.completed_at,
+            }
+            for r in storage.list_batch_executions(batch_id)
+        ]
+    return result
 
 
 @app.post("/api/node-test")
-async def test_node(payload: dict[str, Any]):
+def test_node(payload: dict[str, Any], storage: Storage = Depends(get_storage)):
     node = payload.get("node")
     variables = payload.get("variables", {})
 
@@ -372,51 +599,32 @@ async def test_node(payload: dict[str, Any]):
     if not isinstance(config, dict):
         raise HTTPException(status_code=422, detail="node.config must be object")
 
-    from .engine import RuleEngine
+    from .engine import NODE_EXECUTORS, RuleEngine
     from .models import ExecutionContext, NodeOutput
 
-    storage = Storage()
-    try:
-        project_id = payload.get("project_id")
-        if project_id is None:
-            project_id = _get_default_project_id(storage)
-
-        node_id = node.get("id", "test-node")
-        rule_id = payload.get("rule_id", 0)
-
-        # 从 DB 加载已有 store 数据，再用 payload.store 覆盖
-        db_store = storage.load_latest_store_snapshot(project_id, rule_id)
-        db_store.update(payload.get("store", {}))
-
-        ctx = ExecutionContext(
-            project_id=project_id,
-            rule_id=rule_id,
-            execution_id="test",
-            vars=dict(variables),
-            store=db_store,
-        )
-        engine = RuleEngine(storage)
-        try:
-            if action_type in {"sql", "mysql"}:
-                output = engine._execute_sql_node(project_id, node_id, config, ctx)
-            elif action_type == "redis":
-                output = engine._execute_redis_node(project_id, node_id, config, ctx)
-            elif action_type == "log":
-                output = engine._execute_log_node(node_id, config, ctx)
-            elif action_type == "store":
-                output = engine._execute_store_node(project_id, rule_id, node_id, config, ctx)
-            elif action_type == "load":
-                output = engine._execute_load_node(project_id, rule_id, node_id, config, ctx)
-            elif action_type == "python":
-                output = engine._execute_python_node(node_id, config, ctx)
-            elif action_type == "shell":
-                output = engine._execute_shell_node(node_id, config, ctx)
-            else:
-                output = NodeOutput(node_id=node_id, node_type=str(action_type), status="error", error=f"unsupported node type: {action_type}")
-        except Exception as exc:
-            output = NodeOutput(node_id=node_id, node_type=str(action_type), status="error", error=str(exc))
-    finally:
-        storage.close()
+    project_id = payload.get("project_id")
+    if project_id is None:
+        project_id = _get_default_project_id(storage)
+
+    node_id = node.get("id", "test-node")
+    rule_id = payload.get("rule_id", 0)
+
+    # 从 DB 加载已有 store 数据，再用 payload.store 覆盖
+    db_store = storage.load_latest_store_snapshot(project_id, rule_id)
+    db_store.update(payload.get("store", {}))
+
+    ctx = ExecutionContext(
+        project_id=project_id,
+        rule_id=rule_id,
+        execution_id="test",
+        vars=dict(variables),
+        store=db_store,
+    )
+    engine = RuleEngine(storage)
+    if action_type in NODE_EXECUTORS:
+        output = engine._run_node(project_id, rule_id, node_id, action_type, config, ctx)
+    else:
+        output = NodeOutput(node_id=node_id, node_type=str(action_type), status="error", error=f"unsupported node type: {action_type}")
 
     rendered = None
     if action_type == "redis" and output.metadata:
@@ -436,357 +644,362 @@ async def test_node(payload: dict[str, Any]):
 
 
 @app.get("/api/projects/{project_id}/executions/{rule_id}")
-async def list_executions(project_id: int, rule_id: int):
-    storage = Storage()
-    try:
-        records = storage.list_executions(project_id, rule_id)
-        return [
-            {
-                "execution_id": r.execution_id,
-                "project_id": r.project_id,
-                "rule_id": r.rule_id,
-                "started_at": r.started_at,
-                "completed_at": r.completed_at,
-                "status": r.status,
-                "variables": json.loads(r.variables or "{}"),
-                "result_summary": r.result_summary,
-            }
-            for r in records
-        ]
-    finally:
-        storage.close()
+def list_executions(
+    project_id: int,
+    rule_id: int,
+    query: ExecutionPageQuery = Depends(),
+    storage: Storage = Depends(get_storage),
+):
+    return _execution_page(storage, project_id, rule_id, query)
 
 
 @app.get("/api/projects/{project_id}/executions")
-async def list_project_executions(project_id: int):
-    storage = Storage()
-    try:
-        if not storage.get_project(project_id):
-            raise HTTPException(status_code=404, detail="Project not found")
-        records = storage.list_executions(project_id)
-        return [
-            {
-                "execution_id": r.execution_id,
-                "project_id": r.project_id,
-                "rule_id": r.rule_id,
-                "started_at": r.started_at,
-                "completed_at": r.completed_at,
-                "status": r.status,
-                "variables": json.loads(r.variables or "{}"),
-                "result_summary": r.result_summary,
+def list_project_executions(
+    project_id: int, query: ExecutionPageQuery = Depends(), storage: Storage = Depends(get_storage)
+):
+    if not storage.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return _execution_page(storage, project_id, None, query)
+
+
+EXECUTION_DETAIL_FIELDS = (
+    "execution_id",
+    "project_id",
+    "rule_id",
+    "batch_id",
+    "started_at",
+    "run_started_at",
+    "completed_at",
+    "status",
+    "variables",
+    "result_summary",
+    "error",
+)
+EXECUTION_DETAIL_INCLUDES = ("steps", "step_data", "stored")
+
+
+def _execution_header(record, fields: list[str]) -> dict[str, Any]:
+    header: dict[str, Any] = {}
+    for field in fields:
+        if field == "variables":
+            header[field] = json.loads(record.variables or "{}")
+        elif field == "error":
+            header[field] = record.result_summary if record.status == "failed" else None
+        else:
+            header[field] = getattr(record, field)
+    return header
+
+
+def _step_summary(step) -> dict[str, Any]:
+    return {
+        "id": step.id,
+        "node_id": step.node_id,
+        "action_type": step.action_type,
+        "content": step.content,
+        "status": step.status,
+        "output": step.output,
+        "step_data_truncated": step.payload_ref is not None,
+        "step_data_bytes": step.payload_bytes,
+        "started_at": step.started_at,
+        "completed_at": step.completed_at,
+        "timings": json.loads(step.timings) if step.timings else None,
+    }
+
+
+def _iter_execution_detail(
+    storage: Storage, record, fields: list[str], include: set[str]
+) -> Iterator[str]:
+    """逐段输出执行详情 JSON：步骤按批从数据库读取，step_data 已是 JSON 文本，直接拼接而不重新解析。"""
+    members = [f"{json.dumps(key)}:{json.dumps(value, ensure_ascii=False, default=str)}" for key, value in _execution_header(record, fields).items()]
+    yield "{" + ",".join(members)
+    separator = "," if members else ""
+    if "steps" in include or "step_data" in include:
+        yield separator + '"steps":['
+        with_data = "step_data" in include
+        for index, step in enumerate(storage.iter_steps(record.execution_id, with_data=with_data)):
+            item = json.dumps(_step_summary(step), ensure_ascii=False)
+            if with_data:
+                item = f'{item[:-1]},"step_data":{step.step_data or "null"}}}'
+            yield ("," if index else "") + item
+        yield "]"
+        separator = ","
+    if "stored" in include:
+        yield separator + '"stored":['
+        for index, d in enumerate(storage.iter_stored_data(record.execution_id)):
+            item = {
+                "project_id": d.project_id,
+                "rule_id": d.rule_id,
+                "node_id": d.node_id,
+                "key": d.key,
+                "value": d.value,
+                "created_at": d.created_at,
             }
-            for r in records
-        ]
-    finally:
-        storage.close()
+            yield ("," if index else "") + json.dumps(item, ensure_ascii=False)
+        yield "]"
+    yield "}"
 
 
 @app.get("/api/execution/{execution_id}")
-async def get_execution(execution_id: str):
-    storage = Storage()
-    try:
-        record = storage.get_execution(execution_id)
-        if not record:
-            raise HTTPException(status_code=404, detail="Execution not found")
-        steps = storage.list_steps(execution_id)
-        stored = storage.list_stored_data(execution_id)
-        execution_error = record.result_summary if record.status == "failed" else None
-        return {
-            "execution_id": record.execution_id,
-            "project_id": record.project_id,
-            "rule_id": record.rule_id,
-            "started_at": record.started_at,
-            "completed_at": record.completed_at,
-            "status": record.status,
-            "variables": json.loads(record.variables or "{}"),
-            "result_summary": record.result_summary,
-            "error": execution_error,
-            "steps": [
-                {
-                    "node_id": s.node_id,
-                    "action_type": s.action_type,
-                    "content": s.content,
-                    "status": s.status,
-                    "output": s.output,
-                    "step_data": json.loads(s.step_data) if s.step_data else None,
-                    "started_at": s.started_at,
-                    "completed_at": s.completed_at,
-                }
-                for s in steps
-            ],
-            "stored": [
-                {
-                    "project_id": d.project_id,
-                    "rule_id": d.rule_id,
-                    "node_id": d.node_id,
-                    "key": d.key,
-                    "value": d.value,
-                    "created_at": d.created_at,
-                }
-                for d in stored
-            ],
-        }
-    finally:
-        storage.close()
+def get_execution(
+    execution_id: str,
+    fields: str | None = Query(None, description="逗号分隔的执行字段，默认全部"),
+    include: str | None = Query(None, description="逗号分隔：steps（步骤摘要，默认）、step_data、stored"),
+    storage: Storage = Depends(get_storage),
+):
+    selected_fields = _split_csv(fields) or list(EXECUTION_DETAIL_FIELDS)
+    unknown = [field for field in selected_fields if field not in EXECUTION_DETAIL_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"unknown fields: {', '.join(unknown)}")
+    includes = set(_split_csv(include) or ["steps"])
+    unknown = sorted(includes - set(EXECUTION_DETAIL_INCLUDES))
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"unknown include: {', '.join(unknown)}")
+    record = storage.get_execution(execution_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    return StreamingResponse(
+        _iter_execution_detail(storage, record, selected_fields, includes), media_type="application/json"
+    )
+
+
+def _slice_rows(step_data: Any, offset: int, limit: int | None, statement: int | None) -> Any:
+    """按行区间截取步骤输出：SQL 步骤截取各语句的 rows，其他列表型 data 直接截取。"""
+    if not isinstance(step_data, dict):
+        return step_data
+    data = step_data.get("data")
+    end = offset + limit if limit is not None else None
+    if isinstance(data, list) and data and all(isinstance(item, dict) and "index" in item for item in data):
+        sliced = []
+        for item in data:
+            if statement is not None and item.get("index") != statement:
+                continue
+            rows = item.get("rows")
+            if isinstance(rows, list):
+                item = {**item, "rows": rows[offset:end], "rows_offset": offset, "rows_total": len(rows)}
+            sliced.append(item)
+        return {**step_data, "data": sliced}
+    if isinstance(data, list):
+        return {**step_data, "data": data[offset:end], "data_offset": offset, "data_total": len(data)}
+    return step_data
+
+
+@app.get("/api/execution/{execution_id}/steps/{step_id}/data")
+def get_step_data(
+    execution_id: str,
+    step_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int | None = Query(None, ge=1),
+    statement: int | None = Query(None, ge=1, description="只返回第 N 条 SQL 语句的结果"),
+    storage: Storage = Depends(get_storage),
+):
+    step = storage.get_step(execution_id, step_id)
+    if not step:
+        raise HTTPException(status_code=404, detail="Step not found")
+    step_data = storage.load_step_data(step)
+    return {
+        "id": step.id,
+        "execution_id": step.execution_id,
+        "node_id": step.node_id,
+        "step_data": _slice_rows(json.loads(step_data), offset, limit, statement) if step_data else None,
+    }
 
 
 # ===== Connectors =====
 @app.get("/api/projects/{project_id}/connectors", response_model=list[Connector])
-async def list_connectors(project_id: int):
-    storage = Storage()
-    try:
-        if not storage.get_project(project_id):
-            raise HTTPException(status_code=404, detail="Project not found")
-        return [_to_connector(c) for c in storage.list_connectors(project_id)]
-    finally:
-        storage.close()
+def list_connectors(project_id: int, storage: Storage = Depends(get_storage)):
+    if not storage.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return [_to_connector(c) for c in storage.list_connectors(project_id)]
 
 
 @app.post("/api/projects/{project_id}/connectors", response_model=Connector)
-async def create_connector(project_id: int, req: ConnectorCreate):
-    storage = Storage()
-    try:
-        if not storage.get_project(project_id):
-            raise HTTPException(status_code=404, detail="Project not found")
-        if req.type not in {"mysql", "redis"}:
-            raise HTTPException(status_code=422, detail="connector type must be mysql or redis")
-        created = storage.create_connector(
-            project_id=project_id,
-            name=req.name,
-            connector_type=req.type,
-            config_encrypted=json.dumps(req.config, ensure_ascii=True),
-        )
-        return _to_connector(created)
-    finally:
-        storage.close()
+def create_connector(project_id: int, req: ConnectorCreate, storage: Storage = Depends(get_storage)):
+    if not storage.get_project(project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    if req.type not in {"mysql", "redis"}:
+        raise HTTPException(status_code=422, detail="connector type must be mysql or redis")
+    created = storage.create_connector(
+        project_id=project_id,
+        name=req.name,
+        connector_type=req.type,
+        config_encrypted=json.dumps(req.config, ensure_ascii=True),
+    )
+    return _to_connector(created)
 
 
 @app.put("/api/projects/{project_id}/connectors/{connector_id}", response_model=Connector)
-async def update_connector(project_id: int, connector_id: int, req: ConnectorUpdate):
-    storage = Storage()
-    try:
-        updated = storage.update_connector(
-            project_id=project_id,
-            connector_id=connector_id,
-            name=req.name,
-            config_encrypted=json.dumps(req.config, ensure_ascii=True) if req.config is not None else None,
-        )
-        if not updated:
-            raise HTTPException(status_code=404, detail="Connector not found")
-        return _to_connector(updated)
-    finally:
-        storage.close()
+def update_connector(project_id: int, connector_id: int, req: ConnectorUpdate, storage: Storage = Depends(get_storage)):
+    updated = storage.update_connector(
+        project_id=project_id,
+        connector_id=connector_id,
+        name=req.name,
+        config_encrypted=json.dumps(req.config, ensure_ascii=True) if req.config is not None else None,
+    )
+    if not updated:
+        raise HTTPException(status_code=404, detail="Connector not found")
+    return _to_connector(updated)
 
 
 @app.delete("/api/projects/{project_id}/connectors/{connector_id}")
-async def delete_connector(project_id: int, connector_id: int):
-    storage = Storage()
-    try:
-        ok = storage.delete_connector(project_id, connector_id)
-        if not ok:
-            raise HTTPException(status_code=404, detail="Connector not found")
-        return {"deleted": True}
-    finally:
-        storage.close()
+def delete_connector(project_id: int, connector_id: int, storage: Storage = Depends(get_storage)):
+    ok = storage.delete_connector(project_id, connector_id)
+    if not ok:
+        raise HTTPException(status_code=404, detail="Connector not found")
+    return {"deleted": True}
+
+
+@app.get("/api/pool-stats")
+def get_pool_stats():
+    return {"app_db": app_pool_stats(), **pool_stats()}
+
+
+@app.get("/api/template-cache-stats")
+def get_template_cache_stats():
+    return TemplateRenderer.cache_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus 文本格式指标，进程内采集，不依赖外部 collector。"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 
 # ===== Data I/O =====
 @app.post("/api/data/write")
-async def write_data(req: DataWriteRequest):
-    storage = Storage()
-    try:
-        if req.scope not in {"project", "rule"}:
-            raise HTTPException(status_code=422, detail="scope must be project or rule")
-        if not storage.get_project(req.project_id):
-            raise HTTPException(status_code=404, detail="Project not found")
-        record = storage.store_data(
-            project_id=req.project_id,
-            rule_id=req.rule_id,
-            execution_id=req.execution_id or "manual",
-            node_id=req.node_id or "manual",
-            scope=req.scope,
-            key=req.key,
-            value=json.dumps(req.value, ensure_ascii=True) if not isinstance(req.value, str) else req.value,
-        )
-        return {
-            "id": record.id,
-            "project_id": record.project_id,
-            "rule_id": record.rule_id,
-            "execution_id": record.execution_id,
-            "scope": record.scope,
-            "key": record.key,
-        }
-    finally:
-        storage.close()
+def write_data(req: DataWriteRequest, storage: Storage = Depends(get_storage)):
+    if req.scope not in {"project", "rule"}:
+        raise HTTPException(status_code=422, detail="scope must be project or rule")
+    if not storage.get_project(req.project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    record = storage.store_data(
+        project_id=req.project_id,
+        rule_id=req.rule_id,
+        execution_id=req.execution_id or "manual",
+        node_id=req.node_id or "manual",
+        scope=req.scope,
+        key=req.key,
+        value=json.dumps(req.value, ensure_ascii=True) if not isinstance(req.value, str) else req.value,
+    )
+    return {
+        "id": record.id,
+        "project_id": record.project_id,
+        "rule_id": record.rule_id,
+        "execution_id": record.execution_id,
+        "scope": record.scope,
+        "key": record.key,
+    }
 
 
 @app.post("/api/data/read")
-async def read_data(req: DataReadRequest):
-    storage = Storage()
-    try:
-        if req.scope not in {"project", "rule"}:
-            raise HTTPException(status_code=422, detail="scope must be project or rule")
-        if not storage.get_project(req.project_id):
-            raise HTTPException(status_code=404, detail="Project not found")
-        record = storage.read_latest_stored_data(
-            project_id=req.project_id,
-            rule_id=req.rule_id,
-            scope=req.scope,
-            key=req.key,
-        )
-        if not record:
-            return {"found": False, "value": None}
-        return {
-            "found": True,
-            "project_id": record.project_id,
-            "rule_id": record.rule_id,
-            "execution_id": record.execution_id,
-            "scope": record.scope,
-            "key": record.key,
-            "value": record.value,
-            "created_at": record.created_at,
-        }
-    finally:
-        storage.close()
+def read_data(req: DataReadRequest, storage: Storage = Depends(get_storage)):
+    if req.scope not in {"project", "rule"}:
+        raise HTTPException(status_code=422, detail="scope must be project or rule")
+    if not storage.get_project(req.project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    record = storage.read_latest_stored_data(
+        project_id=req.project_id,
+        rule_id=req.rule_id,
+        scope=req.scope,
+        key=req.key,
+    )
+    if not record:
+        return {"found": False, "value": None}
+    return {
+        "found": True,
+        "project_id": record.project_id,
+        "rule_id": record.rule_id,
+        "execution_id": record.execution_id,
+        "scope": record.scope,
+        "key": record.key,
+        "value": record.value,
+        "created_at": record.created_at,
+    }
 
 
 # ===== Compatibility APIs for existing frontend =====
 @app.post("/api/rules", response_model=Rule)
-async def compat_create_rule(req: RuleCreate):
-    storage = Storage()
-    try:
-        project_id = _get_default_project_id(storage)
-        return _to_rule(storage.create_rule(project_id, req.name, req.description))
-    finally:
-        storage.close()
+def compat_create_rule(req: RuleCreate, storage: Storage = Depends(get_storage)):
+    project_id = _get_default_project_id(storage)
+    return _to_rule(storage.create_rule(project_id, req.name, req.description))
 
 
 @app.get("/api/rules", response_model=list[Rule])
-async def compat_list_rules():
-    storage = Storage()
-    try:
-        project_id = _get_default_project_id(storage)
-        return [_to_rule(r) for r in storage.list_rules(project_id)]
-    finally:
-        storage.close()
+def compat_list_rules(storage: Storage = Depends(get_storage)):
+    project_id = _get_default_project_id(storage)
+    return [_to_rule(r) for r in storage.list_rules(project_id)]
 
 
 @app.get("/api/rules/{rule_id}", response_model=Rule)
-async def compat_get_rule(rule_id: int):
-    storage = Storage()
-    try:
-        project_id = _get_default_project_id(storage)
-        rule = storage.get_rule(project_id, rule_id)
-        if not rule:
-            raise HTTPException(status_code=404, detail="Rule not found")
-        steps = [_to_node(n) for n in storage.list_nodes(rule_id)]
-        return _to_rule(rule, steps=steps)
-    finally:
-        storage.close()
+def compat_get_rule(rule_id: int, storage: Storage = Depends(get_storage)):
+    project_id = _get_default_project_id(storage)
+    rule = storage.get_rule(project_id, rule_id)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    steps = [_to_node(n) for n in storage.list_nodes(rule_id)]
+    edges = [_to_edge(e) for e in storage.list_edges(rule_id)]
+    return _to_rule(rule, steps=steps, edges=edges)
 
 
 @app.put("/api/rules/{rule_id}", response_model=Rule)
-async def compat_update_rule(rule_id: int, req: RuleUpdate):
-    storage = Storage()
-    try:
-        project_id = _get_default_project_id(storage)
-        rule = storage.update_rule(project_id, rule_id, req.name, req.description)
-        if not rule:
-            raise HTTPException(status_code=404, detail="Rule not found")
-        return _to_rule(rule)
-    finally:
-        storage.close()
+def compat_update_rule(rule_id: int, req: RuleUpdate, storage: Storage = Depends(get_storage)):
+    project_id = _get_default_project_id(storage)
+    rule = storage.update_rule(project_id, rule_id, req.name, req.description)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    return _to_rule(rule)
 
 
 @app.delete("/api/rules/{rule_id}")
-async def compat_delete_rule(rule_id: int):
-    storage = Storage()
-    try:
-        project_id = _get_default_project_id(storage)
-        ok = storage.delete_rule(project_id, rule_id)
-        if not ok:
-            raise HTTPException(status_code=404, detail="Rule not found")
-        return {"deleted": True}
-    finally:
-        storage.close()
+def compat_delete_rule(rule_id: int, storage: Storage = Depends(get_storage)):
+    project_id = _get_default_project_id(storage)
+    ok = storage.delete_rule(project_id, rule_id)
+    if not ok:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    return {"deleted": True}
 
 
 @app.put("/api/rules/{rule_id}/steps")
-async def compat_replace_rule_steps(rule_id: int, payload: dict[str, Any]):
-    storage = Storage()
-    try:
-        project_id = _get_default_project_id(storage)
-        rule = storage.get_rule(project_id, rule_id)
-        if not rule:
-            raise HTTPException(status_code=404, detail="Rule not found")
-        steps = payload.get("steps", [])
-        if not isinstance(steps, list):
-            raise HTTPException(status_code=422, detail="steps must be list")
-        storage.replace_nodes(rule_id, steps)
-        return {"updated": True}
-    finally:
-        storage.close()
+def compat_replace_rule_steps(rule_id: int, payload: dict[str, Any], storage: Storage = Depends(get_storage)):
+    project_id = _get_default_project_id(storage)
+    rule = storage.get_rule(project_id, rule_id)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    _replace_rule_graph(storage, rule_id, payload)
+    return {"updated": True}
 
 
 @app.get("/api/globals", response_model=list[GlobalVar])
-async def compat_list_globals():
-    storage = Storage()
-    try:
-        project_id = _get_default_project_id(storage)
-        records = storage.list_globals(project_id)
-        return [GlobalVar(project_id=r.project_id, key=r.key, value=r.value, type=r.type, description=r.description) for r in records]
-    finally:
-        storage.close()
+def compat_list_globals(storage: Storage = Depends(get_storage)):
+    project_id = _get_default_project_id(storage)
+    records = storage.list_globals(project_id)
+    return [GlobalVar(project_id=r.project_id, key=r.key, value=r.value, type=r.type, description=r.description) for r in records]
 
 
 @app.post("/api/globals", response_model=GlobalVar)
-async def compat_upsert_global(req: GlobalVarUpsert):
-    storage = Storage()
-    try:
-        project_id = _get_default_project_id(storage)
-        record = storage.upsert_global(project_id, req.key, req.value, req.type, req.description)
-        return GlobalVar(
-            project_id=record.project_id,
-            key=record.key,
-            value=record.value,
-            type=record.type,
-            description=record.description,
-        )
-    finally:
-        storage.close()
+def compat_upsert_global(req: GlobalVarUpsert, storage: Storage = Depends(get_storage)):
+    project_id = _get_default_project_id(storage)
+    record = storage.upsert_global(project_id, req.key, req.value, req.type, req.description)
+    return GlobalVar(
+        project_id=record.project_id,
+        key=record.key,
+        value=record.value,
+        type=record.type,
+        description=record.description,
+    )
 
 
 @app.delete("/api/globals/{key}")
-async def compat_delete_global(key: str):
-    storage = Storage()
-    try:
-        project_id = _get_default_project_id(storage)
-        ok = storage.delete_global(project_id, key)
-        if not ok:
-            raise HTTPException(status_code=404, detail="Global not found")
-        return {"deleted": True}
-    finally:
-        storage.close()
+def compat_delete_global(key: str, storage: Storage = Depends(get_storage)):
+    project_id = _get_default_project_id(storage)
+    ok = storage.delete_global(project_id, key)
+    if not ok:
+        raise HTTPException(status_code=404, detail="Global not found")
+    return {"deleted": True}
 
 
 @app.get("/api/executions/{rule_id}")
-async def compat_list_executions(rule_id: int):
-    storage = Storage()
-    try:
-        project_id = _get_default_project_id(storage)
-        records = storage.list_executions(project_id, rule_id)
-        return [
-            {
-                "execution_id": r.execution_id,
-                "project_id": r.project_id,
-                "rule_id": r.rule_id,
-                "started_at": r.started_at,
-                "completed_at": r.completed_at,
-                "status": r.status,
-                "variables": json.loads(r.variables or "{}"),
-                "result_summary": r.result_summary,
-            }
-            for r in records
-        ]
-    finally:
-        storage.close()
+def compat_list_executions(
+    rule_id: int, query: ExecutionPageQuery = Depends(), storage: Storage = Depends(get_storage)
+):
+    project_id = _get_default_project_id(storage)
+    return _execution_page(storage, project_id, rule_id, query)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Sequence
+
+
+METRIC_PREFIX = "db_scenario_"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+@dataclass
+class MetricFamily:
+    """一组同名样本，``samples`` 为 ``(后缀, 标签, 值)``，由采集函数在抓取时生成。"""
+
+    name: str
+    type: str
+    help: str
+    samples: list[tuple[str, dict[str, str], float]] = field(default_factory=list)
+
+    def add(self, value: float, suffix: str = "", **labels: str) -> "MetricFamily":
+        self.samples.append((suffix, labels, value))
+        return self
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = METRIC_PREFIX + name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[str]) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(label) for label in labels)
+
+    def collect(self) -> MetricFamily:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """单调递增计数；与 prometheus_client 一致，family 名与样本名都带 ``_total`` 后缀。"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name if name.endswith("_total") else name + "_total", help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.type, self.help)
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                family.add(value, **dict(zip(self.labelnames, key)))
+        return family
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.type, self.help)
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                family.add(value, **dict(zip(self.labelnames, key)))
+        return family
+
+
+class Histogram(_Metric):
+    """固定桶直方图：``observe`` 只做一次二分查找与计数，不保存原始样本。"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每个标签组合：[各桶计数..., +Inf 计数, sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return int(sum(state[:-1])) if state else 0
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.type, self.help)
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, math.inf), state[:-1]):
+                cumulative += count
+                family.add(cumulative, "_bucket", **labels, le=_format_value(bound))
+            family.add(state[-1], "_sum", **labels)
+            family.add(cumulative, "_count", **labels)
+        return family
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class MetricsRegistry:
+    """进程内指标注册表；``collectors`` 在抓取时读取连接池、缓存等已有统计，不在热路径上计数。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Collector] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, collector: Collector) -> Collector:
+        with self._lock:
+            self._collectors.append(collector)
+        return collector
+
+    def collect(self) -> list[MetricFamily]:
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        families = [metric.collect() for metric in metrics]
+        for collector in collectors:
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        """Prometheus 文本格式（0.0.4）。"""
+        lines: list[str] = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {_escape(family.help, help_text=True)}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for suffix, labels, value in family.samples:
+                label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+                name = family.name + suffix
+                lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text else f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str, help_text: bool = False) -> str:
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value if help_text else value.replace('"', '\\"')
+
+
+def _format_value(value: float | None) -> str:
+    if value is None:
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = MetricsRegistry()
+
+execution_duration = registry.histogram(
+    "execution_duration_seconds", "Rule execution wall time", ["status"]
+)
+executions_in_flight = registry.gauge("executions_in_flight", "Rule executions currently running")
+node_duration = registry.histogram("node_duration_seconds", "Node execution wall time", ["node_type"])
+node_status = registry.counter("node_status", "Node executions by final status", ["node_type", "status"])
+step_persist_duration = registry.histogram(
+    "step_persist_seconds", "Step row INSERT time per recorder write (one row, or one buffered batch)", ["recorder"]
+)
+storage_writes = registry.counter("storage_writes", "Platform DB rows written by Storage", ["table"])
+db_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Platform DB connection checkout wait",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
@@ -1,8 +1,10 @@
+from collections import ChainMap
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, List, Literal, Optional
+from types import MappingProxyType
+from typing import Any, List, Literal, Mapping, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class NodeType(str, Enum):
@@ -33,20 +35,29 @@ class ExecutionContext:
     vars: dict[str, Any]
     store: dict[str, Any] = field(default_factory=dict)
     node_outputs: dict[str, NodeOutput] = field(default_factory=dict)
+    _nodes: dict[str, Any] = field(default_factory=dict, init=False, repr=False)
+    _template_vars: ChainMap = field(init=False, repr=False)
+
+    def __post_init__(self):
+        for output in self.node_outputs.values():
+            if output.status == "success":
+                self._nodes[output.node_id] = output.data
+        # 分层视图：{store, nodes} 在上，运行变量在下；均按引用持有，vars/store 需原地修改
+        self._template_vars = ChainMap({"store": self.store, "nodes": MappingProxyType(self._nodes)}, self.vars)
 
     def set_output(self, output: NodeOutput):
         self.node_outputs[output.node_id] = output
+        if output.status == "success":
+            self._nodes[output.node_id] = output.data
+        else:
+            self._nodes.pop(output.node_id, None)
 
-    def to_template_vars(self) -> dict:
-        return {
-            **self.vars,
-            "store": self.store,
-            "nodes": {
-                nid: out.data
-                for nid, out in self.node_outputs.items()
-                if out.status == "success"
-            },
-        }
+    def to_template_vars(self) -> Mapping[str, Any]:
+        """
+        模板变量的只读分层视图，随 set_output / vars / store 的修改实时更新，每次调用不复制任何状态。
+        ``nodes`` 只包含成功节点的输出数据。
+        """
+        return self._template_vars
 
 
 class NodeConfig(BaseModel):
@@ -60,6 +71,14 @@ class NodeConfig(BaseModel):
     assign_to: Optional[str] = None
     store_key: Optional[str] = None
     store_value: Optional[str] = None
+    commands: Optional[List[str]] = None
+    foreach: Optional[str] = None
+    transaction: Optional[bool] = None
+    fail_on_error: Optional[bool] = None
+    max_rows: Optional[int] = None
+    max_output_bytes: Optional[int] = None
+    spill_output: Optional[bool] = None
+    max_bytes: Optional[int] = None
 
 
 class ProjectCreate(BaseModel):
@@ -98,6 +117,12 @@ class Node(BaseModel):
     config: NodeConfig
 
 
+class Edge(BaseModel):
+    source: str
+    target: str
+    condition: Optional[str] = None
+
+
 class Rule(BaseModel):
     id: int
     project_id: int
@@ -106,6 +131,7 @@ class Rule(BaseModel):
     created_at: str
     updated_at: str
     steps: List[Node] = []
+    edges: List[Edge] = []
 
 
 class GlobalVar(BaseModel):
@@ -149,6 +175,21 @@ class Connector(BaseModel):
     updated_at: str
 
 
+class RetentionPolicyUpsert(BaseModel):
+    keep_executions: Optional[int] = Field(default=None, ge=1)
+    keep_days: Optional[int] = Field(default=None, ge=1)
+    compact_stored_data: bool = False
+
+
+class RetentionPolicy(BaseModel):
+    project_id: int
+    rule_id: int
+    keep_executions: Optional[int] = None
+    keep_days: Optional[int] = None
+    compact_stored_data: bool = False
+    updated_at: Optional[str] = None
+
+
 class DataWriteRequest(BaseModel):
     project_id: int
     rule_id: int
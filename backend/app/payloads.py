@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import uuid
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .config import ROOT_DIR, get_app_config
+from .ids import safe_name
+
+
+PREVIEW_MAX_DEPTH = 6
+PAYLOAD_ENCODINGS = ("zlib", "zstd")
+
+
+def compress(data: bytes, encoding: str, level: int = 6) -> bytes:
+    if encoding == "zlib":
+        return zlib.compress(data, level)
+    if encoding == "zstd":
+        import zstandard  # type: ignore[import-not-found]
+
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"unknown payload encoding: {encoding}")
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zlib":
+        return zlib.decompress(data)
+    if encoding == "zstd":
+        import zstandard  # type: ignore[import-not-found]
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"unknown payload encoding: {encoding}")
+
+
+def preview_value(value: Any, max_items: int, max_chars: int, depth: int = 0) -> Any:
+    """截断后的预览：列表只保留前 ``max_items`` 项，字符串只保留前 ``max_chars`` 个字符。"""
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else value[:max_chars] + "…"
+    if depth >= PREVIEW_MAX_DEPTH:
+        return value if isinstance(value, (int, float, bool)) or value is None else "…"
+    if isinstance(value, dict):
+        return {key: preview_value(item, max_items, max_chars, depth + 1) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [preview_value(item, max_items, max_chars, depth + 1) for item in value[:max_items]]
+    return value
+
+
+@dataclass(frozen=True)
+class OffloadedPayload:
+    """超过内联阈值的 step_data：``preview`` 写入步骤行，``data`` 为压缩后的完整内容。"""
+
+    preview: str
+    data: bytes
+    encoding: str
+    size_bytes: int
+
+
+class StepPayloadCodec:
+    """
+    step_data 的落库策略：不超过 ``inline_max_bytes`` 的原样内联；更大的压缩后存入 blob 表（``payloads.store: db``）
+    或本地文件（``payloads.store: file``），步骤行只保留截断预览与引用。
+    """
+
+    def __init__(
+        self,
+        inline_max_bytes: int,
+        encoding: str = "zlib",
+        level: int = 6,
+        store: str = "db",
+        directory: str | None = None,
+        preview_items: int = 20,
+        preview_chars: int = 1000,
+    ):
+        if store not in {"db", "file"}:
+            raise ValueError(f"unknown payload store: {store}")
+        if encoding not in PAYLOAD_ENCODINGS:
+            raise ValueError(f"unknown payload encoding: {encoding}")
+        if encoding == "zstd":
+            # 启动时即暴露缺失的依赖，而不是在第一个大步骤写入时失败
+            try:
+                import zstandard  # type: ignore[import-not-found]  # noqa: F401
+            except ImportError as exc:
+                raise ImportError("payloads.compression zstd requires the zstandard package") from exc
+        self.inline_max_bytes = inline_max_bytes
+        self.encoding = encoding
+        self.level = level
+        self.store = store
+        self.directory = Path(directory) if directory else ROOT_DIR / "data" / "payloads"
+        self.preview_items = preview_items
+        self.preview_chars = preview_chars
+
+    def offload(self, step_data: str | None) -> OffloadedPayload | None:
+        """需要外置时返回预览与压缩内容，否则返回 None（原样内联）。"""
+        if step_data is None:
+            return None
+        raw = step_data.encode("utf-8")
+        if self.inline_max_bytes <= 0 or len(raw) <= self.inline_max_bytes:
+            return None
+        try:
+            preview = preview_value(json.loads(step_data), self.preview_items, self.preview_chars)
+        except ValueError:
+            preview = step_data[: self.preview_chars]
+        return OffloadedPayload(
+            preview=json.dumps(preview, ensure_ascii=False, default=str),
+            data=compress(raw, self.encoding, self.level),
+            encoding=self.encoding,
+            size_bytes=len(raw),
+        )
+
+    # ===== 本地文件存储 =====
+    def write_file(self, execution_id: str, payload: OffloadedPayload) -> str:
+        """写入 ``<dir>/<execution_id>/<uuid>.<encoding>``，返回引用 ``file:<execution_id>/<name>``。"""
+        folder = self.directory / safe_name(execution_id)
+        folder.mkdir(parents=True, exist_ok=True)
+        name = f"{uuid.uuid4().hex}.{payload.encoding}"
+        tmp_path = folder / f".{name}.tmp"
+        tmp_path.write_bytes(payload.data)
+        os.replace(tmp_path, folder / name)
+        return f"file:{safe_name(execution_id)}/{name}"
+
+    def read_file(self, ref: str) -> str:
+        relative = ref.removeprefix("file:")
+        path = (self.directory / relative).resolve()
+        if self.directory.resolve() not in path.parents:
+            raise ValueError(f"invalid payload reference: {ref}")
+        encoding = path.suffix.lstrip(".")
+        return decompress(path.read_bytes(), encoding).decode("utf-8")
+
+    def delete_file(self, ref: str) -> None:
+        """删除单个外置文件（步骤写入事务失败时清理已写入的文件）。"""
+        relative = ref.removeprefix("file:")
+        path = (self.directory / relative).resolve()
+        if self.directory.resolve() in path.parents:
+            path.unlink(missing_ok=True)
+
+    def delete_files(self, execution_ids: list[str]) -> None:
+        if not self.directory.exists():
+            return
+        for execution_id in execution_ids:
+            shutil.rmtree(self.directory / safe_name(execution_id), ignore_errors=True)
+
+
+_codec: StepPayloadCodec | None = None
+
+
+def get_payload_codec() -> StepPayloadCodec:
+    global _codec
+    if _codec is None:
+        config = get_app_config()
+        _codec = StepPayloadCodec(
+            inline_max_bytes=config.payloads_inline_max_bytes,
+            encoding=config.payloads_compression,
+            level=config.payloads_compression_level,
+            store=config.payloads_store,
+            directory=config.payloads_dir,
+            preview_items=config.payloads_preview_items,
+            preview_chars=config.payloads_preview_chars,
+        )
+    return _codec
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Mapping, Sequence
+
+from .scheduler import _iter_strings, build_dependencies
+from .template import TemplateRenderer, _has_template_syntax
+
+
+RULE_PLAN_CACHE_SIZE = 256
+
+# 连接器名称只在不含模板语法时才能在编译期确定
+_CONNECTOR_NODE_TYPES = {"sql", "mysql", "redis"}
+
+
+@dataclass(frozen=True)
+class PlanNode:
+    """
+    编译后的节点：配置只解析一次（只读映射），执行函数与静态连接器名已解析。
+
+    计划本身不保存编译后的模板：编译时只预热 ``TemplateRenderer`` 的进程级编译缓存，
+    执行时 ``render`` 按模板文本命中该缓存。
+    """
+
+    node_id: str
+    type: str
+    config: Mapping[str, Any]
+    executor: Callable[..., Any] | None
+    connector: str | None = None
+
+
+@dataclass(frozen=True)
+class RulePlan:
+    """
+    规则的执行计划：编译后的节点、原始顺序与依赖图。不可变，可在多次执行、多个线程间共享。
+
+    ``version`` 对应 ``rules.version``，节点/边/规则更新时递增，用于判断缓存是否过期。
+    """
+
+    rule_id: int
+    version: int | None
+    nodes: Mapping[str, PlanNode]
+    order: tuple[str, ...]
+    deps: Mapping[str, frozenset[str]]
+
+    @property
+    def connectors(self) -> frozenset[str]:
+        """编译期即可确定的连接器名称集合。"""
+        return frozenset(node.connector for node in self.nodes.values() if node.connector)
+
+
+def _prewarm_templates(config: Mapping[str, Any]) -> None:
+    """编译配置中所有含模板语法的字符串放入 TemplateRenderer 的编译缓存，首次执行不再付出编译开销。"""
+    for text in _iter_strings(dict(config)):
+        if not _has_template_syntax(text):
+            continue
+        try:
+            TemplateRenderer.compile(text)
+        except Exception:
+            # 语法错误留到执行时由 render 报告，与未预热时行为一致
+            continue
+
+
+def compile_plan(
+    rule_id: int,
+    version: int | None,
+    nodes: Sequence[tuple[str, str, str | None]],
+    edges: Iterable[tuple[str, str]],
+    executors: Mapping[str, Callable[..., Any]],
+) -> RulePlan | None:
+    """由 (node_id, type, config_json) 列表与边编译执行计划；没有节点时返回 None。"""
+    if not nodes:
+        return None
+    compiled: dict[str, PlanNode] = {}
+    for node_id, node_type, config_json in nodes:
+        config = json.loads(config_json or "{}")
+        connector = config.get("connector") if node_type in _CONNECTOR_NODE_TYPES else None
+        if not isinstance(connector, str) or not connector.strip() or _has_template_syntax(connector):
+            connector = None
+        _prewarm_templates(config)
+        compiled[node_id] = PlanNode(
+            node_id=node_id,
+            type=node_type,
+            config=MappingProxyType(config),
+            executor=executors.get(node_type),
+            connector=connector.strip() if connector else None,
+        )
+    order = tuple(node_id for node_id, _, _ in nodes)
+    deps = build_dependencies(
+        [(node_id, compiled[node_id].type, dict(compiled[node_id].config)) for node_id in order], edges
+    )
+    return RulePlan(
+        rule_id=rule_id,
+        version=version,
+        nodes=MappingProxyType(compiled),
+        order=order,
+        deps=MappingProxyType({node_id: frozenset(node_deps) for node_id, node_deps in deps.items()}),
+    )
+
+
+class RulePlanCache:
+    """
+    按 rule_id 缓存执行计划的有界 LRU，线程安全。
+
+    每次取用前由调用方查询一次 ``rules.version``（主键查询）：版本一致直接复用，否则重新编译。
+    版本号存在数据库中，因此多个 worker 进程各自的缓存都能感知其他进程的修改。
+    """
+
+    def __init__(self, maxsize: int = RULE_PLAN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._plans: OrderedDict[int, RulePlan] = OrderedDict()
+
+    def get(self, rule_id: int, version: int | None, build: Callable[[], RulePlan | None]) -> RulePlan | None:
+        if version is None:
+            return build()
+        with self._lock:
+            plan = self._plans.get(rule_id)
+            if plan is not None and plan.version == version:
+                self._plans.move_to_end(rule_id)
+                self.hits += 1
+                return plan
+            self.misses += 1
+        plan = build()
+        if plan is None:
+            self.invalidate(rule_id)
+            return None
+        with self._lock:
+            current = self._plans.get(rule_id)
+            if current is None or (current.version or 0) <= version:
+                self._plans[rule_id] = plan
+                self._plans.move_to_end(rule_id)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+        return plan
+
+    def invalidate(self, rule_id: int) -> None:
+        with self._lock:
+            self._plans.pop(rule_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._plans), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+rule_plans = RulePlanCache()
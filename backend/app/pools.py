@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+
+from .metrics import METRIC_PREFIX, MetricFamily, registry
+
+
+DEFAULT_SQL_POOL_OPTIONS: dict[str, Any] = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_recycle": 3600,
+    "pool_pre_ping": True,
+    "connect_timeout": 10,
+}
+
+# 直接给 DSN（无连接器）的 Engine 没有 invalidate 入口，按 LRU 最多保留这么多个
+SQL_DSN_ENGINE_LIMIT = 16
+
+DEFAULT_REDIS_POOL_OPTIONS: dict[str, Any] = {
+    "max_connections": 50,
+    "socket_timeout": 10,
+    "socket_connect_timeout": 5,
+    "health_check_interval": 30,
+}
+
+
+def normalize_mysql_dsn(dsn: str) -> str:
+    """aiomysql 的 DSN 统一替换为同步的 pymysql 驱动。"""
+    return dsn.replace("mysql+aiomysql://", "mysql+pymysql://").replace("aiomysql://", "mysql+pymysql://")
+
+
+def _options_from_config(config: dict[str, Any], defaults: dict[str, Any]) -> dict[str, Any]:
+    options = dict(defaults)
+    for key in defaults:
+        if config.get(key) is not None:
+            options[key] = config[key]
+    return options
+
+
+def _connect_args(dsn: str, connect_timeout: int) -> dict[str, Any]:
+    """建连超时的驱动参数：pymysql 为 ``connect_timeout``，sqlite3 为 ``timeout``（等待库锁的秒数）。"""
+    if make_url(dsn).get_backend_name() == "sqlite":
+        return {"timeout": connect_timeout, "check_same_thread": False}
+    return {"connect_timeout": connect_timeout}
+
+
+def _fingerprint(dsn: str, options: dict[str, Any]) -> str:
+    raw = json.dumps({"dsn": dsn, "options": options}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class _EngineEntry:
+    engine: Engine
+    fingerprint: str
+    options: dict[str, Any]
+    created_at: float = field(default_factory=time.time)
+    hits: int = 0
+
+
+class SqlEngineRegistry:
+    """
+    进程级 SQLAlchemy Engine 注册表，按连接器（或 DSN 哈希）复用连接池。
+
+    - key 为 connector_id；无连接器（``connection_key`` 直接给 DSN）时按 DSN 哈希区分。
+    - 连接器配置中的 ``pool_size`` / ``max_overflow`` / ``pool_recycle`` / ``pool_pre_ping`` /
+      ``connect_timeout`` 参与指纹计算，配置变化后旧 Engine 会被 dispose 并重建。
+    - 建连超时只取连接器的 ``connect_timeout``（默认 10 秒），不再跟随运行变量 ``__sql_timeout__``：
+      同一连接池被多次执行共享，按执行变化会导致反复重建；``__sql_timeout__`` 仍控制 ``max_execution_time``。
+    - ``Storage.update_connector`` / ``delete_connector`` 会调用 ``invalidate``；按 DSN 区分的 Engine
+      最多保留 ``max_dsn_engines`` 个，超出时 dispose 最久未使用的一个。
+    """
+
+    def __init__(self, max_dsn_engines: int = SQL_DSN_ENGINE_LIMIT):
+        self.max_dsn_engines = max(1, max_dsn_engines)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, _EngineEntry] = OrderedDict()
+
+    @staticmethod
+    def _key(connector_id: int | None, dsn: str) -> str:
+        if connector_id is not None:
+            return f"connector:{connector_id}"
+        return f"dsn:{hashlib.sha256(dsn.encode('utf-8')).hexdigest()[:16]}"
+
+    def get_engine(self, connector_id: int | None, dsn: str, config: dict[str, Any] | None = None) -> Engine:
+        dsn = normalize_mysql_dsn(dsn)
+        options = _options_from_config(config or {}, DEFAULT_SQL_POOL_OPTIONS)
+        fingerprint = _fingerprint(dsn, options)
+        key = self._key(connector_id, dsn)
+        stale: list[Engine] = []
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.fingerprint == fingerprint:
+                entry.hits += 1
+                self._entries.move_to_end(key)
+                return entry.engine
+            if entry is not None:
+                stale.append(entry.engine)
+            engine = create_engine(
+                dsn,
+                pool_size=int(options["pool_size"]),
+                max_overflow=int(options["max_overflow"]),
+                pool_recycle=int(options["pool_recycle"]),
+                pool_pre_ping=bool(options["pool_pre_ping"]),
+                connect_args=_connect_args(dsn, int(options["connect_timeout"])),
+            )
+            self._entries[key] = _EngineEntry(engine=engine, fingerprint=fingerprint, options=options)
+            self._entries.move_to_end(key)
+            dsn_keys = [k for k in self._entries if k.startswith("dsn:")]
+            for evicted in dsn_keys[: max(len(dsn_keys) - self.max_dsn_engines, 0)]:
+                stale.append(self._entries.pop(evicted).engine)
+        for old in stale:
+            old.dispose()
+        return engine
+
+    def invalidate(self, connector_id: int) -> None:
+        with self._lock:
+            entry = self._entries.pop(self._key(connector_id, ""), None)
+        if entry is not None:
+            entry.engine.dispose()
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            entry.engine.dispose()
+
+    def stats(self) -> list[dict[str, Any]]:
+        with self._lock:
+            items = list(self._entries.items())
+        result = []
+        for key, entry in items:
+            pool = entry.engine.pool
+            result.append(
+                {
+                    "key": key,
+                    "fingerprint": entry.fingerprint,
+                    "pool_size": pool.size() if hasattr(pool, "size") else None,
+                    "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                    "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                    "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                    "hits": entry.hits,
+                    "created_at": entry.created_at,
+                    "options": entry.options,
+                }
+            )
+        return result
+
+
+@dataclass
+class _RedisPoolEntry:
+    pool: Any
+    fingerprint: str
+    options: dict[str, Any]
+    created_at: float = field(default_factory=time.time)
+    hits: int = 0
+
+
+class RedisPoolRegistry:
+    """
+    进程级 Redis ``ConnectionPool`` 注册表，按 connector_id 复用。
+
+    连接器配置可选 ``max_connections`` / ``socket_timeout`` / ``socket_connect_timeout`` /
+    ``health_check_interval``，与 DSN 一起参与指纹计算；失效策略与 ``SqlEngineRegistry`` 相同。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[int, _RedisPoolEntry] = {}
+
+    def get_client(self, connector_id: int, dsn: str, config: dict[str, Any] | None = None):
+        import redis  # type: ignore[import-not-found]
+
+        options = _options_from_config(config or {}, DEFAULT_REDIS_POOL_OPTIONS)
+        fingerprint = _fingerprint(dsn, options)
+        stale = None
+        with self._lock:
+            entry = self._entries.get(connector_id)
+            if entry is None or entry.fingerprint != fingerprint:
+                if entry is not None:
+                    stale = entry.pool
+                pool = redis.ConnectionPool.from_url(
+                    dsn,
+                    max_connections=int(options["max_connections"]),
+                    socket_timeout=float(options["socket_timeout"]),
+                    socket_connect_timeout=float(options["socket_connect_timeout"]),
+                    health_check_interval=int(options["health_check_interval"]),
+                )
+                entry = _RedisPoolEntry(pool=pool, fingerprint=fingerprint, options=options)
+                self._entries[connector_id] = entry
+            else:
+                entry.hits += 1
+            pool = entry.pool
+        if stale is not None:
+            stale.disconnect()
+        return redis.Redis(connection_pool=pool)
+
+    def invalidate(self, connector_id: int) -> None:
+        with self._lock:
+            entry = self._entries.pop(connector_id, None)
+        if entry is not None:
+            entry.pool.disconnect()
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            entry.pool.disconnect()
+
+    def stats(self) -> list[dict[str, Any]]:
+        with self._lock:
+            items = list(self._entries.items())
+        result = []
+        for connector_id, entry in items:
+            pool = entry.pool
+            result.append(
+                {
+                    "key": f"connector:{connector_id}",
+                    "fingerprint": entry.fingerprint,
+                    "max_connections": pool.max_connections,
+                    "in_use": len(getattr(pool, "_in_use_connections", ())),
+                    "available": len(getattr(pool, "_available_connections", ())),
+                    "hits": entry.hits,
+                    "created_at": entry.created_at,
+                    "options": entry.options,
+                }
+            )
+        return result
+
+
+sql_engines = SqlEngineRegistry()
+redis_pools = RedisPoolRegistry()
+
+
+def invalidate_connector(connector_id: int) -> None:
+    sql_engines.invalidate(connector_id)
+    redis_pools.invalidate(connector_id)
+
+
+def pool_stats() -> dict[str, Any]:
+    return {"sql": sql_engines.stats(), "redis": redis_pools.stats()}
+
+
+@registry.register_collector
+def _collect_pools() -> list[MetricFamily]:
+    sql_in_use = MetricFamily(f"{METRIC_PREFIX}sql_pool_checked_out", "gauge", "Connector SQL connections in use")
+    sql_size = MetricFamily(f"{METRIC_PREFIX}sql_pool_size", "gauge", "Connector SQL pool size")
+    redis_in_use = MetricFamily(f"{METRIC_PREFIX}redis_pool_in_use", "gauge", "Connector Redis connections in use")
+    redis_max = MetricFamily(f"{METRIC_PREFIX}redis_pool_max_connections", "gauge", "Connector Redis pool limit")
+    for item in sql_engines.stats():
+        sql_in_use.add(item["checked_out"], pool=item["key"])
+        sql_size.add(item["pool_size"], pool=item["key"])
+    for item in redis_pools.stats():
+        redis_in_use.add(item["in_use"], pool=item["key"])
+        redis_max.add(item["max_connections"], pool=item["key"])
+    return [sql_in_use, sql_size, redis_in_use, redis_max]
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import io
+import multiprocessing
+import pickle
+import queue
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from types import CodeType
+from typing import Any
+
+from loguru import logger
+
+from .config import get_app_config
+
+
+PYTHON_CODE_CACHE_SIZE = 256
+
+SAFE_BUILTINS: dict[str, Any] = {
+    "print": print,
+    "len": len,
+    "str": str,
+    "int": int,
+    "float": float,
+    "dict": dict,
+    "list": list,
+}
+
+
+class PythonTimeoutError(RuntimeError):
+    pass
+
+
+@dataclass
+class PythonResult:
+    result: Any
+    stdout: str
+    vars: dict[str, Any]
+    store: dict[str, Any]
+
+
+def script_hash(script: str) -> str:
+    return hashlib.sha256(script.encode("utf-8")).hexdigest()
+
+
+def _limit_memory(max_memory_mb: int) -> None:
+    if max_memory_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:  # 非 POSIX 平台没有 RLIMIT_AS
+        return
+    limit = max_memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker_main(conn: Connection, max_memory_mb: int, code_cache_size: int) -> None:
+    """子进程主循环：按脚本哈希缓存 code object，逐个执行任务并把结果发回。"""
+    _limit_memory(max_memory_mb)
+    code_cache: OrderedDict[str, CodeType] = OrderedDict()
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if job is None:
+            return
+        digest, script, variables, store, nodes = job
+        try:
+            code = code_cache.get(digest)
+            if code is None:
+                code = compile(script, "<python-node>", "exec")
+                code_cache[digest] = code
+                while len(code_cache) > code_cache_size:
+                    code_cache.popitem(last=False)
+            else:
+                code_cache.move_to_end(digest)
+            local_vars = {"vars": variables, "store": store, "nodes": nodes, "result": None}
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                exec(code, {"__builtins__": SAFE_BUILTINS}, local_vars)
+            payload = ("ok", PythonResult(local_vars.get("result"), stdout.getvalue(), variables, store))
+            conn.send_bytes(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+        except BaseException as exc:  # 包括 MemoryError、脚本中的 SystemExit 以及结果无法序列化
+            conn.send_bytes(pickle.dumps(("error", f"{type(exc).__name__}: {exc}"), protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class _Worker:
+    def __init__(self, context: Any, max_memory_mb: int, code_cache_size: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, max_memory_mb, code_cache_size),
+            name="python-node",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def close(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=5)
+        self.conn.close()
+
+
+class PythonProcessPool:
+    """
+    常驻子进程池，执行 python 节点脚本，脚本不再运行在 API/worker 进程内。
+
+    - 每个任务独占一个子进程；超过 ``timeout_sec`` 时杀掉该进程并补充新进程，调用方收到 PythonTimeoutError。
+    - 子进程启动时设置 ``RLIMIT_AS``（``max_memory_mb``），超限时脚本得到 MemoryError。
+    - 子进程内按脚本 sha256 缓存编译后的 code object。
+    - ``vars`` / ``store`` / ``nodes`` 以 pickle（最高协议）传入，脚本修改后的 ``vars`` / ``store`` 随结果传回。
+    - 使用 spawn 启动子进程，避免在多线程进程中 fork。进程在首次使用时启动并保持常驻。
+    """
+
+    def __init__(self, size: int, max_memory_mb: int, code_cache_size: int = PYTHON_CODE_CACHE_SIZE):
+        self.size = max(1, size)
+        self.max_memory_mb = max_memory_mb
+        self.code_cache_size = code_cache_size
+        self.timeouts = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._idle: queue.Queue[_Worker] = queue.Queue()
+        self._workers: list[_Worker] = []
+        self._started = False
+        self._closed = False
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._context, self.max_memory_mb, self.code_cache_size)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _discard(self, worker: _Worker) -> None:
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    def _ensure_started(self) -> None:
+        if self._closed:
+            raise RuntimeError("python process pool is closed")
+        if self._started:
+            return
+        with self._start_lock:
+            if not self._started:
+                for _ in range(self.size):
+                    self._idle.put(self._spawn())
+                self._started = True
+
+    def run(
+        self,
+        script: str,
+        variables: dict[str, Any],
+        store: dict[str, Any],
+        nodes: dict[str, Any],
+        timeout_sec: float,
+    ) -> PythonResult:
+        self._ensure_started()
+        try:
+            # 所有 worker 都被占用时最多等待 timeout_sec，避免节点在池外无限期排队
+            worker = self._idle.get(timeout=timeout_sec)
+        except queue.Empty:
+            raise PythonTimeoutError(f"no idle python worker within {timeout_sec}s") from None
+        healthy = True
+        try:
+            if not worker.process.is_alive():
+                # 回收已退出的进程并关闭管道，再补充新进程
+                worker.kill()
+                self._discard(worker)
+                worker = self._spawn()
+            worker.conn.send_bytes(
+                pickle.dumps((script_hash(script), script, variables, store, nodes), protocol=pickle.HIGHEST_PROTOCOL)
+            )
+            if not worker.conn.poll(timeout_sec):
+                healthy = False
+                self.timeouts += 1
+                raise PythonTimeoutError(f"python node timed out after {timeout_sec}s")
+            status, payload = pickle.loads(worker.conn.recv_bytes())
+        except (EOFError, BrokenPipeError, ConnectionResetError) as exc:
+            healthy = False
+            raise RuntimeError(f"python worker exited unexpectedly: {exc}") from exc
+        finally:
+            if healthy:
+                self._idle.put(worker)
+            else:
+                logger.warning("python worker pid={} replaced", worker.process.pid)
+                worker.kill()
+                self._discard(worker)
+                if not self._closed:
+                    self._idle.put(self._spawn())
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "alive": sum(1 for worker in self._workers if worker.process.is_alive()),
+                "idle": self._idle.qsize(),
+                "timeouts": self.timeouts,
+            }
+
+
+_pool: PythonProcessPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_python_pool() -> PythonProcessPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            config = get_app_config()
+            _pool = PythonProcessPool(config.python_pool_size, config.python_max_memory_mb)
+        return _pool
+
+
+def shutdown_python_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import Any
+
+from .config import get_app_config
+from .metrics import step_persist_duration
+from .storage import Storage
+
+
+class ExecutionRecorder:
+    """
+    步骤记录器（direct 模式）：每个步骤完成后一条 INSERT 写入最终状态，不再先插入 running 行再更新。
+    """
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+
+    @staticmethod
+    def build_step(
+        execution_id: str,
+        node_id: str,
+        action_type: str,
+        status: str,
+        content: str | None,
+        output: str | None,
+        step_data: str | None,
+        started_at: str | None,
+        completed_at: str | None,
+        timings: dict[str, float] | None = None,
+    ) -> dict[str, Any]:
+        return {
+            "execution_id": execution_id,
+            "node_id": node_id,
+            "action_type": action_type,
+            "content": content,
+            "started_at": started_at,
+            "completed_at": completed_at,
+            "status": status,
+            "output": output,
+            "step_data": step_data,
+            "timings": json.dumps(timings) if timings is not None else None,
+        }
+
+    def record_step(self, **step: Any) -> None:
+        started = time.perf_counter()
+        self.storage.insert_steps([self.build_step(**step)])
+        step_persist_duration.observe(time.perf_counter() - started, "direct")
+
+    def flush(self) -> None:
+        """direct 模式下每步已落库，无需刷新。"""
+
+    @property
+    def pending(self) -> int:
+        return 0
+
+
+class BufferedExecutionRecorder(ExecutionRecorder):
+    """
+    write-behind 模式：步骤先缓存在内存，满 ``batch_size`` 条或距上次刷新超过
+    ``flush_interval_sec`` 时批量写入；引擎在 complete_execution 之前总会 flush。
+
+    崩溃语义：进程在刷新前退出时，缓冲中的步骤会丢失，执行记录停留在 ``running``
+    （异步模式下由 job_queue 租约回收后重跑）。已完成（completed/failed）的执行一定包含全部步骤。
+    计时检查发生在 record_step 调用时，不使用后台线程，因此 Session 不会跨线程使用。
+    """
+
+    def __init__(self, storage: Storage, batch_size: int = 50, flush_interval_sec: float = 2.0):
+        super().__init__(storage)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_sec = flush_interval_sec
+        self._buffer: list[dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+
+    def record_step(self, **step: Any) -> None:
+        self._buffer.append(self.build_step(**step))
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval_sec:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            rows, self._buffer = self._buffer, []
+            started = time.perf_counter()
+            self.storage.insert_steps(rows)
+            step_persist_duration.observe(time.perf_counter() - started, "buffered")
+        self._last_flush = time.monotonic()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+
+def create_recorder(storage: Storage, mode: str | None = None) -> ExecutionRecorder:
+    config = get_app_config()
+    mode = mode or config.recorder_mode
+    if mode == "buffered":
+        return BufferedExecutionRecorder(
+            storage, batch_size=config.recorder_batch_size, flush_interval_sec=config.recorder_flush_interval_sec
+        )
+    if mode == "direct":
+        return ExecutionRecorder(storage)
+    raise ValueError(f"unknown recorder mode: {mode}")
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable
+
+from loguru import logger
+
+from .config import AppConfig, get_app_config
+from .logger import configure_logging
+from .schema import RetentionPolicyModel
+from .shell_runner import get_shell_runner
+from .storage import Storage
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """生效的保留策略；None 表示不按该维度清理。"""
+
+    keep_executions: int | None = None
+    keep_days: int | None = None
+    compact_stored_data: bool = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.keep_executions is not None or self.keep_days is not None or self.compact_stored_data
+
+    @classmethod
+    def from_model(cls, model: RetentionPolicyModel) -> "RetentionPolicy":
+        return cls(model.keep_executions, model.keep_days, bool(model.compact_stored_data))
+
+    @classmethod
+    def from_config(cls, config: AppConfig) -> "RetentionPolicy":
+        return cls(
+            keep_executions=config.retention_keep_executions or None,
+            keep_days=config.retention_keep_days or None,
+            compact_stored_data=config.retention_compact_stored_data,
+        )
+
+
+def resolve_policy(
+    default: RetentionPolicy, project_policy: RetentionPolicy | None, rule_policy: RetentionPolicy | None
+) -> RetentionPolicy:
+    """规则级策略优先，其次项目级（rule_id = 0），最后是 ``retention.*`` 配置的默认值。"""
+    return rule_policy or project_policy or default
+
+
+def delete_spill_files(execution_ids: list[str]) -> None:
+    get_shell_runner().delete_spill_files(execution_ids)
+
+
+class RetentionJob:
+    """
+    执行历史清理任务：按生效策略删除过期执行（连同步骤、存储历史、队列记录），并压缩 stored_data 历史。
+
+    每个事务最多删除 ``batch_size`` 条执行或存储记录，避免长事务与大范围锁；多个进程同时执行是安全的，只是重复扫描。
+    每批执行删除提交后调用 ``on_executions_deleted``（默认删除 shell 节点落盘的输出文件）。
+    """
+
+    def __init__(
+        self,
+        storage_factory: Callable[[], Storage] = Storage,
+        batch_size: int | None = None,
+        default_policy: RetentionPolicy | None = None,
+        clock: Callable[[], datetime] = datetime.utcnow,
+        on_executions_deleted: Callable[[list[str]], None] = delete_spill_files,
+    ):
+        config = get_app_config()
+        self.storage_factory = storage_factory
+        self.batch_size = max(1, batch_size or config.retention_batch_size)
+        self.default_policy = default_policy or RetentionPolicy.from_config(config)
+        self.clock = clock
+        self.on_executions_deleted = on_executions_deleted
+
+    def run_once(self) -> dict[str, int]:
+        totals = {"executions": 0, "steps": 0, "stored_data": 0, "compacted": 0}
+        storage = self.storage_factory()
+        try:
+            for project in storage.list_projects():
+                policies = {p.rule_id: RetentionPolicy.from_model(p) for p in storage.list_retention_policies(project.id)}
+                for rule in storage.list_rules(project.id):
+                    policy = resolve_policy(self.default_policy, policies.get(0), policies.get(rule.id))
+                    if policy.enabled:
+                        self._apply(storage, project.id, rule.id, policy, totals)
+        finally:
+            storage.close()
+        if any(totals.values()):
+            logger.info("retention removed {}", totals)
+        return totals
+
+    def _apply(
+        self, storage: Storage, project_id: int, rule_id: int, policy: RetentionPolicy, totals: dict[str, int]
+    ) -> None:
+        started_before = (
+            (self.clock() - timedelta(days=policy.keep_days)).isoformat() if policy.keep_days is not None else None
+        )
+        while True:
+            execution_ids = storage.list_expired_execution_ids(
+                project_id, rule_id, policy.keep_executions, started_before, self.batch_size
+            )
+            for key, count in storage.delete_executions(execution_ids).items():
+                totals[key] += count
+            if execution_ids:
+                self.on_executions_deleted(execution_ids)
+            if len(execution_ids) < self.batch_size:
+                break
+        if policy.compact_stored_data:
+            while True:
+                deleted = storage.compact_stored_data(project_id, rule_id, self.batch_size)
+                totals["compacted"] += deleted
+                if deleted < self.batch_size:
+                    break
+
+
+def main(argv: list[str] | None = None) -> None:
+    config = get_app_config()
+    parser = argparse.ArgumentParser(description="DB Scenario execution history retention")
+    parser.add_argument("--batch-size", type=int, default=config.retention_batch_size)
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    RetentionJob(batch_size=args.batch_size).run_once()
+
+
+if __name__ == "__main__":
+    main()
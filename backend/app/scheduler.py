@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import re
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# store/load/python 会读写共享的 ctx.vars / ctx.store，作为屏障节点串行执行：
+# 依赖之前的所有节点，之后的所有节点也依赖它。
+BARRIER_NODE_TYPES = {"store", "load", "python"}
+
+_NODE_REF_RE = re.compile(r"""\bnodes\s*(?:\.\s*([A-Za-z_]\w*)|\[\s*['"]([^'"]+)['"]\s*\])""")
+_NODES_NAME_RE = re.compile(r"\bnodes\b")
+
+
+def _iter_strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_strings(item)
+
+
+def find_node_references(config: dict[str, Any]) -> tuple[set[str], bool]:
+    """
+    扫描节点配置中所有字符串里的 ``nodes.<id>`` / ``nodes['<id>']`` 引用。
+
+    返回 (引用的节点 id 集合, 是否存在无法静态解析的 ``nodes`` 访问)。
+    """
+    refs: set[str] = set()
+    dynamic = False
+    for text in _iter_strings(config):
+        matched = 0
+        for match in _NODE_REF_RE.finditer(text):
+            refs.add(match.group(1) or match.group(2))
+            matched += 1
+        if len(_NODES_NAME_RE.findall(text)) > matched:
+            dynamic = True
+    return refs, dynamic
+
+
+def build_dependencies(
+    nodes: Sequence[tuple[str, str, dict[str, Any]]],
+    edges: Iterable[tuple[str, str]] = (),
+) -> dict[str, set[str]]:
+    """
+    根据 (node_id, type, config) 列表（按 order_index 排好序）与显式边构建依赖图。
+
+    - 显式边 ``source -> target``：target 依赖 source；
+    - 模板中引用 ``nodes.<id>`` 的节点依赖被引用的前序节点；
+    - 屏障节点（``BARRIER_NODE_TYPES``）与前后所有节点保持原有顺序。无法静态解析 ``nodes`` 访问的节点
+      同样按屏障处理：模板上下文中的 ``nodes`` 是实时映射，遍历期间不能有其他节点并发写入。
+    """
+    order = [node_id for node_id, _, _ in nodes]
+    known = set(order)
+    if len(known) != len(order):
+        raise ValueError("duplicate node id in rule")
+
+    deps: dict[str, set[str]] = {node_id: set() for node_id in order}
+    last_barrier: str | None = None
+    for index, (node_id, node_type, config) in enumerate(nodes):
+        earlier = order[:index]
+        refs, dynamic = find_node_references(config)
+        if dynamic or node_type in BARRIER_NODE_TYPES:
+            deps[node_id].update(earlier)
+        else:
+            deps[node_id].update(ref for ref in refs if ref in earlier)
+            if last_barrier is not None:
+                deps[node_id].add(last_barrier)
+
+        if dynamic or node_type in BARRIER_NODE_TYPES:
+            last_barrier = node_id
+
+    for source, target in edges:
+        if source not in known or target not in known:
+            raise ValueError(f"edge references unknown node: {source} -> {target}")
+        if source != target:
+            deps[target].add(source)
+
+    topological_order(order, deps)
+    return deps
+
+
+def topological_order(order: Sequence[str], deps: dict[str, set[str]]) -> list[str]:
+    """稳定拓扑排序：同一层内保持原始顺序；存在环时抛出 ValueError。"""
+    remaining = {node_id: set(deps.get(node_id, ())) for node_id in order}
+    result: list[str] = []
+    while remaining:
+        ready = [node_id for node_id in order if node_id in remaining and not remaining[node_id]]
+        if not ready:
+            raise ValueError(f"dependency cycle between nodes: {', '.join(sorted(remaining))}")
+        for node_id in ready:
+            del remaining[node_id]
+            result.append(node_id)
+        for pending in remaining.values():
+            pending.difference_update(ready)
+    return result
+
+
+class DagScheduler:
+    """
+    按依赖图调度节点：无依赖关系的节点最多 ``max_parallel`` 个并发执行。
+
+    ``run`` 是生成器，按完成顺序产出 (node_id, result)。调用方在生成器恢复前处理结果
+    （记录步骤、写入上下文），之后才会调度依赖它的节点；调用 ``stop()`` 后不再启动新节点，
+    已在执行中的节点仍会完成并被产出（fail-fast）。
+    """
+
+    def __init__(self, max_parallel: int = 1, thread_initializer: Callable[[], None] | None = None):
+        self.max_parallel = max(1, max_parallel)
+        self.thread_initializer = thread_initializer
+        self._stopped = False
+
+    def stop(self) -> None:
+        self._stopped = True
+
+    def run(self, order: Sequence[str], deps: dict[str, set[str]], run_node: Callable[[str], T]) -> Iterator[tuple[str, T]]:
+        self._stopped = False
+        if self.max_parallel == 1:
+            for node_id in topological_order(order, deps):
+                if self._stopped:
+                    return
+                yield node_id, run_node(node_id)
+            return
+
+        pending = {node_id: set(deps.get(node_id, ())) for node_id in order}
+        running: dict[Future, str] = {}
+        with ThreadPoolExecutor(
+            max_workers=self.max_parallel, thread_name_prefix="rule-node", initializer=self.thread_initializer
+        ) as pool:
+            while pending or running:
+                if not self._stopped:
+                    for node_id in order:
+                        if len(running) >= self.max_parallel:
+                            break
+                        if node_id in pending and not pending[node_id]:
+                            del pending[node_id]
+                            running[pool.submit(run_node, node_id)] = node_id
+                if not running:
+                    if pending and not self._stopped:
+                        raise ValueError(f"dependency cycle between nodes: {', '.join(sorted(pending))}")
+                    return
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node_id = running.pop(future)
+                    yield node_id, future.result()
+                    for waiting in pending.values():
+                        waiting.discard(node_id)
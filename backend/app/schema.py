@@ -1,6 +1,6 @@
 from typing import List, Optional
 
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint, text
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -50,6 +50,7 @@ class RuleModel(SQLModel, table=True):
     project_id: int = Field(nullable=False)
     name: str = Field(nullable=False)
     description: str | None = None
+    version: int = Field(default=0, nullable=False, sa_column_kwargs={"server_default": "0"})
     created_at: str | None = None
     updated_at: str | None = None
     project: Optional[ProjectModel] = Relationship(
@@ -66,6 +67,13 @@ class RuleModel(SQLModel, table=True):
             "cascade": "all, delete-orphan",
         },
     )
+    edges: List["EdgeModel"] = Relationship(
+        back_populates="rule",
+        sa_relationship_kwargs={
+            "primaryjoin": "RuleModel.id == foreign(EdgeModel.rule_id)",
+            "cascade": "all, delete-orphan",
+        },
+    )
     executions: List["ExecutionModel"] = Relationship(
         back_populates="rule",
         sa_relationship_kwargs={
@@ -88,7 +96,7 @@ class NodeModel(SQLModel, table=True):
     rule_id: int = Field(nullable=False)
     node_id: str = Field(nullable=False)
     type: str = Field(nullable=False)
-    order_index: int = Field(nullable=False)
+    order_index: int = Field(nullable=False, default=0)
     config: str | None = None
     rule: Optional[RuleModel] = Relationship(
         back_populates="nodes",
@@ -99,6 +107,24 @@ class NodeModel(SQLModel, table=True):
     )
 
 
+class EdgeModel(SQLModel, table=True):
+    __tablename__ = "edges"
+    __table_args__ = (UniqueConstraint("rule_id", "source_node", "target_node", name="uq_edges_rule_src_dst"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    rule_id: int = Field(nullable=False)
+    source_node: str = Field(nullable=False)
+    target_node: str = Field(nullable=False)
+    condition: str | None = None
+    rule: Optional[RuleModel] = Relationship(
+        back_populates="edges",
+        sa_relationship_kwargs={
+            "primaryjoin": "foreign(EdgeModel.rule_id) == RuleModel.id",
+            "foreign_keys": "EdgeModel.rule_id",
+        },
+    )
+
+
 class GlobalVarModel(SQLModel, table=True):
     __tablename__ = "global_vars"
     __table_args__ = (
@@ -146,12 +172,20 @@ class ConnectorModel(SQLModel, table=True):
 
 class ExecutionModel(SQLModel, table=True):
     __tablename__ = "executions"
+    # 历史列表按 started_at DESC, id DESC 做 keyset 分页
+    __table_args__ = (
+        Index("ix_executions_project_rule_started_at", "project_id", "rule_id", text("started_at DESC"), text("id DESC")),
+        Index("ix_executions_project_started_at", "project_id", text("started_at DESC"), text("id DESC")),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
     project_id: int = Field(nullable=False)
     rule_id: int = Field(nullable=False)
     execution_id: str = Field(nullable=False, unique=True)
+    batch_id: str | None = Field(default=None, index=True)
+    # started_at 为创建（入队）时间，分页排序依赖它，创建后不再改写；run_started_at 为本次尝试实际开始执行的时间
     started_at: str | None = None
+    run_started_at: str | None = None
     completed_at: str | None = None
     status: str | None = None
     variables: str | None = None
@@ -185,11 +219,25 @@ class ExecutionModel(SQLModel, table=True):
     )
 
 
+class ExecutionBatchModel(SQLModel, table=True):
+    __tablename__ = "execution_batches"
+
+    id: int | None = Field(default=None, primary_key=True)
+    batch_id: str = Field(nullable=False, unique=True)
+    project_id: int = Field(nullable=False)
+    rule_id: int = Field(nullable=False)
+    status: str | None = None
+    total: int = Field(nullable=False, default=0)
+    concurrency: int = Field(nullable=False, default=1)
+    created_at: str | None = None
+    completed_at: str | None = None
+
+
 class ExecutionStepModel(SQLModel, table=True):
     __tablename__ = "execution_steps"
 
     id: int | None = Field(default=None, primary_key=True)
-    execution_id: str = Field(nullable=False)
+    execution_id: str = Field(nullable=False, index=True)
     node_id: str = Field(nullable=False)
     action_type: str | None = None
     content: str | None = None
@@ -198,6 +246,11 @@ class ExecutionStepModel(SQLModel, table=True):
     status: str | None = None
     output: str | None = None
     step_data: str | None = None
+    # step_data 外置时为 "db:<step_payloads.id>" 或 "file:<路径>"，step_data 此时只是截断预览
+    payload_ref: str | None = None
+    payload_bytes: int | None = None
+    # 分阶段耗时 JSON：render_ms / connector_ms / acquire_ms / io_ms / serialize_ms / total_ms
+    timings: str | None = None
     execution: Optional[ExecutionModel] = Relationship(
         back_populates="steps",
         sa_relationship_kwargs={
@@ -207,13 +260,25 @@ class ExecutionStepModel(SQLModel, table=True):
     )
 
 
+class StepPayloadModel(SQLModel, table=True):
+    """外置的 step_data：压缩后的完整 JSON。"""
+
+    __tablename__ = "step_payloads"
+
+    id: int | None = Field(default=None, primary_key=True)
+    execution_id: str = Field(nullable=False, index=True)
+    encoding: str = Field(nullable=False)
+    size_bytes: int = Field(nullable=False)
+    data: bytes = Field(nullable=False)
+
+
 class StoredDataModel(SQLModel, table=True):
     __tablename__ = "stored_data"
 
     id: int | None = Field(default=None, primary_key=True)
     project_id: int = Field(nullable=False)
     rule_id: int = Field(nullable=False)
-    execution_id: str = Field(nullable=False)
+    execution_id: str = Field(nullable=False, index=True)
     node_id: str = Field(nullable=False)
     scope: str = Field(nullable=True, default="rule")
     key: str | None = None
@@ -239,3 +304,72 @@ class StoredDataModel(SQLModel, table=True):
             "foreign_keys": "StoredDataModel.execution_id",
         },
     )
+
+
+class StoredDataCurrentModel(SQLModel, table=True):
+    """
+    ``stored_data`` 每个 key 的当前值，与历史记录在同一事务中维护。
+
+    ``scope_rule_id`` 为 rule scope 下的 rule_id，project scope 固定为 0；``rule_id`` 是最近一次写入的规则。
+    """
+
+    __tablename__ = "stored_data_current"
+    __table_args__ = (
+        UniqueConstraint("project_id", "scope", "scope_rule_id", "key", name="uq_stored_data_current_key"),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    project_id: int = Field(nullable=False)
+    scope: str = Field(nullable=False)
+    scope_rule_id: int = Field(nullable=False, default=0)
+    key: str = Field(nullable=False)
+    value: str | None = None
+    rule_id: int = Field(nullable=False)
+    execution_id: str = Field(nullable=False)
+    node_id: str = Field(nullable=False)
+    stored_data_id: int = Field(nullable=False, index=True)
+    created_at: str | None = None
+
+
+class RetentionPolicyModel(SQLModel, table=True):
+    """
+    执行历史保留策略。``rule_id`` 为 0 表示项目级默认，规则级策略整体覆盖项目级；
+    ``keep_executions`` / ``keep_days`` 为 None 表示不按该维度清理。
+    """
+
+    __tablename__ = "retention_policies"
+    __table_args__ = (UniqueConstraint("project_id", "rule_id", name="uq_retention_project_rule"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    project_id: int = Field(nullable=False)
+    rule_id: int = Field(nullable=False, default=0)
+    keep_executions: int | None = None
+    keep_days: int | None = None
+    compact_stored_data: bool = Field(default=False, nullable=False, sa_column_kwargs={"server_default": "0"})
+    created_at: str | None = None
+    updated_at: str | None = None
+
+
+class JobQueueModel(SQLModel, table=True):
+    __tablename__ = "job_queue"
+    __table_args__ = (
+        Index("ix_job_queue_status_available_at", "status", "available_at"),
+        Index("ix_job_queue_batch_id_status", "batch_id", "status"),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    execution_id: str = Field(nullable=False, unique=True)
+    project_id: int = Field(nullable=False)
+    rule_id: int = Field(nullable=False)
+    variables: str | None = None
+    batch_id: str | None = None
+    batch_concurrency: int | None = None
+    status: str = Field(nullable=False, default="queued")
+    attempts: int = Field(nullable=False, default=0)
+    max_attempts: int = Field(nullable=False, default=3)
+    available_at: str | None = None
+    lease_owner: str | None = None
+    lease_expires_at: str | None = None
+    last_error: str | None = None
+    created_at: str | None = None
+    updated_at: str | None = None
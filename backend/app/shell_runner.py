@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any
+
+from loguru import logger
+
+from .config import ROOT_DIR, get_app_config
+from .ids import safe_name
+
+
+SHELL_READ_CHUNK_BYTES = 64 * 1024
+
+
+class ShellTimeoutError(RuntimeError):
+    pass
+
+
+class _RingBuffer:
+    """只保留最后 ``limit`` 字节的输出，同时统计总字节数；可选把完整输出写入 spill 文件。"""
+
+    def __init__(self, limit: int, spill: IO[bytes] | None = None):
+        self.limit = max(0, limit)
+        self.total = 0
+        self.spill = spill
+        self._data = bytearray()
+
+    def append(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        if self.spill is not None:
+            self.spill.write(chunk)
+        self._data += chunk
+        overflow = len(self._data) - self.limit
+        if overflow > 0:
+            del self._data[:overflow]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self._data)
+
+    def text(self) -> str:
+        return self._data.decode("utf-8", errors="replace")
+
+
+@dataclass
+class ShellResult:
+    returncode: int
+    stdout: str
+    stderr: str
+    stdout_bytes: int
+    stderr_bytes: int
+    stdout_truncated: bool
+    stderr_truncated: bool
+    stdout_file: str | None
+    stderr_file: str | None
+    elapsed_ms: int
+
+    def metadata(self) -> dict[str, Any]:
+        return {
+            "stdout_bytes": self.stdout_bytes,
+            "stderr_bytes": self.stderr_bytes,
+            "stdout_truncated": self.stdout_truncated,
+            "stderr_truncated": self.stderr_truncated,
+            "stdout_file": self.stdout_file,
+            "stderr_file": self.stderr_file,
+            "elapsed_ms": self.elapsed_ms,
+        }
+
+
+def _kill_process_group(pid: int) -> None:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class ShellRunner:
+    """
+    shell 节点执行器：所有子进程运行在一个专用的 asyncio 事件循环线程上。
+
+    - 节点线程通过 ``run`` 提交任务并等待结果，不论调用方是否已有事件循环都可使用；
+    - stdout/stderr 增量读取进环形缓冲区，只保留末尾 ``max_output_bytes``；``spill=True`` 时完整输出写入
+      ``<spill_dir>/<execution_id>/`` 下的文件，保留策略删除执行时由 ``delete_spill_files`` 一并删除；
+    - 子进程在新会话中启动，超时后向整个进程组发送 SIGKILL；
+    - ``max_concurrency`` 限制全局同时运行的 shell 进程数，排队时间不计入超时。
+    """
+
+    def __init__(self, max_concurrency: int, spill_dir: str | None = None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.spill_dir = Path(spill_dir) if spill_dir else ROOT_DIR / "data" / "shell_spill"
+        self.running = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run_loop() -> None:
+                    asyncio.set_event_loop(loop)
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                    ready.set()
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run_loop, name="shell-runner", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def run(
+        self,
+        command: str,
+        cwd: str | None,
+        timeout_sec: float,
+        max_output_bytes: int,
+        spill: bool = False,
+        execution_id: str | None = None,
+    ) -> ShellResult:
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            self._run(command, cwd, timeout_sec, max_output_bytes, spill, execution_id), loop
+        )
+        return future.result()
+
+    async def _run(
+        self, command: str, cwd: str | None, timeout_sec: float, max_output_bytes: int, spill: bool, execution_id: str | None
+    ) -> ShellResult:
+        assert self._semaphore is not None
+        async with self._semaphore:
+            with self._lock:
+                self.running += 1
+            try:
+                return await self._spawn(command, cwd, timeout_sec, max_output_bytes, spill, execution_id)
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+    def _open_spill(self, execution_id: str | None, stream: str) -> IO[bytes]:
+        folder = self.spill_dir / safe_name(execution_id or "adhoc")
+        folder.mkdir(parents=True, exist_ok=True)
+        return tempfile.NamedTemporaryFile(prefix=f"shell-{stream}-", suffix=".log", dir=folder, delete=False)
+
+    def delete_spill_files(self, execution_ids: list[str]) -> None:
+        if not self.spill_dir.exists():
+            return
+        for execution_id in execution_ids:
+            shutil.rmtree(self.spill_dir / safe_name(execution_id), ignore_errors=True)
+
+    async def _spawn(
+        self, command: str, cwd: str | None, timeout_sec: float, max_output_bytes: int, spill: bool, execution_id: str | None
+    ) -> ShellResult:
+        spill_files = (
+            [self._open_spill(execution_id, "stdout"), self._open_spill(execution_id, "stderr")] if spill else [None, None]
+        )
+        stdout = _RingBuffer(max_output_bytes, spill_files[0])
+        stderr = _RingBuffer(max_output_bytes, spill_files[1])
+        started = time.perf_counter()
+        try:
+            process = await asyncio.create_subprocess_shell(
+                command,
+                cwd=cwd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+            readers = asyncio.gather(_drain(process.stdout, stdout), _drain(process.stderr, stderr))
+            try:
+                await asyncio.wait_for(asyncio.shield(readers), timeout_sec)
+                returncode = await asyncio.wait_for(process.wait(), max(0.1, timeout_sec - (time.perf_counter() - started)))
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self.timeouts += 1
+                _kill_process_group(process.pid)
+                await process.wait()
+                # 脱离进程组的后代进程可能仍持有管道，最多再等 5 秒
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(readers, 5)
+                logger.warning("shell command killed after {}s pid={}", timeout_sec, process.pid)
+                raise ShellTimeoutError(f"shell command timed out after {timeout_sec}s") from None
+        finally:
+            for spill_file in spill_files:
+                if spill_file is not None:
+                    spill_file.close()
+        return ShellResult(
+            returncode=returncode,
+            stdout=stdout.text(),
+            stderr=stderr.text(),
+            stdout_bytes=stdout.total,
+            stderr_bytes=stderr.total,
+            stdout_truncated=stdout.truncated,
+            stderr_truncated=stderr.truncated,
+            stdout_file=spill_files[0].name if spill_files[0] is not None else None,
+            stderr_file=spill_files[1].name if spill_files[1] is not None else None,
+            elapsed_ms=int((time.perf_counter() - started) * 1000),
+        )
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"max_concurrency": self.max_concurrency, "running": self.running, "timeouts": self.timeouts}
+
+
+async def _drain(reader: asyncio.StreamReader | None, buffer: _RingBuffer) -> None:
+    if reader is None:
+        return
+    while True:
+        chunk = await reader.read(SHELL_READ_CHUNK_BYTES)
+        if not chunk:
+            return
+        buffer.append(chunk)
+
+
+_runner: ShellRunner | None = None
+_runner_lock = threading.Lock()
+
+
+def get_shell_runner() -> ShellRunner:
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            config = get_app_config()
+            _runner = ShellRunner(config.shell_max_concurrency, config.shell_spill_dir)
+        return _runner
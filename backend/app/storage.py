@@ -1,32 +1,53 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime
-from typing import Any
+from datetime import datetime, timedelta
+from typing import Any, Iterator
 
-from sqlalchemy import delete
-from sqlmodel import select
+from sqlalchemy import and_, delete, func, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, defer
+from sqlmodel import Session, select
 
 from .db import SessionLocal
+from .connector_cache import connectors
+from .globals_cache import project_globals
+from .ids import new_batch_id, new_execution_id
+from .metrics import storage_writes
+from .payloads import decompress, get_payload_codec
+from .pools import invalidate_connector
 from .schema import (
     ConnectorModel,
+    EdgeModel,
+    ExecutionBatchModel,
     ExecutionModel,
     ExecutionStepModel,
     GlobalVarModel,
+    JobQueueModel,
     NodeModel,
     ProjectModel,
+    RetentionPolicyModel,
     RuleModel,
+    StepPayloadModel,
+    StoredDataCurrentModel,
     StoredDataModel,
 )
 
 
+TERMINAL_EXECUTION_STATUSES = ("completed", "failed")
+
+
 def _now_iso() -> str:
     return datetime.utcnow().isoformat()
 
 
+def _iso_after(seconds: float) -> str:
+    return (datetime.utcnow() + timedelta(seconds=seconds)).isoformat()
+
+
 class Storage:
-    def __init__(self):
-        self.session = SessionLocal()
+    def __init__(self, session: Session | None = None):
+        self.session = session or SessionLocal()
 
     def close(self):
         self.session.close()
@@ -38,6 +59,7 @@ class Storage:
         self.session.add(project)
         self.session.commit()
         self.session.refresh(project)
+        project_globals.invalidate(project.id)
         return project
 
     def list_projects(self) -> list[ProjectModel]:
@@ -68,6 +90,8 @@ class Storage:
             return False
         self.session.delete(project)
         self.session.commit()
+        project_globals.invalidate(project_id)
+        connectors.invalidate(project_id)
         return True
 
     def ensure_default_project(self) -> ProjectModel:
@@ -100,10 +124,23 @@ class Storage:
         if description is not None:
             rule.description = description
         rule.updated_at = _now_iso()
+        rule.version = RuleModel.version + 1
         self.session.commit()
         self.session.refresh(rule)
         return rule
 
+    def get_rule_version(self, rule_id: int) -> int | None:
+        """仅查询版本号（主键查询），供执行计划缓存判断是否过期。"""
+        return self.session.execute(select(RuleModel.version).where(RuleModel.id == rule_id)).scalar_one_or_none()
+
+    def _bump_rule_version(self, rule_id: int):
+        """节点/边变更时在同一事务内递增规则版本，使各进程的执行计划缓存失效。"""
+        self.session.execute(
+            update(RuleModel)
+            .where(RuleModel.id == rule_id)
+            .values(version=RuleModel.version + 1, updated_at=_now_iso())
+        )
+
     def delete_rule(self, project_id: int, rule_id: int) -> bool:
         rule = self.get_rule(project_id, rule_id)
         if not rule:
@@ -125,6 +162,7 @@ class Storage:
                     config=json.dumps(node.get("config", {}), ensure_ascii=True),
                 )
             )
+        self._bump_rule_version(rule_id)
         self.session.commit()
 
     def list_nodes(self, rule_id: int) -> list[NodeModel]:
@@ -135,6 +173,24 @@ class Storage:
         )
         return list(self.session.exec(statement).all())
 
+    def replace_edges(self, rule_id: int, edges: list[dict[str, Any]]):
+        self.session.execute(delete(EdgeModel).where(EdgeModel.rule_id == rule_id))
+        for edge in edges:
+            self.session.add(
+                EdgeModel(
+                    rule_id=rule_id,
+                    source_node=edge.get("source_node") or edge["source"],
+                    target_node=edge.get("target_node") or edge["target"],
+                    condition=edge.get("condition"),
+                )
+            )
+        self._bump_rule_version(rule_id)
+        self.session.commit()
+
+    def list_edges(self, rule_id: int) -> list[EdgeModel]:
+        statement = select(EdgeModel).where(EdgeModel.rule_id == rule_id).order_by(EdgeModel.id)
+        return list(self.session.exec(statement).all())
+
     # ===== Global Vars =====
     def list_globals(self, project_id: int) -> list[GlobalVarModel]:
         return list(self.session.exec(select(GlobalVarModel).where(GlobalVarModel.project_id == project_id)).all())
@@ -152,6 +208,7 @@ class Storage:
             existing.description = description
             existing.updated_at = now
             self.session.commit()
+            project_globals.invalidate(project_id)
             self.session.refresh(existing)
             return existing
 
@@ -166,6 +223,7 @@ class Storage:
         )
         self.session.add(record)
         self.session.commit()
+        project_globals.invalidate(project_id)
         self.session.refresh(record)
         return record
 
@@ -177,6 +235,7 @@ class Storage:
             return False
         self.session.delete(record)
         self.session.commit()
+        project_globals.invalidate(project_id)
         return True
 
     # ===== Connectors =====
@@ -193,6 +252,7 @@ class Storage:
         self.session.add(connector)
         self.session.commit()
         self.session.refresh(connector)
+        connectors.invalidate(project_id, name=name)
         return connector
 
     def list_connectors(self, project_id: int) -> list[ConnectorModel]:
@@ -208,6 +268,16 @@ class Storage:
             select(ConnectorModel).where(ConnectorModel.project_id == project_id, ConnectorModel.name == name)
         ).first()
 
+    def get_connectors_by_names(self, project_id: int, names: list[str]) -> list[ConnectorModel]:
+        """一次查询取回多个连接器，供执行计划批量解析。"""
+        if not names:
+            return []
+        return list(
+            self.session.exec(
+                select(ConnectorModel).where(ConnectorModel.project_id == project_id, ConnectorModel.name.in_(names))
+            ).all()
+        )
+
     def update_connector(
         self,
         project_id: int,
@@ -225,6 +295,8 @@ class Storage:
         connector.updated_at = _now_iso()
         self.session.commit()
         self.session.refresh(connector)
+        invalidate_connector(connector_id)
+        connectors.invalidate(project_id, connector_id=connector_id, name=connector.name)
         return connector
 
     def delete_connector(self, project_id: int, connector_id: int) -> bool:
@@ -233,21 +305,51 @@ class Storage:
             return False
         self.session.delete(connector)
         self.session.commit()
+        invalidate_connector(connector_id)
+        connectors.invalidate(project_id, connector_id=connector_id)
         return True
 
     # ===== Executions =====
-    def create_execution(self, project_id: int, rule_id: int, variables: dict[str, Any]) -> ExecutionModel:
-        exec_id = f"exec_{int(datetime.utcnow().timestamp() * 1000)}"
+    def create_execution(
+        self, project_id: int, rule_id: int, variables: dict[str, Any], status: str = "running"
+    ) -> ExecutionModel:
+        now = _now_iso()
         record = ExecutionModel(
             project_id=project_id,
             rule_id=rule_id,
-            execution_id=exec_id,
-            started_at=_now_iso(),
-            status="running",
+            execution_id=new_execution_id(),
+            started_at=now,
+            run_started_at=now if status == "running" else None,
+            status=status,
             variables=json.dumps(variables, ensure_ascii=True),
         )
         self.session.add(record)
         self.session.commit()
+        storage_writes.inc("executions")
+        self.session.refresh(record)
+        return record
+
+    def start_execution(self, execution_id: str) -> ExecutionModel | None:
+        """
+        把已入队的执行标记为 running，开始时间记在 ``run_started_at``（``started_at`` 保持创建时间，
+        历史分页不会因认领或重试而跳页）。租约过期后的重试会先删除上一次尝试写下的步骤与外置载荷，
+        执行详情只保留本次尝试的步骤。
+        """
+        record = self.get_execution(execution_id)
+        if not record:
+            return None
+        stale_steps = self.session.execute(
+            delete(ExecutionStepModel).where(ExecutionStepModel.execution_id == execution_id)
+        ).rowcount
+        if stale_steps:
+            self.session.execute(delete(StepPayloadModel).where(StepPayloadModel.execution_id == execution_id))
+        record.run_started_at = _now_iso()
+        record.completed_at = None
+        record.status = "running"
+        record.result_summary = None
+        self.session.commit()
+        if stale_steps:
+            get_payload_codec().delete_files([execution_id])
         self.session.refresh(record)
         return record
 
@@ -260,42 +362,142 @@ class Storage:
         record.result_summary = summary
         self.session.commit()
 
-    def list_executions(self, project_id: int, rule_id: int | None = None) -> list[ExecutionModel]:
+    def list_executions(
+        self,
+        project_id: int,
+        rule_id: int | None = None,
+        *,
+        statuses: list[str] | None = None,
+        started_after: str | None = None,
+        started_before: str | None = None,
+        before: tuple[str, int] | None = None,
+        limit: int | None = None,
+        with_variables: bool = True,
+    ) -> list[ExecutionModel]:
+        """
+        按 ``started_at DESC, id DESC`` 返回执行记录。``before`` 为上一页最后一条的 (started_at, id)，
+        用于 keyset 分页；``with_variables=False`` 时不加载 ``variables`` 列。
+        """
         statement = select(ExecutionModel).where(ExecutionModel.project_id == project_id)
         if rule_id is not None:
             statement = statement.where(ExecutionModel.rule_id == rule_id)
+        if statuses:
+            statement = statement.where(ExecutionModel.status.in_(statuses))
+        if started_after is not None:
+            statement = statement.where(ExecutionModel.started_at >= started_after)
+        if started_before is not None:
+            statement = statement.where(ExecutionModel.started_at < started_before)
+        if before is not None:
+            started_at, record_id = before
+            statement = statement.where(
+                or_(
+                    ExecutionModel.started_at < started_at,
+                    and_(ExecutionModel.started_at == started_at, ExecutionModel.id < record_id),
+                )
+            )
+        if not with_variables:
+            statement = statement.options(defer(ExecutionModel.variables))
+        statement = statement.order_by(ExecutionModel.started_at.desc(), ExecutionModel.id.desc())
+        if limit is not None:
+            statement = statement.limit(limit)
         return list(self.session.exec(statement).all())
 
     def get_execution(self, execution_id: str) -> ExecutionModel | None:
         return self.session.exec(select(ExecutionModel).where(ExecutionModel.execution_id == execution_id)).first()
 
-    def add_step(self, execution_id: str, node_id: str, action_type: str, content: str) -> ExecutionStepModel:
-        step = ExecutionStepModel(
-            execution_id=execution_id,
-            node_id=node_id,
-            action_type=action_type,
-            content=content,
-            started_at=_now_iso(),
-            status="running",
-        )
-        self.session.add(step)
-        self.session.commit()
-        self.session.refresh(step)
-        return step
-
-    def complete_step(self, step_id: int, status: str, output: str | None, step_data: str | None = None):
-        step = self.session.get(ExecutionStepModel, step_id)
-        if not step:
-            return
-        step.completed_at = _now_iso()
-        step.status = status
-        step.output = output
-        step.step_data = step_data
-        self.session.commit()
+    def _offload_step_data(self, step: dict[str, Any], written: list[str]) -> dict[str, Any]:
+        """
+        超过内联阈值的 step_data 压缩外置（与步骤写入同一事务），步骤行改存预览与引用。
+
+        ``payloads.store: file`` 时文件在提交前写入，引用追加到 ``written``；提交失败时调用方用
+        ``_discard_payload_files`` 删除，不留下没有步骤引用的文件。
+        """
+        step = {"payload_ref": None, "payload_bytes": None, **step}
+        codec = get_payload_codec()
+        payload = codec.offload(step.get("step_data"))
+        if payload is None:
+            return step
+        if codec.store == "file":
+            ref = codec.write_file(step["execution_id"], payload)
+            written.append(ref)
+        else:
+            blob = StepPayloadModel(
+                execution_id=step["execution_id"],
+                encoding=payload.encoding,
+                size_bytes=payload.size_bytes,
+                data=payload.data,
+            )
+            self.session.add(blob)
+            self.session.flush()
+            ref = f"db:{blob.id}"
+        storage_writes.inc("step_payloads")
+        return {**step, "step_data": payload.preview, "payload_ref": ref, "payload_bytes": payload.size_bytes}
+
+    @staticmethod
+    def _discard_payload_files(refs: list[str]) -> None:
+        codec = get_payload_codec()
+        for ref in refs:
+            codec.delete_file(ref)
+
+    def insert_steps(self, steps: list[dict[str, Any]]) -> list[int]:
+        """一次 INSERT（多行时为 executemany）写入已完成的步骤，用 RETURNING 取回 id，不做 refresh。"""
+        if not steps:
+            return []
+        written: list[str] = []
+        try:
+            steps = [self._offload_step_data(step, written) for step in steps]
+            result = self.session.execute(insert(ExecutionStepModel).returning(ExecutionStepModel.id), steps)
+            ids = [row[0] for row in result]
+            self.session.commit()
+        except Exception:
+            self._discard_payload_files(written)
+            raise
+        storage_writes.inc("execution_steps", amount=len(ids))
+        return ids
 
     def list_steps(self, execution_id: str) -> list[ExecutionStepModel]:
         return list(self.session.exec(select(ExecutionStepModel).where(ExecutionStepModel.execution_id == execution_id)).all())
 
+    def iter_steps(self, execution_id: str, with_data: bool = False, batch_size: int = 100) -> Iterator[ExecutionStepModel]:
+        """按 id 顺序分批迭代步骤；``with_data=False`` 时不加载 step_data 列。"""
+        statement = (
+            select(ExecutionStepModel)
+            .where(ExecutionStepModel.execution_id == execution_id)
+            .order_by(ExecutionStepModel.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if not with_data:
+            statement = statement.options(defer(ExecutionStepModel.step_data))
+        yield from self.session.exec(statement)
+
+    def iter_stored_data(self, execution_id: str, batch_size: int = 100) -> Iterator[StoredDataModel]:
+        statement = (
+            select(StoredDataModel)
+            .where(StoredDataModel.execution_id == execution_id)
+            .order_by(StoredDataModel.id)
+            .execution_options(yield_per=batch_size)
+        )
+        yield from self.session.exec(statement)
+
+    def get_step(self, execution_id: str, step_id: int) -> ExecutionStepModel | None:
+        return self.session.exec(
+            select(ExecutionStepModel).where(
+                ExecutionStepModel.execution_id == execution_id, ExecutionStepModel.id == step_id
+            )
+        ).first()
+
+    def load_step_data(self, step: ExecutionStepModel) -> str | None:
+        """返回步骤完整的 step_data JSON；外置的内容按引用读取并解压。"""
+        if not step.payload_ref:
+            return step.step_data
+        kind, _, ref = step.payload_ref.partition(":")
+        if kind == "file":
+            return get_payload_codec().read_file(step.payload_ref)
+        blob = self.session.get(StepPayloadModel, int(ref))
+        if blob is None:
+            return None
+        return decompress(blob.data, blob.encoding).decode("utf-8")
+
     def store_data(
         self,
         project_id: int,
@@ -317,33 +519,445 @@ class Storage:
             created_at=_now_iso(),
         )
         self.session.add(record)
+        self.session.flush()
+        if key is not None and scope:
+            self._upsert_current_value(record)
         self.session.commit()
+        storage_writes.inc("stored_data")
         self.session.refresh(record)
         return record
 
+    def _upsert_current_value(self, record: StoredDataModel) -> None:
+        """在当前事务中更新 ``stored_data_current``；并发写入时以 stored_data.id 较大者为准。"""
+        scope_rule_id = 0 if record.scope == "project" else record.rule_id
+        values = {
+            "value": record.value,
+            "rule_id": record.rule_id,
+            "execution_id": record.execution_id,
+            "node_id": record.node_id,
+            "stored_data_id": record.id,
+            "created_at": record.created_at,
+        }
+        current = update(StoredDataCurrentModel).where(
+            StoredDataCurrentModel.project_id == record.project_id,
+            StoredDataCurrentModel.scope == record.scope,
+            StoredDataCurrentModel.scope_rule_id == scope_rule_id,
+            StoredDataCurrentModel.key == record.key,
+            StoredDataCurrentModel.stored_data_id < record.id,
+        )
+        if self.session.execute(current.values(**values)).rowcount:
+            return
+        try:
+            with self.session.begin_nested():
+                self.session.execute(
+                    insert(StoredDataCurrentModel).values(
+                        project_id=record.project_id,
+                        scope=record.scope,
+                        scope_rule_id=scope_rule_id,
+                        key=record.key,
+                        **values,
+                    )
+                )
+        except IntegrityError:
+            # 已存在：要么是更新的写入（无需处理），要么刚被并发插入
+            self.session.execute(current.values(**values))
+
     def list_stored_data(self, execution_id: str) -> list[StoredDataModel]:
         return list(self.session.exec(select(StoredDataModel).where(StoredDataModel.execution_id == execution_id)).all())
 
-    def read_latest_stored_data(self, project_id: int, rule_id: int, scope: str, key: str) -> StoredDataModel | None:
-        statement = select(StoredDataModel).where(
-            StoredDataModel.project_id == project_id,
-            StoredDataModel.scope == scope,
-            StoredDataModel.key == key,
-        )
-        if scope == "rule":
-            statement = statement.where(StoredDataModel.rule_id == rule_id)
-        statement = statement.order_by(StoredDataModel.id.desc())
-        return self.session.exec(statement).first()
+    def read_latest_stored_data(
+        self, project_id: int, rule_id: int, scope: str, key: str
+    ) -> StoredDataCurrentModel | None:
+        return self.session.exec(
+            select(StoredDataCurrentModel).where(
+                StoredDataCurrentModel.project_id == project_id,
+                StoredDataCurrentModel.scope == scope,
+                StoredDataCurrentModel.scope_rule_id == (0 if scope == "project" else rule_id),
+                StoredDataCurrentModel.key == key,
+            )
+        ).first()
 
     def load_latest_store_snapshot(self, project_id: int, rule_id: int) -> dict:
-        """加载 project + rule scope 下所有 key 的最新值，用于填充 ctx.store"""
-        statement = select(StoredDataModel).where(
-            StoredDataModel.project_id == project_id,
-            StoredDataModel.key.isnot(None),
-        ).order_by(StoredDataModel.id.asc())
-        records = self.session.exec(statement).all()
-        snapshot = {}
-        for r in records:
-            if r.scope == "project" or r.rule_id == rule_id:
-                snapshot[r.key] = r.value
-        return snapshot
+        """加载 project + rule scope 下所有 key 的最新值，用于填充 ctx.store；同名 key 以最后写入者为准"""
+        statement = (
+            select(StoredDataCurrentModel.key, StoredDataCurrentModel.value)
+            .where(
+                StoredDataCurrentModel.project_id == project_id,
+                or_(
+                    StoredDataCurrentModel.scope == "project",
+                    and_(StoredDataCurrentModel.scope == "rule", StoredDataCurrentModel.scope_rule_id == rule_id),
+                ),
+            )
+            .order_by(StoredDataCurrentModel.stored_data_id.asc())
+        )
+        return {key: value for key, value in self.session.execute(statement).all()}
+
+    # ===== Job Queue =====
+    def enqueue_execution(
+        self, project_id: int, rule_id: int, variables: dict[str, Any], max_attempts: int = 3
+    ) -> ExecutionModel:
+        """创建 queued 状态的执行记录并写入 job_queue，worker 认领后再执行。"""
+        execution = self.create_execution(project_id, rule_id, variables, status="queued")
+        now = _now_iso()
+        job = JobQueueModel(
+            execution_id=execution.execution_id,
+            project_id=project_id,
+            rule_id=rule_id,
+            variables=execution.variables,
+            status="queued",
+            max_attempts=max_attempts,
+            available_at=now,
+            created_at=now,
+            updated_at=now,
+        )
+        self.session.add(job)
+        self.session.commit()
+        return execution
+
+    def get_job(self, execution_id: str) -> JobQueueModel | None:
+        return self.session.exec(select(JobQueueModel).where(JobQueueModel.execution_id == execution_id)).first()
+
+    def claim_job(self, worker_id: str, lease_sec: float) -> JobQueueModel | None:
+        """
+        认领一条可执行的任务：Postgres 上使用 ``FOR UPDATE SKIP LOCKED``；
+        随后的条件 UPDATE 保证 SQLite 等不支持行锁的库上也不会被重复认领。
+
+        批次任务只在该批次 running 任务数小于 ``batch_concurrency`` 时可认领，跨 worker 进程生效。
+        """
+        now = _now_iso()
+        running = aliased(JobQueueModel)
+        batch_running = (
+            select(func.count())
+            .select_from(running)
+            .where(running.batch_id == JobQueueModel.batch_id, running.status == "running")
+            .scalar_subquery()
+        )
+        statement = (
+            select(JobQueueModel)
+            .where(
+                JobQueueModel.status == "queued",
+                JobQueueModel.available_at <= now,
+                or_(JobQueueModel.batch_id.is_(None), batch_running < JobQueueModel.batch_concurrency),
+            )
+            .order_by(JobQueueModel.available_at, JobQueueModel.id)
+            .limit(1)
+            .with_for_update(skip_locked=True, of=JobQueueModel)
+        )
+        job = self.session.exec(statement).first()
+        if not job:
+            self.session.rollback()
+            return None
+        if job.batch_id is not None:
+            # 对批次行做一次空更新取得行锁（SQLite 上即写锁），再数 running，避免并发认领超出批次并发
+            self.session.execute(
+                update(ExecutionBatchModel)
+                .where(ExecutionBatchModel.batch_id == job.batch_id)
+                .values(concurrency=ExecutionBatchModel.concurrency)
+            )
+            running_count = self.session.execute(
+                select(func.count())
+                .select_from(JobQueueModel)
+                .where(JobQueueModel.batch_id == job.batch_id, JobQueueModel.status == "running")
+            ).scalar_one()
+            if running_count >= (job.batch_concurrency or 1):
+                self.session.rollback()
+                return None
+        result = self.session.execute(
+            update(JobQueueModel)
+            .where(JobQueueModel.id == job.id, JobQueueModel.status == "queued")
+            .values(
+                status="running",
+                attempts=JobQueueModel.attempts + 1,
+                lease_owner=worker_id,
+                lease_expires_at=_iso_after(lease_sec),
+                updated_at=now,
+            )
+        )
+        self.session.commit()
+        if result.rowcount != 1:
+            return None
+        self.session.refresh(job)
+        return job
+
+    def renew_job_lease(self, job_id: int, worker_id: str, lease_sec: float) -> bool:
+        result = self.session.execute(
+            update(JobQueueModel)
+            .where(
+                JobQueueModel.id == job_id,
+                JobQueueModel.status == "running",
+                JobQueueModel.lease_owner == worker_id,
+            )
+            .values(lease_expires_at=_iso_after(lease_sec), updated_at=_now_iso())
+        )
+        self.session.commit()
+        return result.rowcount == 1
+
+    def finish_job(self, job_id: int, worker_id: str, status: str, error: str | None = None) -> bool:
+        result = self.session.execute(
+            update(JobQueueModel)
+            .where(JobQueueModel.id == job_id, JobQueueModel.lease_owner == worker_id)
+            .values(status=status, last_error=error, lease_expires_at=None, updated_at=_now_iso())
+        )
+        self.session.commit()
+        return result.rowcount == 1
+
+    def recover_expired_jobs(self, retry_delay_sec: float = 0) -> int:
+        """
+        回收租约过期的 running 任务（worker 崩溃或失联）：未达 max_attempts 的重新入队，
+        否则任务与执行记录都标记为 failed。返回处理的任务数。
+        """
+        now = _now_iso()
+        expired = self.session.exec(
+            select(JobQueueModel)
+            .where(JobQueueModel.status == "running", JobQueueModel.lease_expires_at < now)
+            .with_for_update(skip_locked=True)
+        ).all()
+        requeued_execution_ids = []
+        failed_execution_ids = []
+        for job in expired:
+            job.lease_owner = None
+            job.lease_expires_at = None
+            job.updated_at = now
+            if job.attempts < job.max_attempts:
+                job.status = "queued"
+                job.available_at = _iso_after(retry_delay_sec)
+                job.last_error = "lease expired, requeued"
+                requeued_execution_ids.append(job.execution_id)
+            else:
+                job.status = "failed"
+                job.last_error = "lease expired, max attempts reached"
+                failed_execution_ids.append(job.execution_id)
+        if requeued_execution_ids:
+            self.session.execute(
+                update(ExecutionModel)
+                .where(ExecutionModel.execution_id.in_(requeued_execution_ids))
+                .values(status="queued")
+            )
+        self.session.commit()
+        for execution_id in failed_execution_ids:
+            self.complete_execution(execution_id, "failed", "worker lease expired, max attempts reached")
+        return len(expired)
+
+    # ===== Batches =====
+    def create_batch(
+        self,
+        project_id: int,
+        rule_id: int,
+        variables_list: list[dict[str, Any]],
+        concurrency: int,
+        enqueue: bool = False,
+        max_attempts: int = 3,
+    ) -> ExecutionBatchModel:
+        """在一个事务内创建批次及其全部 queued 执行记录；``enqueue`` 为 True 时同时写入 job_queue。"""
+        now = _now_iso()
+        batch = ExecutionBatchModel(
+            batch_id=new_batch_id(),
+            project_id=project_id,
+            rule_id=rule_id,
+            status="running",
+            total=len(variables_list),
+            concurrency=concurrency,
+            created_at=now,
+        )
+        self.session.add(batch)
+        for variables in variables_list:
+            execution_id = new_execution_id()
+            variables_json = json.dumps(variables, ensure_ascii=True)
+            self.session.add(
+                ExecutionModel(
+                    project_id=project_id,
+                    rule_id=rule_id,
+                    execution_id=execution_id,
+                    batch_id=batch.batch_id,
+                    started_at=now,
+                    status="queued",
+                    variables=variables_json,
+                )
+            )
+            if enqueue:
+                self.session.add(
+                    JobQueueModel(
+                        execution_id=execution_id,
+                        project_id=project_id,
+                        rule_id=rule_id,
+                        variables=variables_json,
+                        batch_id=batch.batch_id,
+                        batch_concurrency=concurrency,
+                        status="queued",
+                        max_attempts=max_attempts,
+                        available_at=now,
+                        created_at=now,
+                        updated_at=now,
+                    )
+                )
+        self.session.commit()
+        storage_writes.inc("executions", amount=len(variables_list))
+        self.session.refresh(batch)
+        return batch
+
+    def get_batch(self, batch_id: str) -> ExecutionBatchModel | None:
+        return self.session.exec(select(ExecutionBatchModel).where(ExecutionBatchModel.batch_id == batch_id)).first()
+
+    def list_batch_executions(self, batch_id: str) -> list[ExecutionModel]:
+        return list(
+            self.session.exec(
+                select(ExecutionModel).where(ExecutionModel.batch_id == batch_id).order_by(ExecutionModel.id)
+            ).all()
+        )
+
+    def count_batch_statuses(self, batch_id: str) -> dict[str, int]:
+        rows = self.session.execute(
+            select(ExecutionModel.status, func.count())
+            .where(ExecutionModel.batch_id == batch_id)
+            .group_by(ExecutionModel.status)
+        ).all()
+        return {status or "unknown": count for status, count in rows}
+
+    def complete_batch(self, batch_id: str, status: str = "completed"):
+        self.session.execute(
+            update(ExecutionBatchModel)
+            .where(ExecutionBatchModel.batch_id == batch_id)
+            .values(status=status, completed_at=_now_iso())
+        )
+        self.session.commit()
+
+    # ===== Retention =====
+    def list_retention_policies(self, project_id: int) -> list[RetentionPolicyModel]:
+        return list(
+            self.session.exec(
+                select(RetentionPolicyModel)
+                .where(RetentionPolicyModel.project_id == project_id)
+                .order_by(RetentionPolicyModel.rule_id)
+            ).all()
+        )
+
+    def upsert_retention_policy(
+        self,
+        project_id: int,
+        rule_id: int,
+        keep_executions: int | None,
+        keep_days: int | None,
+        compact_stored_data: bool,
+    ) -> RetentionPolicyModel:
+        now = _now_iso()
+        policy = self.session.exec(
+            select(RetentionPolicyModel).where(
+                RetentionPolicyModel.project_id == project_id, RetentionPolicyModel.rule_id == rule_id
+            )
+        ).first()
+        if policy is None:
+            policy = RetentionPolicyModel(project_id=project_id, rule_id=rule_id, created_at=now)
+            self.session.add(policy)
+        policy.keep_executions = keep_executions
+        policy.keep_days = keep_days
+        policy.compact_stored_data = compact_stored_data
+        policy.updated_at = now
+        self.session.commit()
+        self.session.refresh(policy)
+        return policy
+
+    def delete_retention_policy(self, project_id: int, rule_id: int) -> bool:
+        result = self.session.execute(
+            delete(RetentionPolicyModel).where(
+                RetentionPolicyModel.project_id == project_id, RetentionPolicyModel.rule_id == rule_id
+            )
+        )
+        self.session.commit()
+        return bool(result.rowcount)
+
+    def list_expired_execution_ids(
+        self,
+        project_id: int,
+        rule_id: int,
+        keep_executions: int | None,
+        started_before: str | None,
+        limit: int,
+    ) -> list[str]:
+        """
+        返回超出保留范围的已结束执行：比最新 ``keep_executions`` 条更早，或 started_at 早于 ``started_before``。
+        queued/running 的执行不会被清理。
+        """
+        conditions = []
+        if keep_executions is not None:
+            boundary = self.session.execute(
+                select(ExecutionModel.started_at, ExecutionModel.id)
+                .where(ExecutionModel.project_id == project_id, ExecutionModel.rule_id == rule_id)
+                .order_by(ExecutionModel.started_at.desc(), ExecutionModel.id.desc())
+                .offset(max(keep_executions, 0))
+                .limit(1)
+            ).first()
+            if boundary is not None:
+                started_at, record_id = boundary
+                conditions.append(
+                    or_(
+                        ExecutionModel.started_at < started_at,
+                        and_(ExecutionModel.started_at == started_at, ExecutionModel.id <= record_id),
+                    )
+                )
+        if started_before is not None:
+            conditions.append(ExecutionModel.started_at < started_before)
+        if not conditions:
+            return []
+        statement = (
+            select(ExecutionModel.execution_id)
+            .where(
+                ExecutionModel.project_id == project_id,
+                ExecutionModel.rule_id == rule_id,
+                ExecutionModel.status.in_(TERMINAL_EXECUTION_STATUSES),
+                or_(*conditions),
+            )
+            .order_by(ExecutionModel.started_at.asc(), ExecutionModel.id.asc())
+            .limit(limit)
+        )
+        return list(self.session.execute(statement).scalars().all())
+
+    def delete_executions(self, execution_ids: list[str]) -> dict[str, int]:
+        """在一个事务中删除执行及其步骤、存储历史与队列记录（``stored_data_current`` 中的当前值保留）。"""
+        if not execution_ids:
+            return {"executions": 0, "steps": 0, "stored_data": 0}
+        steps = self.session.execute(
+            delete(ExecutionStepModel).where(ExecutionStepModel.execution_id.in_(execution_ids))
+        ).rowcount
+        stored = self.session.execute(
+            delete(StoredDataModel).where(StoredDataModel.execution_id.in_(execution_ids))
+        ).rowcount
+        self.session.execute(delete(JobQueueModel).where(JobQueueModel.execution_id.in_(execution_ids)))
+        self.session.execute(delete(StepPayloadModel).where(StepPayloadModel.execution_id.in_(execution_ids)))
+        executions = self.session.execute(
+            delete(ExecutionModel).where(ExecutionModel.execution_id.in_(execution_ids))
+        ).rowcount
+        self.session.commit()
+        get_payload_codec().delete_files(execution_ids)
+        return {"executions": executions, "steps": steps, "stored_data": stored}
+
+    def compact_stored_data(self, project_id: int, rule_id: int, limit: int) -> int:
+        """删除该规则写入的、已不是任何 key 当前值的 stored_data 历史，单次最多 ``limit`` 行。"""
+        is_current = select(StoredDataCurrentModel.id).where(
+            StoredDataCurrentModel.stored_data_id == StoredDataModel.id
+        )
+        ids = list(
+            self.session.execute(
+                select(StoredDataModel.id)
+                .where(
+                    StoredDataModel.project_id == project_id,
+                    StoredDataModel.rule_id == rule_id,
+                    ~is_current.exists(),
+                )
+                .order_by(StoredDataModel.id)
+                .limit(limit)
+            ).scalars().all()
+        )
+        if not ids:
+            return 0
+        deleted = self.session.execute(delete(StoredDataModel).where(StoredDataModel.id.in_(ids))).rowcount
+        self.session.commit()
+        return deleted
+
+
+def get_storage() -> Iterator[Storage]:
+    """FastAPI 依赖：每个请求一个 Storage，同一请求内的多处依赖复用同一会话，响应结束后关闭。"""
+    storage = Storage()
+    try:
+        yield storage
+    finally:
+        storage.close()
@@ -1,6 +1,42 @@
+import re
+import threading
+from collections import ChainMap, OrderedDict
 from datetime import date, datetime, timezone
-from jinja2 import Template, TemplateError
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator, Mapping
+
+from jinja2 import Environment, Template, TemplateError
+from jinja2.runtime import Context
+
+from .metrics import METRIC_PREFIX, MetricFamily, registry
+from .timing import phase
+from .tracing import child_span
+
+
+TEMPLATE_CACHE_SIZE = 1024
+
+_TEMPLATE_MARKERS = ("{{", "{%", "{#")
+_NEWLINE_RE = re.compile(r"\r\n|\r|\n")
+
+
+def iter_row_chunks(result: Any, size: int = 500) -> Iterator[list[Any]]:
+    """
+    按块迭代行数据。既接受普通行列表，也接受 SQL 节点输出（statement_results 列表，
+    依次展开其中每条语句的 ``rows``）。
+    """
+    if size <= 0:
+        raise ValueError("chunk size must be positive")
+    if isinstance(result, list) and result and isinstance(result[0], dict) and "returns_rows" in result[0]:
+        rows: Iterable[Any] = (row for statement in result for row in statement.get("rows") or [])
+    else:
+        rows = result or []
+    chunk: list[Any] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 
 def _template_builtins() -> dict[str, Any]:
@@ -10,32 +46,161 @@ def _template_builtins() -> dict[str, Any]:
         "utcnow": lambda: datetime.now(timezone.utc),
         "today": lambda: date.today(),
         "strftime": lambda obj, fmt: obj.strftime(fmt) if hasattr(obj, "strftime") else "",
+        "row_chunks": iter_row_chunks,
     }
 
 
+_environment = Environment()
+_environment.globals.update(_template_builtins())
+
+
+def _has_template_syntax(template_str: str) -> bool:
+    return any(marker in template_str for marker in _TEMPLATE_MARKERS)
+
+
+def _render_plain(template_str: str) -> str:
+    """与 Jinja 默认行为一致：统一换行符并去掉末尾一个换行。"""
+    lines = _NEWLINE_RE.split(template_str)
+    if lines[-1] == "":
+        del lines[-1]
+    return "\n".join(lines)
+
+
+def _compile_expression(expression: str) -> Callable[..., Any]:
+    return _environment.compile_expression(expression, undefined_to_none=True)
+
+
+def _shared_context(template: Template, variables: Mapping[str, Any]) -> Context:
+    """
+    以 ``shared=True`` 创建渲染上下文：调用方的变量映射按引用传入（外加一层 globals），
+    不像 ``Template.render`` 那样复制成新 dict。
+    """
+    return template.new_context(ChainMap(variables, template.globals), shared=True)
+
+
+class _CompiledCache:
+    """按源码文本缓存编译结果的有界 LRU，线程安全。"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.plain = 0
+        self._lock = threading.Lock()
+        self._items: OrderedDict[tuple[str, str], Any] = OrderedDict()
+
+    def get_or_compile(self, kind: str, source: str, compile_fn: Callable[[str], Any]) -> Any:
+        key = (kind, source)
+        with self._lock:
+            compiled = self._items.get(key)
+            if compiled is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+        compiled = compile_fn(source)
+        with self._lock:
+            self._items[key] = compiled
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return compiled
+
+    def count_plain(self) -> None:
+        """记录一次跳过 Jinja 的纯文本渲染（与命中计数共用锁，多线程下不丢计数）。"""
+        with self._lock:
+            self.plain += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+            self.plain = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "plain": self.plain,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
+
+
+_cache = _CompiledCache(TEMPLATE_CACHE_SIZE)
+
+
 class TemplateRenderer:
     """
     节点配置模板渲染，基于 Jinja2。
 
+    所有模板共用一个 ``Environment``（内置函数作为 globals 注入），编译结果按源码文本
+    缓存在有界 LRU 中；不含模板语法的纯文本直接返回，不经过 Jinja。
+
     内置函数（在模板中可直接调用）：
         - ``now()`` : 当前 datetime（本地）
         - ``utcnow()`` : 当前 datetime（UTC）
         - ``today()`` : 当前 date
         - ``strftime(obj, fmt)`` : 对 date/datetime 格式化，如 ``strftime(now(), '%Y-%m-%d')``
+        - ``row_chunks(result, size)`` : 按块迭代行，可直接传入 SQL 节点输出，如 ``row_chunks(nodes.q1, 100)``
     """
 
     @staticmethod
-    def render(template_str: str, variables: dict[str, Any]) -> str:
-        try:
-            template = Template(template_str)
-            ctx = {**_template_builtins(), **variables}
-            return template.render(**ctx)
-        except TemplateError as exc:
-            return f"[模板渲染错误] {exc}"
-        except Exception as exc:
-            return f"[渲染异常] {exc}"
+    def compile(template_str: str) -> Template:
+        return _cache.get_or_compile("template", template_str, _environment.from_string)
 
     @staticmethod
-    def render_sql(sql: str, variables: dict[str, Any]) -> str:
+    def render(template_str: str, variables: Mapping[str, Any]) -> str:
+        with phase("render"), child_span("template.render"):
+            try:
+                if not _has_template_syntax(template_str):
+                    _cache.count_plain()
+                    return _render_plain(template_str)
+                template = TemplateRenderer.compile(template_str)
+                context = _shared_context(template, variables)
+                try:
+                    return _environment.concat(template.root_render_func(context))
+                except Exception:
+                    _environment.handle_exception()
+            except TemplateError as exc:
+                return f"[模板渲染错误] {exc}"
+            except Exception as exc:
+                return f"[渲染异常] {exc}"
+
+    @staticmethod
+    def evaluate(expression: str, variables: Mapping[str, Any]) -> Any:
+        """求值单个 Jinja 表达式并返回原始对象（不转字符串），如 ``nodes.q1[0].rows``；未定义时返回 None。"""
+        with phase("render"), child_span("template.evaluate"):
+            return _cache.get_or_compile("expression", expression, _compile_expression)(variables)
+
+    @staticmethod
+    def render_sql(sql: str, variables: Mapping[str, Any]) -> str:
         """对 SQL 片段做模板渲染，与 render 共用同一内置函数。"""
         return TemplateRenderer.render(sql, variables)
+
+    @staticmethod
+    def cache_stats() -> dict[str, Any]:
+        return _cache.stats()
+
+    @staticmethod
+    def clear_cache() -> None:
+        _cache.clear()
+
+
+@registry.register_collector
+def _collect_template_cache() -> list[MetricFamily]:
+    stats = _cache.stats()
+    return [
+        MetricFamily(f"{METRIC_PREFIX}template_cache_hits_total", "counter", "Compiled template cache hits").add(stats["hits"]),
+        MetricFamily(f"{METRIC_PREFIX}template_cache_misses_total", "counter", "Compiled template cache misses").add(
+            stats["misses"]
+        ),
+        MetricFamily(f"{METRIC_PREFIX}template_cache_size", "gauge", "Compiled templates cached").add(stats["size"]),
+        MetricFamily(f"{METRIC_PREFIX}template_plain_renders_total", "counter", "Renders that skipped Jinja").add(
+            stats["plain"]
+        ),
+    ]
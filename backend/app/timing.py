@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from typing import Iterator
+
+
+# 步骤耗时的分阶段名称；未覆盖的部分（调度、结果组装等）可由 total_ms 减去各阶段之和得出
+STEP_PHASES = ("render", "connector", "acquire", "io", "serialize")
+
+_local = threading.local()
+
+
+class StepTimings:
+    """
+    单个步骤的分阶段耗时。
+
+    ``activate`` 把自身设为当前线程的计时器，期间各处的 ``phase(name)`` 都累加到这里；
+    没有激活的计时器时 ``phase`` 不做任何事，节点试跑等路径不受影响。
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished: float | None = None
+        self.phases: dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator["StepTimings"]:
+        previous = getattr(_local, "timings", None)
+        _local.timings = self
+        try:
+            yield self
+        finally:
+            _local.timings = previous
+
+    def stop(self) -> None:
+        self.finished = time.perf_counter()
+
+    def as_dict(self) -> dict[str, float]:
+        """``{"render_ms": ..., "io_ms": ..., "total_ms": ...}``，毫秒保留 3 位小数。"""
+        result = {f"{name}_ms": round(self.phases.get(name, 0.0) * 1000, 3) for name in STEP_PHASES}
+        result.update((f"{name}_ms", round(value * 1000, 3)) for name, value in self.phases.items() if name not in STEP_PHASES)
+        end = self.finished if self.finished is not None else time.perf_counter()
+        result["total_ms"] = round((end - self.started) * 1000, 3)
+        return result
+
+
+def current() -> StepTimings | None:
+    return getattr(_local, "timings", None)
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    """把代码块耗时计入当前线程步骤的 ``name`` 阶段；嵌套时内外层各自计时，调用方应避免同名嵌套。"""
+    timings = getattr(_local, "timings", None)
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
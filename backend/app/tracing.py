@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from .config import ROOT_DIR, get_app_config
+
+
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    """一段计时区间；``parent_id`` 为 None 的是 trace 的根。时间为 epoch 秒，耗时由 perf_counter 计算。"""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_time: float
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: str | None = None
+    duration_ms: float | None = None
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+    _token: contextvars.Token | None = field(default=None, repr=False)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str | None) -> None:
+        self.status = "error"
+        self.error = message
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    """导出已结束的 span；实现需线程安全，节点 span 会从调度线程并发导出。"""
+
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans: list[Span] = []
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+    def find(self, name: str) -> list[Span]:
+        with self._lock:
+            return [span for span in self.spans if span.name == name]
+
+
+class NdjsonFileExporter(SpanExporter):
+    """
+    每个 span 一行 JSON 追加到文件。
+
+    文件以 ``O_APPEND`` 打开，每行编码后用一次 ``os.write`` 写出，不经过缓冲的文本文件；
+    API 与 worker 等多个进程同时写同一文件时各行保持完整、不会交错。
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._fd: int | None = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def export(self, span: Span) -> None:
+        line = (json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        with self._lock:
+            if self._fd is not None:
+                os.write(self._fd, line)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class Tracer:
+    """
+    进程内 tracer：当前 span 保存在 contextvar 中，新 span 默认挂在当前 span 下。
+
+    线程池中的节点不继承调用方的 contextvar，需要显式传入 ``parent``。未配置 exporter 时 ``span`` 只返回 None，不分配对象。
+    """
+
+    def __init__(self, exporter: SpanExporter | None = None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(self, name: str, parent: Span | None = None, **attributes: Any) -> Span | None:
+        if self.exporter is None:
+            return None
+        parent = parent or _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            start_time=time.time(),
+            attributes=attributes,
+        )
+        span._token = _current_span.set(span)
+        return span
+
+    def end_span(self, span: Span | None) -> None:
+        if span is None or self.exporter is None:
+            return
+        span.duration_ms = round((time.perf_counter() - span._started) * 1000, 3)
+        if span._token is not None:
+            try:
+                _current_span.reset(span._token)
+            except ValueError:  # 在其他 context 中结束（如跨线程），只导出不恢复
+                pass
+            span._token = None
+        self.exporter.export(span)
+
+    @contextlib.contextmanager
+    def span(self, name: str, parent: Span | None = None, **attributes: Any) -> Iterator[Span | None]:
+        if self.exporter is None:
+            yield None
+            return
+        current = self.start_span(name, parent, **attributes)
+        try:
+            yield current
+        except BaseException as exc:
+            current.set_error(f"{type(exc).__name__}: {exc}")
+            raise
+        finally:
+            self.end_span(current)
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+EXPORTERS: dict[str, Callable[[], SpanExporter | None]] = {
+    "none": lambda: None,
+    "memory": InMemorySpanExporter,
+    "ndjson": lambda: NdjsonFileExporter(get_app_config().tracing_path or ROOT_DIR / "data" / "traces.ndjson"),
+}
+
+_tracer: Tracer | None = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                name = get_app_config().tracing_exporter
+                if name not in EXPORTERS:
+                    raise ValueError(f"unknown tracing exporter: {name}")
+                _tracer = Tracer(EXPORTERS[name]())
+    return _tracer
+
+
+def set_tracer(tracer: Tracer | None) -> Tracer | None:
+    """替换进程级 tracer（测试或自定义 exporter 用），返回原来的 tracer；传 None 时下次按配置重建。"""
+    global _tracer
+    with _tracer_lock:
+        previous, _tracer = _tracer, tracer
+    return previous
+
+
+def span(name: str, parent: Span | None = None, **attributes: Any) -> contextlib.AbstractContextManager[Span | None]:
+    return get_tracer().span(name, parent, **attributes)
+
+
+def child_span(name: str, **attributes: Any) -> contextlib.AbstractContextManager[Span | None]:
+    """只在已有当前 span 时创建子 span，模板渲染、SQL 等热路径在 trace 之外不产生孤立的根 span。"""
+    if _current_span.get() is None:
+        return contextlib.nullcontext()
+    return get_tracer().span(name, **attributes)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
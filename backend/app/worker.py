@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import socket
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from loguru import logger
+
+from .config import get_app_config
+from .db import cap_execution_concurrency
+from .engine import RuleEngine
+from .logger import configure_logging
+from .plan import RulePlan
+from .python_runner import shutdown_python_pool
+from .retention import RetentionJob
+from .storage import Storage
+from .tracing import get_tracer
+
+
+class JobWorker:
+    """
+    异步执行 worker：从 ``job_queue`` 认领任务并调用 ``RuleEngine.execute_rule``。
+
+    - ``concurrency`` 个线程各自持有独立的 Storage（Session 不跨线程共享）。
+    - 执行期间由心跳线程按 ``lease_sec / 3`` 续租；进程崩溃后租约过期，
+      任意 worker 的回收循环会把任务重新入队（或在超过 max_attempts 后标记失败）。
+    - 批次任务的并发由 ``claim_job`` 按批次限制；同一批次的规则计划与全局变量在本进程内只加载一次，
+      由该批次的所有任务共享。
+    """
+
+    BATCH_SNAPSHOT_LIMIT = 64
+
+    def __init__(
+        self,
+        concurrency: int,
+        poll_interval_sec: float,
+        lease_sec: int,
+        storage_factory: Callable[[], Storage] = Storage,
+        worker_id: str | None = None,
+        retention_interval_sec: float = 0,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.poll_interval_sec = poll_interval_sec
+        self.lease_sec = lease_sec
+        self.retention_interval_sec = retention_interval_sec
+        self.storage_factory = storage_factory
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = threading.Event()
+        self._batch_snapshots: OrderedDict[str, tuple[RulePlan | None, dict[str, Any]]] = OrderedDict()
+        self._batch_lock = threading.Lock()
+
+    def run_once(self, slot: int = 0) -> bool:
+        """认领并执行一条任务；没有可执行任务时返回 False。"""
+        owner = f"{self.worker_id}#{slot}"
+        storage = self.storage_factory()
+        try:
+            job = storage.claim_job(owner, self.lease_sec)
+            if job is None:
+                return False
+            logger.info("job claimed execution_id={} attempt={} owner={}", job.execution_id, job.attempts, owner)
+            heartbeat_stop = threading.Event()
+            heartbeat = threading.Thread(
+                target=self._heartbeat, args=(job.id, owner, heartbeat_stop), name=f"lease-{job.id}", daemon=True
+            )
+            heartbeat.start()
+            try:
+                engine = RuleEngine(storage, storage_factory=self.storage_factory)
+                plan, global_vars = self._batch_snapshot(engine, job.batch_id, job.project_id, job.rule_id)
+                result = engine.execute_rule(
+                    job.project_id,
+                    job.rule_id,
+                    json.loads(job.variables or "{}"),
+                    execution_id=job.execution_id,
+                    plan=plan,
+                    global_vars=global_vars,
+                )
+                job_status = "completed" if result.get("status") == "completed" else "failed"
+                storage.finish_job(job.id, owner, job_status, result.get("error"))
+            except Exception as exc:
+                logger.exception("job crashed execution_id={}", job.execution_id)
+                storage.session.rollback()
+                storage.finish_job(job.id, owner, "failed", str(exc))
+                storage.complete_execution(job.execution_id, "failed", str(exc))
+            finally:
+                heartbeat_stop.set()
+                heartbeat.join()
+            return True
+        finally:
+            storage.close()
+
+    def _batch_snapshot(
+        self, engine: RuleEngine, batch_id: str | None, project_id: int, rule_id: int
+    ) -> tuple[RulePlan | None, dict[str, Any] | None]:
+        """批次任务返回该批次共享的 (plan, global_vars)，首次遇到时加载；非批次任务由引擎自行加载。"""
+        if batch_id is None:
+            return None, None
+        with self._batch_lock:
+            snapshot = self._batch_snapshots.get(batch_id)
+            if snapshot is not None:
+                self._batch_snapshots.move_to_end(batch_id)
+                return snapshot
+        snapshot = (engine.load_plan(rule_id), engine.load_globals(project_id))
+        with self._batch_lock:
+            snapshot = self._batch_snapshots.setdefault(batch_id, snapshot)
+            self._batch_snapshots.move_to_end(batch_id)
+            while len(self._batch_snapshots) > self.BATCH_SNAPSHOT_LIMIT:
+                self._batch_snapshots.popitem(last=False)
+        return snapshot
+
+    def recover_once(self) -> int:
+        storage = self.storage_factory()
+        try:
+            recovered = storage.recover_expired_jobs(retry_delay_sec=self.poll_interval_sec)
+            if recovered:
+                logger.warning("recovered {} expired job lease(s)", recovered)
+            return recovered
+        finally:
+            storage.close()
+
+    def _heartbeat(self, job_id: int, owner: str, stop: threading.Event) -> None:
+        interval = max(self.lease_sec / 3, 0.1)
+        while not stop.wait(interval):
+            storage = self.storage_factory()
+            try:
+                if not storage.renew_job_lease(job_id, owner, self.lease_sec):
+                    logger.warning("lease renewal rejected job_id={} owner={}", job_id, owner)
+                    return
+            except Exception:
+                logger.exception("lease renewal failed job_id={}", job_id)
+            finally:
+                storage.close()
+
+    def _loop(self, slot: int) -> None:
+        while not self.stop_event.is_set():
+            try:
+                claimed = self.run_once(slot)
+            except Exception:
+                logger.exception("worker slot {} failed to poll job queue", slot)
+                claimed = False
+            if not claimed:
+                self.stop_event.wait(self.poll_interval_sec)
+
+    def _retention_loop(self) -> None:
+        job = RetentionJob(self.storage_factory)
+        while not self.stop_event.wait(self.retention_interval_sec):
+            try:
+                job.run_once()
+            except Exception:
+                logger.exception("retention run failed")
+
+    def run_forever(self) -> None:
+        threads = [
+            threading.Thread(target=self._loop, args=(slot,), name=f"job-worker-{slot}", daemon=True)
+            for slot in range(self.concurrency)
+        ]
+        if self.retention_interval_sec > 0:
+            threads.append(threading.Thread(target=self._retention_loop, name="retention", daemon=True))
+        for thread in threads:
+            thread.start()
+        logger.info("worker started id={} concurrency={}", self.worker_id, self.concurrency)
+        while not self.stop_event.wait(max(self.lease_sec / 2, self.poll_interval_sec)):
+            try:
+                self.recover_once()
+            except Exception:
+                logger.exception("job lease recovery failed")
+        for thread in threads:
+            thread.join()
+        logger.info("worker stopped id={}", self.worker_id)
+
+    def stop(self, *_args) -> None:
+        self.stop_event.set()
+
+
+def main(argv: list[str] | None = None) -> None:
+    config = get_app_config()
+    parser = argparse.ArgumentParser(description="DB Scenario async execution worker")
+    parser.add_argument("--concurrency", type=int, default=config.worker_concurrency)
+    parser.add_argument("--poll-interval", type=float, default=config.worker_poll_interval_sec)
+    parser.add_argument("--lease-sec", type=int, default=config.worker_lease_sec)
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    get_tracer()  # 未知的 tracing.exporter 在启动时报错
+    concurrency = cap_execution_concurrency(args.concurrency, config)
+    if concurrency < args.concurrency:
+        logger.warning("worker concurrency capped {} -> {} by database pool capacity", args.concurrency, concurrency)
+    worker = JobWorker(
+        concurrency=concurrency,
+        poll_interval_sec=args.poll_interval,
+        lease_sec=args.lease_sec,
+        retention_interval_sec=config.retention_interval_sec,
+    )
+    signal.signal(signal.SIGINT, worker.stop)
+    signal.signal(signal.SIGTERM, worker.stop)
+    try:
+        worker.run_forever()
+    finally:
+        shutdown_python_pool()
+
+
+if __name__ == "__main__":
+    main()
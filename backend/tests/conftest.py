@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import app.main as main
+from app.engine import RuleEngine
+from app.plan import rule_plans
+from app.storage import Storage, get_storage
+
+
+@pytest.fixture
+def db_engine():
+    """内存 SQLite，StaticPool 让所有 Session（包括节点线程各自的 Storage）共用同一连接。"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def storage_factory(db_engine) -> Callable[[], Storage]:
+    return lambda: Storage(Session(db_engine))
+
+
+@pytest.fixture
+def storage(storage_factory) -> Storage:
+    storage = storage_factory()
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def make_rule(storage) -> Callable[..., tuple[int, int]]:
+    """创建项目与规则并写入节点，返回 ``(project_id, rule_id)``；清空进程内规则计划缓存。"""
+    rule_plans.clear()
+
+    def _make(nodes: list[dict[str, Any]] | None = None, project_name: str = "p1", rule_name: str = "r1") -> tuple[int, int]:
+        project = storage.get_project_by_name(project_name) or storage.create_project(project_name, "")
+        rule = storage.create_rule(project.id, rule_name, "")
+        if nodes:
+            storage.replace_nodes(rule.id, nodes)
+        return project.id, rule.id
+
+    return _make
+
+
+@pytest.fixture
+def rule_engine(storage, storage_factory) -> RuleEngine:
+    return RuleEngine(storage, storage_factory)
+
+
+@pytest.fixture
+def client(storage, monkeypatch) -> TestClient:
+    """API 客户端，请求内的 ``get_storage`` 替换为测试用 storage。"""
+    monkeypatch.setitem(main.app.dependency_overrides, get_storage, lambda: storage)
+    return TestClient(main.app)
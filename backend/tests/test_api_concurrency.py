@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import anyio
+from anyio import to_thread
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import app.main as main
+from app.config import AppConfig
+from app.engine import RuleEngine
+from app.plan import rule_plans
+from app.storage import Storage, get_storage
+
+
+def test_concurrent_execute_calls_overlap(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    rule_plans.clear()
+    monkeypatch.setattr(main, "get_engine", lambda: engine)
+
+    def override_storage():
+        storage = Storage(Session(engine))
+        try:
+            yield storage
+        finally:
+            storage.close()
+
+    monkeypatch.setitem(main.app.dependency_overrides, get_storage, override_storage)
+
+    storage = Storage(Session(engine))
+    project = storage.create_project("p1", "")
+    rule = storage.create_rule(project.id, "slow", "")
+    project_id, rule_id = project.id, rule.id
+    storage.replace_nodes(
+        rule_id, [{"node_id": "wait", "type": "shell", "order_index": 1, "config": {"command": "sleep 0.5"}}]
+    )
+    storage.close()
+
+    # 记录每次执行在处理线程中的起止时间，据此判断请求是否并发，而不是依赖总耗时
+    intervals: list[tuple[float, float]] = []
+    original_execute = RuleEngine.execute_rule
+
+    def timed_execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original_execute(self, *args, **kwargs)
+        finally:
+            intervals.append((started, time.perf_counter()))
+
+    monkeypatch.setattr(RuleEngine, "execute_rule", timed_execute)
+
+    # 共用一个事件循环：同步的处理函数若阻塞事件循环，三个请求会串行执行
+    with TestClient(main.app) as client:
+
+        def call(_):
+            return client.post("/api/execute", json={"project_id": project_id, "rule_id": rule_id}).json()
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            results = list(pool.map(call, range(3)))
+
+    assert [r["status"] for r in results] == ["completed"] * 3
+    assert len(intervals) == 3
+    # 三次执行存在共同的时间段：最晚开始的早于最早结束的
+    assert max(start for start, _ in intervals) < min(end for _, end in intervals)
+
+
+def test_api_threadpool_is_capped_by_database_pool(monkeypatch):
+    monkeypatch.setattr(main, "get_app_config", lambda: AppConfig(api_threadpool_size=40, db_pool_size=4, db_max_overflow=2))
+
+    async def configured_tokens():
+        await main.configure_threadpool()
+        return to_thread.current_default_thread_limiter().total_tokens
+
+    assert anyio.run(configured_tokens) == 6
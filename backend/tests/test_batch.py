@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from sqlmodel import Session, SQLModel, create_engine
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.batch import BatchRunner
+from app.config import AppConfig
+from app.db import cap_execution_concurrency
+from app.engine import RuleEngine
+from app.plan import rule_plans
+from app.storage import Storage
+
+
+def _build_storage_factory(db_path: Path):
+    # 批量执行会在多个线程上同时提交，使用文件库让每个线程拿到独立连接
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    rule_plans.clear()
+    return lambda: Storage(Session(engine))
+
+
+def test_batch_runs_every_variable_set_and_loads_plan_once(monkeypatch, tmp_path):
+    factory = _build_storage_factory(tmp_path / "batch.db")
+    storage = factory()
+    project = storage.create_project("p1", "")
+    rule = storage.create_rule(project.id, "r1", "")
+    storage.upsert_global(project.id, "greeting", "hi", "string", None)
+    storage.replace_nodes(
+        rule.id,
+        [
+            {"node_id": "msg", "type": "log", "order_index": 1, "config": {"log_message": "{{ greeting }} {{ tenant }}"}},
+            {"node_id": "check", "type": "shell", "order_index": 2, "config": {"command": "test {{ tenant }} != bad"}},
+        ],
+    )
+
+    load_calls = []
+    original_load_plan = RuleEngine.load_plan
+
+    def counting_load_plan(self, rule_id):
+        load_calls.append(rule_id)
+        return original_load_plan(self, rule_id)
+
+    monkeypatch.setattr(RuleEngine, "load_plan", counting_load_plan)
+
+    batch = storage.create_batch(
+        project.id, rule.id, [{"tenant": "a"}, {"tenant": "bad"}, {"tenant": "c"}], concurrency=2
+    )
+    counts = BatchRunner(factory).run(batch.batch_id)
+
+    assert counts == {"completed": 2, "failed": 1}
+    assert load_calls == [rule.id]
+    assert storage.count_batch_statuses(batch.batch_id) == {"completed": 2, "failed": 1}
+
+    items = storage.list_batch_executions(batch.batch_id)
+    assert [item.status for item in items] == ["completed", "failed", "completed"]
+    assert storage.list_steps(items[2].execution_id)[0].output == "hi c"
+    storage.session.expire_all()
+    assert storage.get_batch(batch.batch_id).status == "completed"
+
+
+def test_batch_concurrency_is_capped_by_database_pool():
+    config = AppConfig(db_pool_size=5, db_max_overflow=5, engine_max_parallel_nodes=1)
+    assert cap_execution_concurrency(8, config) == 8
+    assert cap_execution_concurrency(20, config) == 10
+    # 每个执行 1 个主连接 + 4 个节点线程连接
+    parallel = AppConfig(db_pool_size=5, db_max_overflow=5, engine_max_parallel_nodes=4)
+    assert cap_execution_concurrency(8, parallel) == 2
+    assert cap_execution_concurrency(8, AppConfig(db_pool_size=1, db_max_overflow=0, engine_max_parallel_nodes=4)) == 1
+    assert cap_execution_concurrency(50, AppConfig(db_pool_size=1, db_max_overflow=-1)) == 50
+
+
+def test_batch_api_enqueues_jobs_by_default(client, storage, make_rule):
+    project_id, rule_id = make_rule([{"node_id": "msg", "type": "log", "order_index": 1, "config": {"log_message": "x"}}])
+
+    response = client.post(
+        "/api/execute/batch", json={"project_id": project_id, "rule_id": rule_id, "variables_list": [{"i": 1}, {"i": 2}]}
+    )
+    assert response.status_code == 200
+    items = storage.list_batch_executions(response.json()["batch_id"])
+    assert [item.status for item in items] == ["queued", "queued"]
+    assert all(storage.get_job(item.execution_id).status == "queued" for item in items)
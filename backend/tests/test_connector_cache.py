@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.connector_cache import connectors
+from app.storage import Storage
+
+
+@pytest.fixture(autouse=True)
+def clear_connectors():
+    connectors.clear()
+    yield
+    connectors.clear()
+
+
+def test_connectors_resolve_in_one_query_and_invalidate_on_update(monkeypatch, storage, rule_engine):
+    project = storage.create_project("p1", "")
+    db = storage.create_connector(project.id, "db", "mysql", json.dumps({"dsn": "mysql+pymysql://u@h/a"}))
+    storage.create_connector(project.id, "cache", "redis", json.dumps({"dsn": "redis://localhost/0"}))
+
+    queries = []
+    original = Storage.get_connectors_by_names
+    monkeypatch.setattr(
+        Storage,
+        "get_connectors_by_names",
+        lambda self, project_id, names: queries.append(sorted(names)) or original(self, project_id, names),
+    )
+
+    resolved = rule_engine.resolve_connectors(project.id, ["db", "cache", "missing"])
+    assert set(resolved) == {"db", "cache"}
+    assert resolved["db"].config["dsn"] == "mysql+pymysql://u@h/a"
+    assert queries == [["cache", "db", "missing"]]
+
+    assert rule_engine._resolve_connector(project.id, "db", "mysql") is resolved["db"]
+    assert queries == [["cache", "db", "missing"]]
+
+    storage.update_connector(project.id, db.id, "db2", json.dumps({"dsn": "mysql+pymysql://u@h/b"}))
+    assert "db" not in rule_engine.resolve_connectors(project.id, ["db"])
+    assert rule_engine._resolve_connector(project.id, "db2", "mysql").config["dsn"] == "mysql+pymysql://u@h/b"
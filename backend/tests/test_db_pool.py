@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import exc as sa_exc
+from sqlalchemy import text
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.config import AppConfig
+from app.db import InstrumentedQueuePool, app_pool_metrics, create_app_engine
+from app.storage import Storage, get_storage
+
+
+def test_pool_settings_and_checkout_metrics(tmp_path):
+    config = AppConfig(db_pool_size=1, db_max_overflow=0, db_pool_timeout_sec=0.1, db_pool_recycle_sec=600)
+    engine = create_app_engine(f"sqlite:///{tmp_path / 'pool.db'}", config)
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+    assert engine.pool.size() == 1
+    app_pool_metrics.reset()
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert app_pool_metrics.snapshot(engine.pool)["saturation"] == 1.0
+        # 池已耗尽：等待 pool_timeout_sec 后超时，并计入统计
+        with pytest.raises(sa_exc.TimeoutError):
+            engine.connect()
+
+    stats = app_pool_metrics.snapshot(engine.pool)
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["peak_checked_out"] == 1
+    assert stats["checked_out"] == 0
+    assert stats["wait_max_ms"] >= 100
+    engine.dispose()
+
+
+def test_get_storage_is_shared_within_request(monkeypatch):
+    closed = []
+    monkeypatch.setattr(Storage, "close", lambda self: closed.append(self))
+    app = FastAPI()
+
+    def project_scope(storage: Storage = Depends(get_storage)) -> Storage:
+        return storage
+
+    @app.get("/check")
+    def check(storage: Storage = Depends(get_storage), scoped: Storage = Depends(project_scope)):
+        return {"same": storage is scoped}
+
+    client = TestClient(app)
+    assert client.get("/check").json() == {"same": True}
+    assert client.get("/check").json() == {"same": True}
+    assert len(closed) == 2 and closed[0] is not closed[1]
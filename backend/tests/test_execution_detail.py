@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.recorder import ExecutionRecorder
+from app.storage import Storage
+
+
+def _seed(storage: Storage) -> str:
+    project = storage.create_project("p1", "")
+    rule = storage.create_rule(project.id, "r1", "")
+    execution = storage.create_execution(project.id, rule.id, {"tenant": 1}, status="completed")
+    rows = [{"id": i} for i in range(10)]
+    step_data = {"data": [{"index": 1, "sql": "select 1", "rows": rows, "rowcount": 10}, {"index": 2, "sql": "select 2", "rows": rows[:3]}]}
+    storage.insert_steps(
+        [
+            ExecutionRecorder.build_step(
+                execution_id=execution.execution_id,
+                node_id=node_id,
+                action_type="mysql",
+                status="completed",
+                content="",
+                output="",
+                step_data=json.dumps(step_data),
+                started_at=None,
+                completed_at=None,
+            )
+            for node_id in ("a", "b")
+        ]
+    )
+    storage.store_data(project.id, rule.id, execution.execution_id, "b", "project", "k", "v")
+    return execution.execution_id
+
+
+def test_execution_detail_defaults_to_step_summaries(client, storage):
+    execution_id = _seed(storage)
+
+    response = client.get(f"/api/execution/{execution_id}")
+    assert response.status_code == 200
+    detail = response.json()
+    assert detail["variables"] == {"tenant": 1}
+    assert [step["node_id"] for step in detail["steps"]] == ["a", "b"]
+    assert all("step_data" not in step for step in detail["steps"])
+    assert "stored" not in detail
+
+    detail = client.get(
+        f"/api/execution/{execution_id}", params={"fields": "execution_id,status", "include": "step_data,stored"}
+    ).json()
+    assert set(detail) == {"execution_id", "status", "steps", "stored"}
+    assert detail["steps"][0]["step_data"]["data"][0]["rowcount"] == 10
+    assert [(row["key"], row["value"]) for row in detail["stored"]] == [("k", "v")]
+
+    assert client.get(f"/api/execution/{execution_id}", params={"include": "everything"}).status_code == 422
+    assert client.get("/api/execution/missing").status_code == 404
+
+
+def test_step_data_rows_can_be_sliced(client, storage):
+    execution_id = _seed(storage)
+    step_id = client.get(f"/api/execution/{execution_id}").json()["steps"][0]["id"]
+
+    url = f"/api/execution/{execution_id}/steps/{step_id}/data"
+    sliced = client.get(url, params={"offset": 4, "limit": 3}).json()["step_data"]["data"]
+    assert [row["id"] for row in sliced[0]["rows"]] == [4, 5, 6]
+    assert (sliced[0]["rows_offset"], sliced[0]["rows_total"]) == (4, 10)
+    assert sliced[1]["rows"] == [] and sliced[1]["rows_total"] == 3
+
+    only_second = client.get(url, params={"statement": 2, "limit": 1}).json()["step_data"]["data"]
+    assert [item["index"] for item in only_second] == [2]
+    assert only_second[0]["rows"] == [{"id": 0}]
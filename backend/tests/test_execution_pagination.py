@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.schema import ExecutionModel
+
+
+def test_executions_are_keyset_paginated_newest_first(client, storage):
+    project = storage.create_project("p1", "")
+    rule = storage.create_rule(project.id, "r1", "")
+    # 两条记录 started_at 相同，由 id 决定先后
+    started = ["2026-01-01T00:00:01", "2026-01-01T00:00:02", "2026-01-01T00:00:02", "2026-01-01T00:00:03", "2026-01-01T00:00:04"]
+    for index, started_at in enumerate(started):
+        storage.session.add(
+            ExecutionModel(
+                project_id=project.id,
+                rule_id=rule.id,
+                execution_id=f"exec_{index}",
+                started_at=started_at,
+                status="failed" if index == 1 else "completed",
+                variables='{"i": %d}' % index,
+            )
+        )
+    storage.session.commit()
+
+    url = f"/api/projects/{project.id}/executions/{rule.id}"
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get(url, params=params).json()
+        seen.extend(item["execution_id"] for item in page["items"])
+        assert all("variables" not in item for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["exec_4", "exec_3", "exec_2", "exec_1", "exec_0"]
+
+    filtered = client.get(
+        url, params={"status": "completed", "started_after": "2026-01-01T00:00:02", "fields": "execution_id,variables"}
+    ).json()
+    assert filtered == {
+        "items": [
+            {"execution_id": "exec_4", "variables": {"i": 4}},
+            {"execution_id": "exec_3", "variables": {"i": 3}},
+            {"execution_id": "exec_2", "variables": {"i": 2}},
+        ],
+        "next_cursor": None,
+    }
+    assert client.get(url, params={"cursor": "not-a-cursor"}).status_code == 422
+    assert client.get(url, params={"fields": "secret"}).status_code == 422
+
+
+def test_starting_a_queued_execution_keeps_its_page_position(storage, make_rule):
+    project_id, rule_id = make_rule()
+    first = storage.enqueue_execution(project_id, rule_id, {})
+    second = storage.enqueue_execution(project_id, rule_id, {})
+    enqueued_at = first.started_at
+    assert first.run_started_at is None
+
+    started = storage.start_execution(first.execution_id)
+    assert started.started_at == enqueued_at and started.run_started_at >= enqueued_at
+    listed = storage.list_executions(project_id, rule_id)
+    assert [e.execution_id for e in listed] == [second.execution_id, first.execution_id]
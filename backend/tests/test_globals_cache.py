@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.globals_cache import GlobalsCache, parse_global_value, project_globals
+from app.storage import Storage
+
+
+@pytest.fixture(autouse=True)
+def clear_project_globals():
+    project_globals.clear()
+    yield
+    project_globals.clear()
+
+
+def test_parse_global_value_uses_declared_type():
+    assert parse_global_value("42", "int") == 42
+    assert parse_global_value("1.5", "float") == 1.5
+    assert parse_global_value("Yes", "bool") is True and parse_global_value("off", "boolean") is False
+    assert parse_global_value('{"a": [1]}', "json") == {"a": [1]}
+    assert parse_global_value("42", "string") == "42"
+    assert parse_global_value("not-int", "int") == "not-int"
+
+
+def test_globals_are_cached_until_upsert_or_delete(monkeypatch, storage, rule_engine):
+    project = storage.create_project("p1", "")
+    storage.upsert_global(project.id, "limit", "10", "int", None)
+    storage.upsert_global(project.id, "tags", '["a"]', "json", None)
+
+    list_calls = []
+    original_list_globals = Storage.list_globals
+    monkeypatch.setattr(
+        Storage, "list_globals", lambda self, project_id: list_calls.append(project_id) or original_list_globals(self, project_id)
+    )
+
+    first = rule_engine.load_globals(project.id)
+    assert first == {"limit": 10, "tags": ["a"]}
+    first["tags"].append("mutated")
+    assert rule_engine.load_globals(project.id) == {"limit": 10, "tags": ["a"]}
+    assert list_calls == [project.id]
+
+    storage.upsert_global(project.id, "limit", "20", "int", None)
+    assert rule_engine.load_globals(project.id)["limit"] == 20
+    storage.delete_global(project.id, "tags")
+    assert rule_engine.load_globals(project.id) == {"limit": 20}
+    assert list_calls == [project.id] * 3
+
+
+def test_ttl_expires_entries():
+    now = [0.0]
+    cache = GlobalsCache(ttl_sec=5, clock=lambda: now[0])
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return []
+
+    cache.get(1, loader)
+    now[0] = 4.0
+    cache.get(1, loader)
+    now[0] = 5.5
+    cache.get(1, loader)
+    assert len(loads) == 2
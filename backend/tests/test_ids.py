@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.ids import CROCKFORD_BASE32, RANDOM_MAX, UlidGenerator, new_execution_id
+
+
+def test_ulids_are_monotonic_within_and_across_milliseconds():
+    now = [1_700_000_000.0]
+    generator = UlidGenerator(clock=lambda: now[0], randbits=lambda bits: RANDOM_MAX - 1)
+    first, second, third = generator.new(), generator.new(), generator.new()
+    assert len(first) == 26 and set(first) <= set(CROCKFORD_BASE32)
+    # 第三个 id 随机部分溢出，借用下一毫秒
+    assert first < second < third
+    assert third[:10] != first[:10]
+
+    now[0] -= 5  # 时钟回拨仍保持递增
+    assert generator.new() > third
+
+
+def test_concurrent_execution_ids_do_not_collide():
+    ids: list[str] = []
+    lock = threading.Lock()
+
+    def worker() -> None:
+        local = [new_execution_id() for _ in range(500)]
+        with lock:
+            ids.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == len(ids) == 4000
+    assert all(execution_id.startswith("exec_") for execution_id in ids)
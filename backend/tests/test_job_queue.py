@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.engine import RuleEngine
+from app.storage import Storage
+from app.worker import JobWorker
+
+
+LOG_NODE = {"node_id": "n1", "type": "log", "config": {"log_message": "hi {{ name }}"}}
+
+
+def test_enqueued_execution_is_claimed_once_and_executed_by_worker(storage, storage_factory, make_rule):
+    project_id, rule_id = make_rule([LOG_NODE])
+
+    execution = storage.enqueue_execution(project_id, rule_id, {"name": "bob"})
+    assert execution.status == "queued"
+
+    worker = JobWorker(concurrency=1, poll_interval_sec=0.01, lease_sec=30, storage_factory=storage_factory)
+    assert worker.run_once() is True
+    assert worker.run_once() is False
+
+    check = storage_factory()
+    assert check.get_execution(execution.execution_id).status == "completed"
+    job = check.get_job(execution.execution_id)
+    assert job.status == "completed" and job.attempts == 1
+    steps = check.list_steps(execution.execution_id)
+    assert [s.output for s in steps] == ["hi bob"]
+
+
+def test_claimed_job_is_not_claimed_again(storage, storage_factory, make_rule):
+    project_id, rule_id = make_rule([LOG_NODE])
+    storage.enqueue_execution(project_id, rule_id, {})
+
+    assert storage.claim_job("w1", 30) is not None
+    assert storage_factory().claim_job("w2", 30) is None
+
+
+def test_expired_lease_is_requeued_then_failed_after_max_attempts(storage, make_rule):
+    project_id, rule_id = make_rule([LOG_NODE])
+    execution = storage.enqueue_execution(project_id, rule_id, {}, max_attempts=2)
+
+    assert storage.claim_job("w1", -1) is not None
+    assert storage.recover_expired_jobs() == 1
+    job = storage.get_job(execution.execution_id)
+    assert job.status == "queued" and job.lease_owner is None
+
+    assert storage.claim_job("w2", -1) is not None
+    assert storage.recover_expired_jobs() == 1
+    storage.session.expire_all()
+    assert storage.get_job(execution.execution_id).status == "failed"
+    assert storage.get_execution(execution.execution_id).status == "failed"
+
+
+def test_batch_jobs_respect_batch_concurrency_and_share_plan(storage, storage_factory, make_rule, monkeypatch):
+    project_id, rule_id = make_rule([LOG_NODE])
+    batch = storage.create_batch(project_id, rule_id, [{"name": "a"}, {"name": "b"}, {"name": "c"}], 1, enqueue=True)
+    storage.enqueue_execution(project_id, rule_id, {"name": "solo"})
+
+    first = storage.claim_job("w1", 30)
+    assert first.batch_id == batch.batch_id
+    # 批次已有 1 个 running：其它 worker 只能认领非批次任务
+    solo = storage_factory().claim_job("w2", 30)
+    assert solo.batch_id is None
+    assert storage_factory().claim_job("w3", 30) is None
+    storage.finish_job(first.id, "w1", "completed")
+    assert storage_factory().claim_job("w3", 30).batch_id == batch.batch_id
+
+    loads = []
+    original_load_plan = RuleEngine.load_plan
+    monkeypatch.setattr(RuleEngine, "load_plan", lambda self, rid: loads.append(rid) or original_load_plan(self, rid))
+    worker = JobWorker(concurrency=1, poll_interval_sec=0.01, lease_sec=30, storage_factory=storage_factory)
+    storage.create_batch(project_id, rule_id, [{"name": "d"}, {"name": "e"}], 2, enqueue=True)
+    assert worker.run_once() is True and worker.run_once() is True
+    assert loads == [rule_id]
+
+
+def test_retry_after_lease_expiry_replaces_previous_attempt_steps(storage, storage_factory, make_rule, rule_engine):
+    project_id, rule_id = make_rule([LOG_NODE])
+    execution = storage.enqueue_execution(project_id, rule_id, {"name": "bob"})
+
+    # 第一次尝试写下步骤后 worker 失联
+    job = storage.claim_job("w1", -1)
+    rule_engine.execute_rule(project_id, rule_id, {"name": "bob"}, execution_id=job.execution_id)
+    assert len(storage.list_steps(execution.execution_id)) == 1
+    assert storage.recover_expired_jobs() == 1
+
+    worker = JobWorker(concurrency=1, poll_interval_sec=0.01, lease_sec=30, storage_factory=storage_factory)
+    assert worker.run_once() is True
+    check = storage_factory()
+    assert check.get_job(execution.execution_id).attempts == 2
+    assert [s.output for s in check.list_steps(execution.execution_id)] == ["hi bob"]
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.metrics import MetricsRegistry, execution_duration, executions_in_flight, node_duration, node_status
+
+
+def test_histogram_and_counter_render_in_prometheus_text_format():
+    registry = MetricsRegistry()
+    hist = registry.histogram("demo_seconds", "Demo", ["kind"], buckets=(0.1, 1.0))
+    counter = registry.counter("demo", 'Demo "counter"', ["status"])
+    hist.observe(0.05, "a")
+    hist.observe(0.5, "a")
+    hist.observe(5, "a")
+    counter.inc('say "hi"', amount=2)
+
+    text = registry.render()
+    assert 'db_scenario_demo_seconds_bucket{kind="a",le="0.1"} 1' in text
+    assert 'db_scenario_demo_seconds_bucket{kind="a",le="1"} 2' in text
+    assert 'db_scenario_demo_seconds_bucket{kind="a",le="+Inf"} 3' in text
+    assert 'db_scenario_demo_seconds_count{kind="a"} 3' in text
+    assert 'db_scenario_demo_total{status="say \\"hi\\""} 2' in text
+    assert "# TYPE db_scenario_demo_seconds histogram" in text
+    # counter 的 family 名与样本名一致，都带 _total
+    assert "# TYPE db_scenario_demo_total counter" in text
+    assert "db_scenario_demo_total_total" not in text
+
+
+def test_engine_records_execution_and_node_metrics(make_rule, rule_engine, client):
+    project_id, rule_id = make_rule([{"node_id": "l1", "type": "log", "config": {"log_message": "hi {{ name }}"}}])
+
+    completed = execution_duration.count("completed")
+    logs = node_duration.count("log")
+    log_success = node_status.value("log", "success")
+    result = rule_engine.execute_rule(project_id, rule_id, {"name": "x"})
+    assert result["status"] == "completed"
+    assert execution_duration.count("completed") == completed + 1
+    assert node_duration.count("log") == logs + 1
+    assert node_status.value("log", "success") == log_success + 1
+    assert executions_in_flight.value() == 0
+
+    body = client.get("/metrics").text
+    assert "db_scenario_execution_duration_seconds_bucket" in body
+    assert 'db_scenario_node_status_total{node_type="log",status="success"}' in body
+    assert "# TYPE db_scenario_node_status_total counter" in body
+    assert "# TYPE db_scenario_template_cache_hits_total counter" in body
+    assert "# TYPE db_scenario_db_pool_timeouts_total counter" in body
+    assert "\ndb_scenario_template_cache_hits_total " in body
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.engine import NODE_EXECUTORS
+from app.storage import Storage
+from app.template import TemplateRenderer
+
+
+def test_plan_is_compiled_once_and_recompiled_after_version_bump(monkeypatch, storage, make_rule, rule_engine):
+    project_id, rule_id = make_rule(
+        [
+            {"node_id": "q", "type": "mysql", "order_index": 1, "config": {"connector": "main", "sql": "select {{ x }}"}},
+            {"node_id": "msg", "type": "log", "order_index": 2, "config": {"log_message": "{{ nodes.q }}"}},
+        ]
+    )
+    TemplateRenderer.clear_cache()
+
+    plan = rule_engine.load_plan(rule_id)
+    assert plan.order == ("q", "msg") and plan.deps["msg"] == {"q"}
+    assert plan.nodes["q"].executor is NODE_EXECUTORS["mysql"]
+    assert plan.connectors == {"main"}
+    # 编译计划时预热模板编译缓存（两个节点各一个模板）
+    assert TemplateRenderer.cache_stats()["size"] == 2
+
+    list_calls = []
+    original_list_nodes = Storage.list_nodes
+    monkeypatch.setattr(Storage, "list_nodes", lambda self, rule_id: list_calls.append(rule_id) or original_list_nodes(self, rule_id))
+
+    assert rule_engine.load_plan(rule_id) is plan
+    assert list_calls == []
+
+    storage.replace_nodes(rule_id, [{"node_id": "only", "type": "log", "order_index": 1, "config": {"log_message": "hi"}}])
+    replaced = rule_engine.load_plan(rule_id)
+    assert replaced.order == ("only",) and replaced.version == plan.version + 1
+    assert list_calls == [rule_id]
+
+    storage.update_rule(project_id, rule_id, "r1-renamed", None)
+    assert rule_engine.load_plan(rule_id).version == replaced.version + 1
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.python_runner import PythonProcessPool, PythonTimeoutError
+
+
+@pytest.fixture
+def pool():
+    pool = PythonProcessPool(size=1, max_memory_mb=512)
+    yield pool
+    pool.close()
+
+
+def test_script_round_trips_vars_and_store(pool):
+    executed = pool.run(
+        "vars['n'] = vars['n'] + 1\nstore['seen'] = True\nprint('hi')\nresult = nodes['a']",
+        {"n": 1},
+        {},
+        {"a": [1, 2]},
+        timeout_sec=10,
+    )
+    assert executed.result == [1, 2]
+    assert executed.vars == {"n": 2} and executed.store == {"seen": True}
+    assert executed.stdout.strip() == "hi"
+
+
+def test_runaway_script_is_killed_and_worker_replaced(pool):
+    with pytest.raises(PythonTimeoutError):
+        pool.run("while True:\n    pass", {}, {}, {}, timeout_sec=0.5)
+    assert pool.timeouts == 1
+
+    assert pool.run("result = 1 + 1", {}, {}, {}, timeout_sec=10).result == 2
+    assert pool.stats()["alive"] == 1
+
+
+def test_script_errors_are_reported(pool):
+    with pytest.raises(RuntimeError, match="ZeroDivisionError"):
+        pool.run("result = 1 / 0", {}, {}, {}, timeout_sec=10)
+    with pytest.raises(RuntimeError, match="MemoryError"):
+        pool.run("result = 'x' * (1024 * 1024 * 1024)", {}, {}, {}, timeout_sec=10)
+
+
+def test_waiting_for_busy_pool_times_out(pool):
+    pool._ensure_started()
+    worker = pool._idle.get()  # 模拟唯一的 worker 正被其他节点占用
+    started = time.perf_counter()
+    with pytest.raises(PythonTimeoutError, match="no idle python worker"):
+        pool.run("result = 1", {}, {}, {}, timeout_sec=0.2)
+    assert time.perf_counter() - started < 0.8
+    # 排队超时不杀进程，worker 归还后仍可继续使用
+    assert pool.timeouts == 0
+    pool._idle.put(worker)
+    assert pool.run("result = 1", {}, {}, {}, timeout_sec=10).result == 1
+
+
+def test_dead_idle_worker_is_reaped_and_replaced(pool):
+    pool._ensure_started()
+    [dead] = pool._workers
+    dead.process.kill()
+    dead.process.join(timeout=5)
+
+    assert pool.run("result = 3", {}, {}, {}, timeout_sec=10).result == 3
+    assert dead.conn.closed and dead.process.exitcode is not None
+    assert pool._workers != [dead] and pool.stats()["alive"] == 1
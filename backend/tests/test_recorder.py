@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.recorder import BufferedExecutionRecorder, ExecutionRecorder
+
+
+def _step(node_id: str) -> dict:
+    return {
+        "execution_id": "exec_1",
+        "node_id": node_id,
+        "action_type": "log",
+        "status": "completed",
+        "content": node_id,
+        "output": node_id,
+        "step_data": None,
+        "started_at": "2026-01-01T00:00:00",
+        "completed_at": "2026-01-01T00:00:01",
+    }
+
+
+def test_direct_recorder_writes_final_step_state_immediately(storage):
+    ExecutionRecorder(storage).record_step(**_step("n1"))
+
+    steps = storage.list_steps("exec_1")
+    assert len(steps) == 1
+    assert steps[0].status == "completed" and steps[0].completed_at == "2026-01-01T00:00:01"
+
+
+def test_buffered_recorder_flushes_in_batches(storage):
+    recorder = BufferedExecutionRecorder(storage, batch_size=2, flush_interval_sec=3600)
+
+    recorder.record_step(**_step("n1"))
+    assert storage.list_steps("exec_1") == [] and recorder.pending == 1
+
+    recorder.record_step(**_step("n2"))
+    recorder.record_step(**_step("n3"))
+    assert [s.node_id for s in storage.list_steps("exec_1")] == ["n1", "n2"]
+
+    recorder.flush()
+    assert [s.node_id for s in storage.list_steps("exec_1")] == ["n1", "n2", "n3"]
+    assert recorder.pending == 0
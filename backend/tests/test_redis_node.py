@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+import redis
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import app.engine as engine_module
+from app.connector_cache import connectors
+from app.models import ExecutionContext
+from app.pools import RedisPoolRegistry
+
+
+class FakePipeline:
+    def __init__(self, client: "FakeRedis", transaction: bool):
+        self.client = client
+        self.transaction = transaction
+        self.commands: list[tuple] = []
+
+    def execute_command(self, *parts):
+        self.commands.append(parts)
+        return self
+
+    def execute(self, raise_on_error=True):
+        self.client.pipelines.append(self)
+        results = []
+        for parts in self.commands:
+            try:
+                results.append(self.client.execute_command(*parts))
+            except redis.ResponseError as exc:
+                if raise_on_error:
+                    raise
+                results.append(exc)
+        return results
+
+
+class FakeRedis:
+    """只实现节点用到的 execute_command / pipeline，命令在内存字典上执行。"""
+
+    def __init__(self):
+        self.data: dict[str, str] = {}
+        self.pipelines: list[FakePipeline] = []
+
+    def execute_command(self, name, *args):
+        name = name.upper()
+        if name == "SET":
+            self.data[args[0]] = args[1]
+            return True
+        if name == "GET":
+            return self.data.get(args[0])
+        if name == "INCR":
+            value = int(self.data.get(args[0], 0)) + 1
+            self.data[args[0]] = str(value)
+            return value
+        raise redis.ResponseError(f"unknown command '{name}'")
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self, transaction)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+
+    class Registry:
+        def get_client(self, connector_id, dsn, config=None):
+            return client
+
+    monkeypatch.setattr(engine_module, "redis_pools", Registry())
+    return client
+
+
+@pytest.fixture
+def run_redis(storage, make_rule, rule_engine, fake_redis):
+    connectors.clear()
+    project_id, rule_id = make_rule()
+    storage.create_connector(project_id, "cache", "redis", json.dumps({"dsn": "redis://localhost/0"}))
+
+    def _run(config: dict, variables: dict | None = None):
+        ctx = ExecutionContext(project_id=project_id, rule_id=rule_id, execution_id="exec_1", vars=variables or {})
+        return rule_engine._run_node(project_id, rule_id, "cache", "redis", {"connector": "cache", **config}, ctx)
+
+    yield _run
+    connectors.clear()
+
+
+def test_single_command_keeps_plain_result(run_redis, fake_redis):
+    fake_redis.data["user:7"] = "alice"
+
+    output = run_redis({"command": "GET user:{{ user_id }}"}, {"user_id": 7})
+    assert output.status == "success"
+    assert output.data == "alice" and output.metadata == {"command": "GET user:7"}
+    assert fake_redis.pipelines == []
+
+
+def test_commands_are_sent_in_one_pipeline(run_redis, fake_redis):
+    output = run_redis({"commands": ["SET a {{ v }}", "INCR n", "", "GET a"], "transaction": True}, {"v": "x"})
+
+    assert output.status == "success"
+    assert output.data == [
+        {"command": "SET a x", "result": True},
+        {"command": "INCR n", "result": 1},
+        {"command": "GET a", "result": "x"},
+    ]
+    [pipe] = fake_redis.pipelines
+    assert pipe.transaction is True and len(pipe.commands) == 3
+    assert output.metadata["command_count"] == 3 and output.metadata["error_count"] == 0
+
+
+def test_foreach_renders_per_row_and_splits_into_chunks(run_redis, fake_redis):
+    rows = [{"id": i, "name": f"u{i}"} for i in range(5)]
+
+    output = run_redis({"foreach": "rows", "command": "SET user:{{ row.id }} {{ row.name }}-{{ row_index }}", "chunk_size": 2}, {"rows": rows})
+
+    assert output.status == "success"
+    assert fake_redis.data == {f"user:{i}": f"u{i}-{i}" for i in range(5)}
+    assert [len(pipe.commands) for pipe in fake_redis.pipelines] == [2, 2, 1]
+    assert all(pipe.transaction is False for pipe in fake_redis.pipelines)
+    assert output.metadata["command_count"] == 5 and output.metadata["chunk_size"] == 2
+
+
+@pytest.mark.parametrize("rows", [None, []])
+def test_empty_foreach_succeeds_without_commands(run_redis, fake_redis, rows):
+    output = run_redis({"foreach": "rows", "command": "SET k {{ row }}"}, {"rows": rows})
+
+    assert output.status == "success" and output.data == []
+    assert output.metadata["command_count"] == 0
+    assert fake_redis.pipelines == []
+
+
+def test_foreach_rejects_non_list(run_redis):
+    output = run_redis({"foreach": "rows", "command": "SET k {{ row }}"}, {"rows": {"a": 1}})
+    assert output.status == "error" and "must evaluate to a list" in output.error
+
+
+def test_fail_on_error_controls_node_status(run_redis, fake_redis):
+    commands = ["SET a 1", "BOGUS a", "GET a"]
+
+    failed = run_redis({"commands": commands})
+    assert failed.status == "error" and "1 of 3 redis commands failed" in failed.error
+
+    tolerated = run_redis({"commands": commands, "fail_on_error": False})
+    assert tolerated.status == "success"
+    assert tolerated.metadata["error_count"] == 1
+    assert "unknown command" in tolerated.data[1]["error"] and tolerated.data[2] == {"command": "GET a", "result": "1"}
+
+
+def test_redis_pool_registry_reuses_and_rebuilds_on_config_change(monkeypatch):
+    disconnected = []
+    monkeypatch.setattr(redis.ConnectionPool, "disconnect", lambda self, *args, **kwargs: disconnected.append(self))
+    pools = RedisPoolRegistry()
+
+    first = pools.get_client(1, "redis://localhost:6379/0", {"max_connections": 4})
+    again = pools.get_client(1, "redis://localhost:6379/0", {"max_connections": 4})
+    assert again.connection_pool is first.connection_pool
+    assert first.connection_pool.max_connections == 4
+
+    [stats] = pools.stats()
+    assert stats["key"] == "connector:1" and stats["hits"] == 1 and stats["max_connections"] == 4
+
+    rebuilt = pools.get_client(1, "redis://localhost:6379/0", {"max_connections": 8})
+    assert rebuilt.connection_pool is not first.connection_pool
+    assert disconnected == [first.connection_pool]
+
+    pools.invalidate(1)
+    assert disconnected == [first.connection_pool, rebuilt.connection_pool]
+    assert pools.stats() == []
+
+
+def test_transaction_is_not_split_into_chunks(run_redis, fake_redis):
+    rows = list(range(5))
+
+    output = run_redis({"foreach": "rows", "command": "INCR n", "chunk_size": 2, "transaction": True}, {"rows": rows})
+
+    assert output.status == "success" and fake_redis.data["n"] == "5"
+    [pipe] = fake_redis.pipelines
+    assert pipe.transaction is True and len(pipe.commands) == 5
+    assert output.metadata["chunk_size"] == 5
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlmodel import select
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.retention import RetentionJob, RetentionPolicy
+from app.schema import ExecutionModel, ExecutionStepModel, StoredDataModel
+from app.storage import Storage
+
+
+def _add_execution(storage: Storage, project_id: int, rule_id: int, execution_id: str, started_at: str, status: str):
+    storage.session.add(
+        ExecutionModel(
+            project_id=project_id, rule_id=rule_id, execution_id=execution_id, started_at=started_at, status=status
+        )
+    )
+    storage.session.add(
+        ExecutionStepModel(execution_id=execution_id, node_id="n1", action_type="log", content="", status="success")
+    )
+    storage.session.commit()
+
+
+def test_retention_applies_rule_and_project_policies_in_batches(storage, storage_factory):
+    project = storage.create_project("p1", "")
+    rule_a = storage.create_rule(project.id, "a", "")
+    rule_b = storage.create_rule(project.id, "b", "")
+
+    for day in range(1, 6):
+        _add_execution(storage, project.id, rule_a.id, f"a{day}", f"2026-01-0{day}T00:00:00", "completed")
+        storage.store_data(project.id, rule_a.id, f"a{day}", "n1", "rule", "counter", str(day))
+    _add_execution(storage, project.id, rule_a.id, "a0", "2025-12-01T00:00:00", "running")
+    for day in (1, 9):
+        _add_execution(storage, project.id, rule_b.id, f"b{day}", f"2026-01-0{day}T00:00:00", "failed")
+
+    storage.upsert_retention_policy(project.id, 0, keep_executions=None, keep_days=5, compact_stored_data=False)
+    storage.upsert_retention_policy(project.id, rule_a.id, keep_executions=2, keep_days=None, compact_stored_data=True)
+
+    job = RetentionJob(
+        storage_factory,
+        batch_size=1,
+        default_policy=RetentionPolicy(),
+        clock=lambda: datetime(2026, 1, 10),
+    )
+    totals = job.run_once()
+
+    remaining = {e.execution_id for e in storage.session.exec(select(ExecutionModel)).all()}
+    # 规则 a 保留最新 2 条及运行中的执行；规则 b 按项目级策略保留 5 天内的执行
+    assert remaining == {"a0", "a4", "a5", "b9"}
+    steps = {s.execution_id for s in storage.session.exec(select(ExecutionStepModel)).all()}
+    assert steps == remaining
+    # 过期执行的存储历史随执行删除，剩余历史压缩到每个 key 的当前值
+    assert [d.value for d in storage.session.exec(select(StoredDataModel)).all()] == ["5"]
+    assert storage.read_latest_stored_data(project.id, rule_a.id, "rule", "counter").value == "5"
+    assert totals == {"executions": 4, "steps": 4, "stored_data": 3, "compacted": 1}
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.scheduler import build_dependencies, find_node_references, topological_order
+
+
+def test_find_node_references_handles_attribute_and_item_access():
+    refs, dynamic = find_node_references({"sql": "select {{ nodes.a }}, {{ nodes['b-1'] }}"})
+    assert refs == {"a", "b-1"} and dynamic is False
+
+    refs, dynamic = find_node_references({"log_message": "{{ nodes[name] }}"})
+    assert refs == set() and dynamic is True
+
+
+def test_dependencies_from_templates_edges_and_barriers():
+    deps = build_dependencies(
+        [
+            ("a", "mysql", {"sql": "select 1"}),
+            ("b", "mysql", {"sql": "select 2"}),
+            ("c", "log", {"log_message": "{{ nodes.a }}"}),
+            ("s", "store", {"store_key": "k"}),
+            ("d", "log", {"log_message": "x"}),
+            ("all", "log", {"log_message": "{% for k in nodes %}{{ k }}{% endfor %}"}),
+            ("e", "log", {"log_message": "y"}),
+        ],
+        edges=[("b", "c")],
+    )
+    assert deps["a"] == set() and deps["b"] == set()
+    assert deps["c"] == {"a", "b"}
+    assert deps["s"] == {"a", "b", "c"}
+    assert deps["d"] == {"s"}
+    assert deps["all"] == {"a", "b", "c", "s", "d"}
+    assert deps["e"] == {"all"}
+
+
+def test_cycles_are_rejected():
+    with pytest.raises(ValueError):
+        build_dependencies([("a", "log", {}), ("b", "log", {})], edges=[("a", "b"), ("b", "a")])
+    with pytest.raises(ValueError):
+        topological_order(["a"], {"a": {"a"}})
+
+
+def test_independent_nodes_run_concurrently_and_failures_stop_the_rule(storage, make_rule, rule_engine):
+    project_id, rule_id = make_rule(
+        [
+            {"node_id": "s1", "type": "shell", "order_index": 1, "config": {"command": "sleep 0.4; echo one"}},
+            {"node_id": "s2", "type": "shell", "order_index": 2, "config": {"command": "sleep 0.4; echo two"}},
+            {"node_id": "s3", "type": "shell", "order_index": 3, "config": {"command": "sleep 0.4; echo three"}},
+            {"node_id": "join", "type": "log", "order_index": 4, "config": {"log_message": "{{ nodes.s1.stdout }}-{{ nodes.s3.stdout }}"}},
+        ]
+    )
+
+    result = rule_engine.execute_rule(project_id, rule_id, {"__parallelism__": 3})
+
+    assert result["status"] == "completed"
+    steps = {s.node_id: s for s in storage.list_steps(result["execution_id"])}
+    assert steps["join"].output == "one-three"
+    # 三个 shell 步骤的执行区间两两重叠：最晚开始的早于最早结束的
+    shells = [steps[node_id] for node_id in ("s1", "s2", "s3")]
+    assert max(s.started_at for s in shells) < min(s.completed_at for s in shells)
+
+    storage.replace_nodes(
+        rule_id,
+        [
+            {"node_id": "bad", "type": "shell", "order_index": 1, "config": {"command": "exit 3"}},
+            {"node_id": "after", "type": "log", "order_index": 2, "config": {"log_message": "{{ nodes.bad }}"}},
+        ],
+    )
+    result = rule_engine.execute_rule(project_id, rule_id, {"__parallelism__": 3})
+    assert result["status"] == "failed"
+    assert [s.node_id for s in storage.list_steps(result["execution_id"])] == ["bad"]
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.retention import RetentionJob, RetentionPolicy
+from app.shell_runner import ShellRunner, ShellTimeoutError
+
+
+def test_output_is_capped_counted_and_optionally_spilled(tmp_path):
+    runner = ShellRunner(max_concurrency=2, spill_dir=str(tmp_path))
+    result = runner.run(
+        "seq 1 1000; echo oops >&2", cwd=None, timeout_sec=10, max_output_bytes=10, spill=True, execution_id="exec_1"
+    )
+
+    assert result.returncode == 0
+    assert result.stdout == "\n999\n1000\n"[-10:]
+    assert result.stdout_bytes == len("".join(f"{i}\n" for i in range(1, 1001)))
+    assert result.stdout_truncated is True and result.stderr_truncated is False
+    assert result.stderr == "oops\n"
+    assert Path(result.stdout_file).read_text().splitlines()[0] == "1"
+    assert Path(result.stdout_file).parent == tmp_path / "exec_1"
+
+    runner.delete_spill_files(["exec_1"])
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_retention_removes_spill_files_of_deleted_executions(tmp_path, storage, storage_factory, make_rule):
+    runner = ShellRunner(max_concurrency=1, spill_dir=str(tmp_path))
+    project_id, rule_id = make_rule()
+    dropped = storage.create_execution(project_id, rule_id, {}, status="completed").execution_id
+    kept_id = storage.create_execution(project_id, rule_id, {}, status="completed").execution_id
+    kept = runner.run("echo keep", cwd=None, timeout_sec=10, max_output_bytes=1024, spill=True, execution_id=kept_id)
+    runner.run("echo drop", cwd=None, timeout_sec=10, max_output_bytes=1024, spill=True, execution_id=dropped)
+
+    job = RetentionJob(
+        storage_factory, default_policy=RetentionPolicy(keep_executions=1), on_executions_deleted=runner.delete_spill_files
+    )
+    assert job.run_once()["executions"] == 1
+    assert [path.name for path in tmp_path.iterdir()] == [kept_id]
+    assert Path(kept.stdout_file).read_text() == "keep\n"
+
+
+def test_timeout_kills_the_whole_process_group():
+    runner = ShellRunner(max_concurrency=1)
+    started = time.perf_counter()
+    with pytest.raises(ShellTimeoutError):
+        runner.run("sleep 30 & sleep 30; echo never", cwd=None, timeout_sec=0.5, max_output_bytes=1024)
+    assert time.perf_counter() - started < 5
+    assert runner.stats() == {"max_concurrency": 1, "running": 0, "timeouts": 1}
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.connector_cache import connectors
+from app.pools import sql_engines
+
+
+@pytest.fixture
+def sqlite_dsn(tmp_path):
+    dsn = f"sqlite:///{tmp_path / 'source.db'}"
+    source = create_engine(dsn)
+    with source.begin() as conn:
+        conn.execute(text("create table users (id integer primary key, name text)"))
+        conn.execute(text("insert into users (id, name) values (:id, :name)"), [{"id": i, "name": f"user-{i}"} for i in range(10)])
+    source.dispose()
+    connectors.clear()
+    sql_engines.clear()
+    yield dsn
+    connectors.clear()
+    sql_engines.clear()
+
+
+@pytest.fixture
+def sql_rule(storage, make_rule, sqlite_dsn):
+    def _make(sql_config: dict, extra_nodes: list[dict] | None = None):
+        project_id, rule_id = make_rule(
+            [{"node_id": "q", "type": "sql", "order_index": 1, "config": {"connector": "src", **sql_config}}, *(extra_nodes or [])]
+        )
+        storage.create_connector(project_id, "src", "mysql", json.dumps({"dsn": sqlite_dsn}))
+        return project_id, rule_id
+
+    return _make
+
+
+def _step_data(storage, execution_id: str, node_id: str) -> tuple[str, dict]:
+    [step] = [step for step in storage.list_steps(execution_id) if step.node_id == node_id]
+    raw = storage.load_step_data(step)
+    return raw, json.loads(raw)
+
+
+def test_row_budget_truncates_and_carries_over_statements(storage, sql_rule, rule_engine):
+    project_id, rule_id = sql_rule({"sql": "select * from users order by id; select count(*) as n from users", "max_rows": 4})
+
+    result = rule_engine.execute_rule(project_id, rule_id, {})
+    assert result["status"] == "completed"
+    raw, output = _step_data(storage, result["execution_id"], "q")
+
+    first, second = output["data"]
+    assert [row["id"] for row in first["rows"]] == [0, 1, 2, 3]
+    assert first["truncated"] is True and first["truncated_reason"] == "max_rows"
+    # 预算在语句之间共享，第二条语句已没有剩余行数
+    assert second["rows"] == [] and second["truncated_reason"] == "max_rows"
+    assert output["metadata"]["truncated"] is True and output["metadata"]["max_rows"] == 4
+    # 行只在 data 中保存一份，metadata 不再重复 statement_results
+    assert "statement_results" not in output["metadata"]
+    assert raw.count('"user-0"') == 1
+
+
+def test_byte_budget_truncates_rows(storage, sql_rule, rule_engine):
+    row_bytes = len(json.dumps({"id": 0, "name": "user-0"}).encode("utf-8"))
+    project_id, rule_id = sql_rule({"sql": "select id, name from users order by id", "max_bytes": row_bytes * 3 + 1})
+
+    result = rule_engine.execute_rule(project_id, rule_id, {})
+    _, output = _step_data(storage, result["execution_id"], "q")
+
+    [statement] = output["data"]
+    assert statement["rowcount"] == 3 and statement["truncated_reason"] == "max_bytes"
+    assert output["metadata"]["truncated"] is True
+
+
+def test_untruncated_result_and_row_chunks_in_templates(storage, sql_rule, rule_engine):
+    project_id, rule_id = sql_rule(
+        {"sql": "select id from users order by id"},
+        [
+            {
+                "node_id": "sizes",
+                "type": "log",
+                "order_index": 2,
+                "config": {"log_message": "{% for chunk in row_chunks(nodes.q, 4) %}{{ chunk | length }};{% endfor %}"},
+            }
+        ],
+    )
+
+    result = rule_engine.execute_rule(project_id, rule_id, {})
+    assert result["status"] == "completed"
+    _, output = _step_data(storage, result["execution_id"], "q")
+    [statement] = output["data"]
+    assert statement["rowcount"] == 10 and "truncated" not in statement
+    assert output["metadata"]["truncated"] is False
+    _, sizes = _step_data(storage, result["execution_id"], "sizes")
+    assert sizes["data"] == "4;4;2;"
+
+
+class _StreamingResult:
+    """模拟服务端游标：close 时读完剩余行，被中止后以错误结束。"""
+
+    def __init__(self, total: int):
+        self.remaining = [type("Row", (), {"_mapping": {"id": i}})() for i in range(total)]
+        self.cancelled = False
+        self.drained = 0
+
+    def fetchmany(self, size):
+        chunk, self.remaining = self.remaining[:size], self.remaining[size:]
+        return chunk
+
+    def close(self):
+        if self.cancelled:
+            raise RuntimeError("Query execution was interrupted")
+        self.drained, self.remaining = len(self.remaining), []
+
+
+def test_truncated_streaming_result_is_cancelled_instead_of_drained(rule_engine):
+    result = _StreamingResult(10_000)
+
+    def cancel():
+        result.cancelled = True
+
+    rows, _, reason = rule_engine._fetch_rows(result, 3, 1 << 20, cancel)
+    assert len(rows) == 3 and reason == "max_rows"
+    assert result.cancelled and result.drained == 0
+
+    complete = _StreamingResult(2)
+    rows, _, reason = rule_engine._fetch_rows(complete, 3, 1 << 20, lambda: pytest.fail("not truncated"))
+    assert len(rows) == 2 and reason is None
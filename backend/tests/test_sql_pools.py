@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.pools import SqlEngineRegistry, pool_stats, sql_engines
+
+
+@pytest.fixture
+def global_sql_engines():
+    sql_engines.clear()
+    yield sql_engines
+    sql_engines.clear()
+
+
+def test_engine_is_reused_per_connector_and_per_dsn(tmp_path):
+    registry = SqlEngineRegistry()
+    dsn_a, dsn_b = f"sqlite:///{tmp_path / 'a.db'}", f"sqlite:///{tmp_path / 'b.db'}"
+
+    engine = registry.get_engine(1, dsn_a, {"pool_size": 2})
+    assert registry.get_engine(1, dsn_a, {"pool_size": 2}) is engine
+    # 无连接器时按 DSN 区分
+    assert registry.get_engine(None, dsn_a) is not registry.get_engine(None, dsn_b)
+    assert registry.get_engine(None, dsn_b) is registry.get_engine(None, dsn_b)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("select 1")).scalar() == 1
+    stats = {item["key"]: item for item in registry.stats()}
+    assert stats["connector:1"]["hits"] == 1 and stats["connector:1"]["pool_size"] == 2
+    assert stats["connector:1"]["options"]["connect_timeout"] == 10
+    registry.clear()
+
+
+def test_config_change_disposes_and_rebuilds_engine(tmp_path):
+    registry = SqlEngineRegistry()
+    dsn = f"sqlite:///{tmp_path / 'a.db'}"
+
+    old = registry.get_engine(1, dsn, {"pool_size": 2})
+    with old.connect():
+        pass
+    assert old.pool.checkedin() == 1
+
+    new = registry.get_engine(1, dsn, {"pool_size": 3})
+    assert new is not old
+    assert old.pool.checkedin() == 0  # dispose 关闭了旧池中的空闲连接
+    [stats] = registry.stats()
+    assert stats["pool_size"] == 3 and stats["hits"] == 0
+    registry.clear()
+
+
+def test_connector_update_and_delete_invalidate_engine(tmp_path, storage, global_sql_engines):
+    dsn = f"sqlite:///{tmp_path / 'a.db'}"
+    project = storage.create_project("p1", "")
+    connector = storage.create_connector(project.id, "db", "mysql", json.dumps({"dsn": dsn}))
+
+    first = global_sql_engines.get_engine(connector.id, dsn)
+    storage.update_connector(project.id, connector.id, None, json.dumps({"dsn": dsn, "pool_size": 2}))
+    assert global_sql_engines.stats() == []
+    assert global_sql_engines.get_engine(connector.id, dsn) is not first
+
+    storage.delete_connector(project.id, connector.id)
+    assert global_sql_engines.stats() == []
+
+
+def test_pool_stats_reports_checked_out_connections(tmp_path, global_sql_engines):
+    engine = global_sql_engines.get_engine(7, f"sqlite:///{tmp_path / 'a.db'}")
+
+    with engine.connect():
+        [busy] = pool_stats()["sql"]
+        assert busy["key"] == "connector:7" and busy["checked_out"] == 1
+    [idle] = pool_stats()["sql"]
+    assert idle["checked_out"] == 0 and idle["checked_in"] == 1
+
+
+def test_dsn_engines_are_bounded_and_evicted_engines_disposed(tmp_path):
+    registry = SqlEngineRegistry(max_dsn_engines=2)
+    dsns = [f"sqlite:///{tmp_path / f'{name}.db'}" for name in "abc"]
+
+    first = registry.get_engine(None, dsns[0])
+    with first.connect():
+        pass
+    registry.get_engine(None, dsns[1])
+    registry.get_engine(1, dsns[2])  # 连接器 Engine 不计入 DSN 上限
+    assert registry.get_engine(None, dsns[0]) is first  # 命中后成为最近使用
+    registry.get_engine(None, dsns[2])
+
+    keys = {item["key"] for item in registry.stats()}
+    assert keys == {"connector:1", registry._key(None, dsns[0]), registry._key(None, dsns[2])}
+    assert first.pool.checkedin() == 1
+    registry.get_engine(None, dsns[1])
+    assert first.pool.checkedin() == 0  # 被淘汰的 Engine 已 dispose
+    registry.clear()
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from sqlmodel import select
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import app.storage as storage_module
+from app.payloads import StepPayloadCodec
+from app.recorder import ExecutionRecorder
+from app.schema import StepPayloadModel
+from app.storage import Storage
+
+
+def _record(storage: Storage, execution_id: str, node_id: str, step_data: dict) -> None:
+    storage.insert_steps(
+        [
+            ExecutionRecorder.build_step(
+                execution_id=execution_id,
+                node_id=node_id,
+                action_type="mysql",
+                status="completed",
+                content="",
+                output="",
+                step_data=json.dumps(step_data),
+                started_at=None,
+                completed_at=None,
+            )
+        ]
+    )
+
+
+@pytest.mark.parametrize("store", ["db", "file"])
+def test_large_step_data_is_offloaded_with_preview(monkeypatch, tmp_path, store, storage):
+    codec = StepPayloadCodec(inline_max_bytes=1024, store=store, directory=str(tmp_path), preview_items=3)
+    monkeypatch.setattr(storage_module, "get_payload_codec", lambda: codec)
+
+    rows = [{"id": i, "name": f"row-{i}"} for i in range(500)]
+    big = {"node_id": "q", "status": "success", "data": [{"rows": rows, "rowcount": 500}], "metadata": {"sql": "select"}}
+    _record(storage, "exec_big", "q", big)
+    _record(storage, "exec_big", "small", {"data": "ok"})
+
+    large, small = storage.list_steps("exec_big")
+    assert small.payload_ref is None and json.loads(small.step_data) == {"data": "ok"}
+    assert large.payload_ref.startswith(f"{store}:")
+    assert large.payload_bytes == len(json.dumps(big).encode("utf-8"))
+    preview = json.loads(large.step_data)
+    assert preview["metadata"] == {"sql": "select"}
+    assert [row["id"] for row in preview["data"][0]["rows"]] == [0, 1, 2]
+    assert json.loads(storage.load_step_data(large)) == big
+
+    storage.delete_executions(["exec_big"])
+    assert storage.session.exec(select(StepPayloadModel)).all() == []
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_step_commit_removes_written_payload_files(monkeypatch, tmp_path, storage):
+    codec = StepPayloadCodec(inline_max_bytes=64, store="file", directory=str(tmp_path))
+    monkeypatch.setattr(storage_module, "get_payload_codec", lambda: codec)
+
+    def failing_commit():
+        raise RuntimeError("commit failed")
+
+    monkeypatch.setattr(storage.session, "commit", failing_commit)
+    with pytest.raises(RuntimeError, match="commit failed"):
+        _record(storage, "exec_rollback", "q", {"data": "x" * 1000})
+    assert [path for path in tmp_path.rglob("*") if path.is_file()] == []
+
+
+def test_codec_rejects_unknown_or_unavailable_encoding(monkeypatch):
+    with pytest.raises(ValueError, match="unknown payload encoding"):
+        StepPayloadCodec(inline_max_bytes=1024, encoding="lz4")
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    with pytest.raises(ImportError, match="zstandard"):
+        StepPayloadCodec(inline_max_bytes=1024, encoding="zstd")
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.timing import StepTimings, phase
+
+
+def test_phases_accumulate_only_inside_active_timer():
+    with phase("io"):
+        pass  # 没有激活的计时器时不报错也不记录
+
+    timings = StepTimings()
+    with timings.activate():
+        with phase("io"):
+            time.sleep(0.01)
+        with phase("io"):
+            time.sleep(0.01)
+        with phase("custom"):
+            pass
+    timings.stop()
+    result = timings.as_dict()
+    assert result["io_ms"] >= 20
+    assert result["render_ms"] == 0 and "custom_ms" in result
+    assert result["total_ms"] >= result["io_ms"]
+
+
+def test_engine_stores_phase_breakdown_per_step(storage, make_rule, rule_engine):
+    project_id, rule_id = make_rule(
+        [
+            {"node_id": "msg", "type": "log", "order_index": 1, "config": {"log_message": "hi {{ name }}"}},
+            {"node_id": "save", "type": "store", "order_index": 2, "config": {"store_key": "k", "store_value": "{{ name }}"}},
+        ]
+    )
+
+    result = rule_engine.execute_rule(project_id, rule_id, {"name": "x"})
+    assert result["status"] == "completed"
+
+    steps = {step.node_id: json.loads(step.timings) for step in storage.list_steps(result["execution_id"])}
+    assert set(steps["msg"]) >= {"render_ms", "connector_ms", "acquire_ms", "io_ms", "serialize_ms", "total_ms"}
+    assert steps["msg"]["render_ms"] > 0 and steps["msg"]["io_ms"] == 0
+    assert steps["save"]["io_ms"] > 0
+    assert all(sum(v for k, v in t.items() if k != "total_ms") <= t["total_ms"] for t in steps.values())
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from sqlmodel import select
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.schema import StoredDataCurrentModel, StoredDataModel
+
+
+def test_current_values_follow_latest_write_per_scope(storage):
+    project = storage.create_project("p1", "")
+    rule_a = storage.create_rule(project.id, "a", "")
+    rule_b = storage.create_rule(project.id, "b", "")
+
+    storage.store_data(project.id, rule_a.id, "exec_1", "n1", "rule", "token", "a1")
+    storage.store_data(project.id, rule_b.id, "exec_2", "n1", "rule", "token", "b1")
+    storage.store_data(project.id, rule_a.id, "exec_3", "n1", "rule", "token", "a2")
+    storage.store_data(project.id, rule_a.id, "exec_3", "n2", "project", "shared", "s1")
+    storage.store_data(project.id, rule_b.id, "exec_4", "n2", "project", "shared", "s2")
+
+    latest = storage.read_latest_stored_data(project.id, rule_a.id, "rule", "token")
+    assert (latest.value, latest.execution_id) == ("a2", "exec_3")
+    assert storage.read_latest_stored_data(project.id, rule_b.id, "rule", "token").value == "b1"
+    shared = storage.read_latest_stored_data(project.id, rule_a.id, "project", "shared")
+    assert (shared.value, shared.rule_id) == ("s2", rule_b.id)
+    assert storage.read_latest_stored_data(project.id, rule_a.id, "rule", "missing") is None
+
+    assert storage.load_latest_store_snapshot(project.id, rule_a.id) == {"token": "a2", "shared": "s2"}
+    # 同名 key 同时存在于 project 与 rule scope 时，以最后写入者为准
+    storage.store_data(project.id, rule_b.id, "exec_5", "n3", "project", "token", "p1")
+    assert storage.load_latest_store_snapshot(project.id, rule_a.id)["token"] == "p1"
+    storage.store_data(project.id, rule_a.id, "exec_6", "n1", "rule", "token", "a3")
+    assert storage.load_latest_store_snapshot(project.id, rule_a.id)["token"] == "a3"
+
+    # 历史完整保留，当前值表每个 key 一行
+    assert len(storage.session.exec(select(StoredDataModel)).all()) == 7
+    assert len(storage.session.exec(select(StoredDataCurrentModel)).all()) == 4
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.models import ExecutionContext, NodeOutput
+from app.template import TemplateRenderer
+
+
+def test_compiled_templates_are_reused_by_source_text():
+    TemplateRenderer.clear_cache()
+
+    assert TemplateRenderer.render("hello {{ name }}", {"name": "a"}) == "hello a"
+    assert TemplateRenderer.render("hello {{ name }}", {"name": "b"}) == "hello b"
+
+    stats = TemplateRenderer.cache_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+    assert stats["size"] == 1
+
+
+def test_plain_strings_skip_jinja_but_keep_its_output():
+    TemplateRenderer.clear_cache()
+
+    assert TemplateRenderer.render("SELECT 1\n", {}) == "SELECT 1"
+    assert TemplateRenderer.render("a\r\nb", {}) == "a\nb"
+
+    stats = TemplateRenderer.cache_stats()
+    assert stats["plain"] == 2
+    assert stats["size"] == 0
+
+
+def test_builtins_are_globals_and_variables_override_them():
+    assert TemplateRenderer.render("{{ strftime(today(), '%Y') | length }}", {}) == "4"
+    assert TemplateRenderer.render("{{ now }}", {"now": "fixed"}) == "fixed"
+
+
+def test_evaluate_returns_raw_objects():
+    rows = TemplateRenderer.evaluate("nodes.q1[0].rows", {"nodes": {"q1": [{"rows": [{"id": 1}]}]}})
+    assert rows == [{"id": 1}]
+    assert TemplateRenderer.evaluate("nodes.missing", {"nodes": {}}) is None
+
+
+def test_execution_context_view_is_live_and_not_copied():
+    ctx = ExecutionContext(project_id=1, rule_id=1, execution_id="e1", vars={"x": 1})
+    view = ctx.to_template_vars()
+
+    ctx.set_output(NodeOutput(node_id="a", node_type="log", status="success", data="A"))
+    ctx.vars["y"] = 2
+    ctx.store["k"] = "v"
+    assert ctx.to_template_vars() is view
+    assert TemplateRenderer.render("{% set x = 9 %}{{ x }}{{ y }}{{ nodes.a }}{{ store.k }}", view) == "92Av"
+    assert ctx.vars == {"x": 1, "y": 2}
+
+    ctx.set_output(NodeOutput(node_id="a", node_type="log", status="error", error="boom"))
+    assert "a" not in view["nodes"]
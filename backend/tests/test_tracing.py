@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import app.main as main
+import app.tracing as tracing
+from app.tracing import InMemorySpanExporter, NdjsonFileExporter, Tracer
+
+
+def test_execution_trace_nests_nodes_and_child_spans(monkeypatch, make_rule, rule_engine):
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracing, "_tracer", Tracer(exporter))
+    project_id, rule_id = make_rule(
+        [
+            {"node_id": "msg", "type": "log", "order_index": 1, "config": {"log_message": "hi {{ name }}"}},
+            {"node_id": "save", "type": "store", "order_index": 2, "config": {"store_key": "k", "store_value": "v"}},
+            {"node_id": "bad", "type": "shell", "order_index": 3, "config": {"command": "exit 3"}},
+        ]
+    )
+
+    result = rule_engine.execute_rule(project_id, rule_id, {"name": "x"})
+    assert result["status"] == "failed"
+
+    [execution] = exporter.find("execution")
+    assert execution.parent_id is None and execution.status == "error"
+    assert execution.attributes["execution_id"] == result["execution_id"]
+    nodes = {span.attributes["node_id"]: span for span in exporter.find("node")}
+    assert {span.parent_id for span in nodes.values()} == {execution.span_id}
+    assert nodes["bad"].status == "error" and nodes["msg"].status == "ok"
+    assert all(span.trace_id == execution.trace_id for span in exporter.spans)
+
+    [render] = [span for span in exporter.find("template.render") if span.parent_id == nodes["msg"].span_id]
+    [store] = exporter.find("storage.store_data")
+    assert store.parent_id == nodes["save"].span_id and store.attributes["key"] == "k"
+    assert exporter.find("shell.run")[0].parent_id == nodes["bad"].span_id
+    assert tracing.current_span() is None
+
+
+def test_request_span_is_logged_and_exported_as_ndjson(monkeypatch, tmp_path, client):
+    exporter = NdjsonFileExporter(tmp_path / "traces.ndjson")
+    monkeypatch.setattr(tracing, "_tracer", Tracer(exporter))
+    response = client.get("/api/projects")
+    exporter.shutdown()
+    assert response.status_code == 200
+    [line] = (tmp_path / "traces.ndjson").read_text(encoding="utf-8").splitlines()
+    span = json.loads(line)
+    assert span["name"] == "http.request" and span["trace_id"] == response.headers["X-Trace-Id"]
+    assert span["attributes"] == {"method": "GET", "path": "/api/projects", "status_code": 200}
+
+
+def test_disabled_tracer_creates_no_spans():
+    tracer = Tracer()
+    with tracer.span("anything") as span:
+        assert span is None
+    assert tracing.child_span("orphan").__enter__() is None
+
+
+def test_ndjson_exporter_appends_complete_lines_without_buffering(tmp_path):
+    path = tmp_path / "traces.ndjson"
+    path.write_text('{"existing": true}\n', encoding="utf-8")
+    first, second = NdjsonFileExporter(path), NdjsonFileExporter(path)
+    tracer_a, tracer_b = Tracer(first), Tracer(second)
+    with tracer_a.span("a"), tracer_b.span("b"):
+        pass
+    # 未 shutdown 也已落盘
+    names = [json.loads(line).get("name") for line in path.read_text(encoding="utf-8").splitlines()]
+    assert names == [None, "b", "a"]
+    first.shutdown()
+    first.shutdown()
+    second.shutdown()
+
+
+def test_unknown_exporter_fails_startup(monkeypatch):
+    monkeypatch.setattr(tracing, "_tracer", None)
+    monkeypatch.setattr(tracing, "get_app_config", lambda: SimpleNamespace(tracing_exporter="bogus"))
+    with pytest.raises(ValueError, match="unknown tracing exporter: bogus"):
+        main.on_startup()
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from "react";
 import { Play } from "lucide-react";
-import { nodeTypes } from "../editor/nodeMeta";
+import { getStatementResults, nodeTypes } from "../editor/nodeMeta";
 import { API_BASE, fetchJson, getDefaultProjectId } from "../utils/api";
 
 export function NodeEditor({ node, onChange, onTest, nodeTestState, testStore = {}, onTestStoreChange }) {
@@ -27,6 +27,7 @@ export function NodeEditor({ node, onChange, onTest, nodeTestState, testStore =
   const testResult = nodeTestState?.result;
   const testError = nodeTestState?.error;
   const isTesting = Boolean(nodeTestState?.isLoading);
+  const statementResults = testResult ? getStatementResults(testResult.output, testResult.metadata) : [];
 
   return (
     <div className="node-editor-panel" style={{ display: "flex", flexDirection: "column", gap: "16px" }}>
@@ -124,6 +125,38 @@ export function NodeEditor({ node, onChange, onTest, nodeTestState, testStore =
               placeholder="e.g. GET my_key"
             />
           </div>
+          <div className="field">
+            <label>Foreach Expression (optional)</label>
+            <input
+              className="input"
+              value={config.foreach || ""}
+              onChange={(e) =>
+                onChange({
+                  ...meta,
+                  config: { ...config, foreach: e.target.value },
+                })
+              }
+              placeholder="e.g. nodes.query_users[0].rows"
+            />
+            <small className="help-text">
+              Renders the command once per row (<code>{`{{ row.id }}`}</code>) and sends all commands in one pipeline.
+            </small>
+          </div>
+          <div className="field">
+            <label>
+              <input
+                type="checkbox"
+                checked={Boolean(config.transaction)}
+                onChange={(e) =>
+                  onChange({
+                    ...meta,
+                    config: { ...config, transaction: e.target.checked },
+                  })
+                }
+              />{" "}
+              Wrap pipeline in MULTI/EXEC
+            </label>
+          </div>
         </>
       )}
 
@@ -401,9 +434,9 @@ export function NodeEditor({ node, onChange, onTest, nodeTestState, testStore =
                     </div>
                   )}
                   {/* MySQL: 按语句顺序展示——每条先展示影响行数，有查询结果则立即展示该条结果表 */}
-                  {(testResult.action_type === "sql" || testResult.action_type === "mysql") && testResult.metadata?.statement_results?.length > 0 && (
+                  {(testResult.action_type === "sql" || testResult.action_type === "mysql") && statementResults.length > 0 && (
                     <div className="result-block statement-results-in-order">
-                      {testResult.metadata.statement_results.map((sr, idx) => (
+                      {statementResults.map((sr, idx) => (
                         <div key={idx} className="statement-result-item">
                           <div className="result-meta-row statement-row">
                             <span className="result-caption">#{sr.index}</span>
@@ -437,6 +470,9 @@ export function NodeEditor({ node, onChange, onTest, nodeTestState, testStore =
                               )}
                             </div>
                           )}
+                          {sr.truncated && (
+                            <div className="result-caption">Result truncated by {sr.truncated_reason}: fetched {sr.rows?.length ?? 0} rows</div>
+                          )}
                         </div>
                       ))}
                     </div>
@@ -451,7 +487,7 @@ export function NodeEditor({ node, onChange, onTest, nodeTestState, testStore =
                     </div>
                   )}
                   {/* MySQL: 表格渲染（仅当 output 为行数据时，非 statement_results） */}
-                  {(testResult.action_type === "sql" || testResult.action_type === "mysql") && Array.isArray(testResult.output) && (testResult.output.length === 0 || !("index" in (testResult.output[0] || {}))) ? (
+                  {(testResult.action_type === "sql" || testResult.action_type === "mysql") && Array.isArray(testResult.output) && statementResults.length === 0 ? (
                     testResult.output.length === 0 ? (
                       <div className="result-empty">No rows returned</div>
                     ) : (
@@ -504,7 +540,7 @@ export function NodeEditor({ node, onChange, onTest, nodeTestState, testStore =
                     </div>
                   ) : (
                     /* 通用: JSON / 字符串（SQL 节点且有 statement_results 时不再重复 JSON） */
-                    (["sql", "mysql"].includes(testResult.action_type) && testResult.metadata?.statement_results?.length > 0) ? null : (
+                    (["sql", "mysql"].includes(testResult.action_type) && statementResults.length > 0) ? null : (
                       <pre className="result-pre">
                         {typeof testResult.output === "object"
                           ? JSON.stringify(testResult.output, null, 2)
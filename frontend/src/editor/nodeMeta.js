@@ -26,3 +26,11 @@ export function updateNodeLabel(node) {
   const clipped = getNodeBrief(meta).slice(0, 40);
   return `${title}\n${meta.id}${clipped ? `\n${clipped}` : ""}`;
 }
+
+// SQL 节点的语句结果只保存在 output（data）中；旧执行记录仍从 metadata.statement_results 兼容读取
+export function getStatementResults(output, metadata) {
+  if (Array.isArray(output) && output.length > 0 && output[0] && typeof output[0] === "object" && "index" in output[0]) {
+    return output;
+  }
+  return metadata?.statement_results || [];
+}
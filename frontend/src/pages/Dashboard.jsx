@@ -4,7 +4,7 @@ import { Save, Play, Plus, Trash2, RefreshCw, Settings, CheckCircle2, AlertCircl
 
 import { NodeEditor } from "../components/NodeEditor";
 import { ThemeToggle } from "../components/ThemeToggle";
-import { nodeTypes } from "../editor/nodeMeta";
+import { getStatementResults, nodeTypes } from "../editor/nodeMeta";
 import { API_BASE, fetchJson, getDefaultProjectId } from "../utils/api";
 
 const emptyRule = {
@@ -147,36 +147,82 @@ function GlobalsPanel({ globals, onSave, onDelete }) {
     );
 }
 
+const TIMING_PHASES = ["render", "connector", "acquire", "io", "serialize"];
+
+function formatTimings(timings) {
+    const parts = TIMING_PHASES.filter((phase) => timings[`${phase}_ms`] > 0).map((phase) => `${phase} ${timings[`${phase}_ms`]}ms`);
+    return [...parts, `total ${timings.total_ms}ms`].join(" · ");
+}
+
+const SQL_PREVIEW_ROWS = 50;
+
+function isSqlStep(step) {
+    return step.action_type === "sql" || step.action_type === "mysql";
+}
+
 function ExecutionPanel({ ruleId, refreshToken, autoOpenExecutionId }) {
     const [executions, setExecutions] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [selectedExecution, setSelectedExecution] = useState(null);
     const [errorMessage, setErrorMessage] = useState("");
 
-    async function loadExecutionList() {
+    async function loadExecutionList(cursor = null) {
         if (!ruleId) {
             setExecutions([]);
+            setNextCursor(null);
             setSelectedExecution(null);
             return;
         }
         try {
             setErrorMessage("");
-            const data = await fetchJson(`${API_BASE}/executions/${ruleId}`);
-            setExecutions(data);
+            const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+            const data = await fetchJson(`${API_BASE}/executions/${ruleId}${query}`);
+            setExecutions((prev) => (cursor ? [...prev, ...data.items] : data.items));
+            setNextCursor(data.next_cursor);
         } catch (error) {
             setErrorMessage(error.message || "Failed to load executions");
         }
     }
 
+    // 详情只取步骤摘要；SQL 步骤随后各自拉取前 SQL_PREVIEW_ROWS 行，其他步骤展开时再拉取 step_data
     async function loadExecution(executionId) {
         try {
             setErrorMessage("");
             const data = await fetchJson(`${API_BASE}/execution/${executionId}`);
             setSelectedExecution(data);
+            data.steps.filter(isSqlStep).forEach((step) => loadStepData(executionId, step.id, SQL_PREVIEW_ROWS));
         } catch (error) {
             setErrorMessage(error.message || "Failed to load execution detail");
         }
     }
 
+    function updateStep(executionId, stepId, patch) {
+        setSelectedExecution((prev) =>
+            prev && prev.execution_id === executionId
+                ? { ...prev, steps: prev.steps.map((s) => (s.id === stepId ? { ...s, ...patch } : s)) }
+                : prev
+        );
+    }
+
+    async function loadStepData(executionId, stepId, limit = null) {
+        try {
+            setErrorMessage("");
+            const query = limit ? `?limit=${limit}` : "";
+            const data = await fetchJson(`${API_BASE}/execution/${executionId}/steps/${stepId}/data${query}`);
+            updateStep(executionId, stepId, { step_data: data.step_data, step_data_loaded: true });
+        } catch (error) {
+            setErrorMessage(error.message || "Failed to load step output");
+        }
+    }
+
+    function toggleStep(step) {
+        const executionId = selectedExecution.execution_id;
+        updateStep(executionId, step.id, { expanded: !step.expanded });
+        if (!step.expanded && !step.step_data_loaded) {
+            loadStepData(executionId, step.id);
+        }
+    }
+
     useEffect(() => {
         loadExecutionList();
     }, [ruleId, refreshToken]);
@@ -201,6 +247,11 @@ function ExecutionPanel({ ruleId, refreshToken, autoOpenExecutionId }) {
                         <div className={`exec-status-badge ${execution.status}`}>{execution.status}</div>
                     </div>
                 ))}
+                {nextCursor && (
+                    <button className="btn full-width" onClick={() => loadExecutionList(nextCursor)}>
+                        Load more
+                    </button>
+                )}
             </div>
             {selectedExecution && (
                 <div className="exec-detail">
@@ -225,9 +276,10 @@ function ExecutionPanel({ ruleId, refreshToken, autoOpenExecutionId }) {
                                     <span className={`step-status ${step.status}`}>{step.status}</span>
                                 </div>
                                 <div className="exec-step-body">{step.content}</div>
-                                {(step.action_type === "sql" || step.action_type === "mysql") && step.step_data?.metadata?.statement_results?.length > 0 && (
+                                {step.timings && <div className="status-note">{formatTimings(step.timings)}</div>}
+                                {isSqlStep(step) && getStatementResults(step.step_data?.data, step.step_data?.metadata).length > 0 && (
                                     <div className="exec-step-statement-results statement-results-in-order">
-                                        {step.step_data.metadata.statement_results.map((sr, idx) => (
+                                        {getStatementResults(step.step_data.data, step.step_data.metadata).map((sr, idx) => (
                                             <div key={idx} className="statement-result-item">
                                                 <div className="result-meta-row statement-row">
                                                     <span className="result-caption">#{sr.index}</span>
@@ -245,7 +297,7 @@ function ExecutionPanel({ ruleId, refreshToken, autoOpenExecutionId }) {
                                                                 </tr>
                                                             </thead>
                                                             <tbody>
-                                                                {sr.rows.slice(0, 50).map((row, i) => (
+                                                                {sr.rows.slice(0, SQL_PREVIEW_ROWS).map((row, i) => (
                                                                     <tr key={i}>
                                                                         {Object.values(row).map((val, j) => (
                                                                             <td key={j}>
@@ -256,16 +308,27 @@ function ExecutionPanel({ ruleId, refreshToken, autoOpenExecutionId }) {
                                                                 ))}
                                                             </tbody>
                                                         </table>
-                                                        {sr.rows.length > 50 && (
-                                                            <div className="result-caption">Showing 50 of {sr.rows.length} rows</div>
+                                                        {(sr.rows_total ?? sr.rows.length) > sr.rows.length && (
+                                                            <div className="result-caption">Showing {sr.rows.length} of {sr.rows_total} rows</div>
                                                         )}
                                                     </div>
                                                 )}
+                                                {sr.truncated && (
+                                                    <div className="result-caption">Result truncated by {sr.truncated_reason}: fetched {sr.rows?.length ?? 0} rows</div>
+                                                )}
                                             </div>
                                         ))}
                                     </div>
                                 )}
                                 {step.output && <div className="exec-step-output">{step.output}</div>}
+                                {!isSqlStep(step) && (
+                                    <button className="btn mt-2" onClick={() => toggleStep(step)}>
+                                        {step.expanded ? "Hide output" : `Show output${step.step_data_bytes ? ` (${step.step_data_bytes} bytes)` : ""}`}
+                                    </button>
+                                )}
+                                {!isSqlStep(step) && step.expanded && step.step_data_loaded && (
+                                    <pre className="result-pre mt-2">{JSON.stringify(step.step_data?.data ?? null, null, 2)}</pre>
+                                )}
                             </div>
                         ))}
                     </div>